@@ -0,0 +1,113 @@
+// Benchmark: sector/stage/hiring/source filtering, per-company scan vs facet bitsets.
+//
+// Runs under Node (no browser). The bitset version is the page's own filter
+// engine, so build the page first:
+//     python build_site.py && python gen_html.py
+//     node bench/facet_filter.js [path/to/cambridge_job_board.html]
+//
+// Synthetic data: 150,000 companies. Two steps are timed separately, each
+// against its scan equivalent:
+//   filter  the matching company ids (bitset AND, vs a pass over every company)
+//   counts  companies per dropdown option under the other active filters
+//           (bitset popcounts, vs one pass counting the options as it goes)
+// Neither includes the worker round trip, the live stats or the job list.
+
+const path = require('path');
+const {loadEngine, bitset, statCodes, columns} = require('./page_engine');
+
+const PAGE    = process.argv[2] || path.join(__dirname, '..', 'cambridge_job_board.html');
+const N       = 150000;
+const REPEATS = 5;
+
+// ── pre-bitset implementation (as getFiltered did it) ──
+const FACET_KEYS = ['sector', 'stage', 'hiring', 'source'];
+function legacyFiltered(ALL, state) {
+  return ALL.filter(c => {
+    if (state.sector && !c.tags.includes(state.sector)) return false;
+    if (state.stage  && c.stage  !== state.stage)  return false;
+    if (state.hiring && c.hiring !== state.hiring) return false;
+    if (state.source && c.source !== state.source) return false;
+    return true;
+  });
+}
+// Facet counts by scan: a company counts towards a facet's options when it
+// passes every other active filter
+function legacyCounts(ALL, state) {
+  const counts = {sector: {}, stage: {}, hiring: {}, source: {}};
+  for (const c of ALL) {
+    let failed = null, fails = 0;
+    if (state.sector && !c.tags.includes(state.sector)) { failed = 'sector'; fails++; }
+    if (state.stage  && c.stage  !== state.stage)  { failed = 'stage';  fails++; }
+    if (state.hiring && c.hiring !== state.hiring) { failed = 'hiring'; fails++; }
+    if (state.source && c.source !== state.source) { failed = 'source'; fails++; }
+    if (fails > 1) continue;
+    for (const key of FACET_KEYS) {
+      if (fails && key !== failed) continue;
+      for (const v of key === 'sector' ? c.tags : [c[key]]) counts[key][v] = (counts[key][v] || 0) + 1;
+    }
+  }
+  return counts;
+}
+const nonZero = counts => JSON.stringify(FACET_KEYS.map(k =>
+  Object.entries(counts[k]).filter(([, n]) => n).sort()));
+
+// ── synthetic dataset + bitsets ──
+let seed = 7;
+const rand = () => (seed = (seed * 1103515245 + 12345) % 2147483648) / 2147483648;
+const pick = xs => xs[Math.floor(rand() * xs.length)];
+const SECTORS = Array.from({length: 40}, (_, i) => `sector ${i}`);
+const VALUES  = {stage: ['startup', 'scaleup', 'established', 'unknown'],
+                 hiring: ['actively_hiring', 'possibly_hiring', 'no_info'],
+                 source: ['hub', 'companies_house']};
+const ALL = Array.from({length: N}, () => ({
+  tags: [...new Set([pick(SECTORS), pick(SECTORS), pick(SECTORS)].slice(0, 1 + Math.floor(rand() * 3)))],
+  stage: pick(VALUES.stage), hiring: pick(VALUES.hiring), source: pick(VALUES.source),
+}));
+const ids = {sector: {}, stage: {}, hiring: {}, source: {}};
+ALL.forEach((c, i) => {
+  c.tags.forEach(t => (ids.sector[t] ||= []).push(i));
+  for (const k of ['stage', 'hiring', 'source']) (ids[k][c[k]] ||= []).push(i);
+});
+const facets = Object.fromEntries(Object.entries(ids).map(([k, vals]) =>
+  [k, Object.fromEntries(Object.entries(vals).map(([v, list]) => [v, bitset(list, N)]))]));
+
+function time(fn) {
+  let best = Infinity, out;
+  for (let r = 0; r < REPEATS; r++) {
+    const t = process.hrtime.bigint();
+    out = fn();
+    best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  return [best, out];
+}
+
+(async () => {
+  const call = loadEngine(PAGE);
+  const stats = {stage: statCodes(ALL, 'stage', VALUES.stage), hiring: statCodes(ALL, 'hiring', VALUES.hiring)};
+  await call('init', {companies: columns(ALL), index: {role_start: new Array(N + 1).fill(0), facets, stats},
+                      search: {t: [], p: []}});
+  const scenarios = [
+    ['no filter',               {}],
+    ['sector',                  {sector: 'sector 3'}],
+    ['sector + stage',          {sector: 'sector 3', stage: 'startup'}],
+    ['all four facets',         {sector: 'sector 3', stage: 'startup', hiring: 'actively_hiring', source: 'hub'}],
+  ];
+  const {maskExcept, filterIds, facetCounts} = call.engine;
+  const row = (label, step, matches, tOld, tNew) => console.log(
+    label.padEnd(20) + step.padEnd(8) + String(matches).padStart(9) + tOld.toFixed(2).padStart(10) +
+    tNew.toFixed(2).padStart(11) + `${(tOld / tNew).toFixed(1)}×`.padStart(9));
+  console.log(`${N} companies (best of ${REPEATS})\n`);
+  console.log('scenario'.padEnd(20) + 'step'.padEnd(8) + 'matches'.padStart(9) + 'scan ms'.padStart(10) +
+              'bitset ms'.padStart(11) + 'speedup'.padStart(9));
+  for (const [label, filters] of scenarios) {
+    const state = {search: '', sector: '', stage: '', hiring: '', source: '', ...filters};
+    const [tOld, a] = time(() => legacyFiltered(ALL, state));
+    const [tNew, b] = time(() => filterIds(state, null, maskExcept(state, null, null)));
+    if (a.length !== b.length) throw new Error(`${label}: results differ (${a.length} vs ${b.length})`);
+    row(label, 'filter', a.length, tOld, tNew);
+    const [cOld, ca] = time(() => legacyCounts(ALL, state));
+    const [cNew, cb] = time(() => facetCounts(state, null));
+    if (nonZero(ca) !== nonZero(cb)) throw new Error(`${label}: facet counts differ`);
+    row('', 'counts', '', cOld, cNew);
+  }
+})();
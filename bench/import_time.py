@@ -0,0 +1,86 @@
+"""
+Benchmark: start-up cost of the pipeline scripts, with a budget.
+
+Runs each script's --help under `python -X importtime` and adds up the
+top-level imports. Nothing heavy should load before a run needs it: pandas,
+requests, bs4, openai and pyarrow are bound lazily (pipeline/cli.py), so
+importing one of them here fails the check, and so does going over BUDGET_MS.
+Each script's --dry-run is then run once on the committed outputs, so an
+entry point that only breaks past argument parsing fails it too (scripts
+whose raw inputs aren't in the tree are skipped).
+
+    python bench/import_time.py [--budget MS] [--repeat N]
+
+Exits non-zero on failure, for use as a pre-commit or CI check.
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+PIPELINE  = Path(__file__).resolve().parent.parent / 'pipeline'
+SCRIPTS   = ['01_merge_validate.py', '02_find_careers.py', '03_enrich_companies.py',
+             '04_merge_final.py', 'test_run.py']
+HEAVY     = {'pandas', 'numpy', 'pyarrow', 'requests', 'bs4', 'openai'}
+BUDGET_MS = 150
+LINE_RE   = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+# Inputs a dry run needs that are not committed (relative to the repo root)
+RAW_INPUTS = {'01_merge_validate.py': ['scraped_companies.csv', 'companies_house_cambridge_tech.csv']}
+
+
+def import_profile(script):
+    """(total top-level import ms, {imported module roots}) for one --help run."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', str(PIPELINE / script), '--help'],
+                          capture_output=True, text=True, cwd=PIPELINE)
+    if proc.returncode:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith('import time:')]
+        sys.exit(f'{script} --help failed:\n' + '\n'.join(errors))
+    total, modules = 0, set()
+    for m in LINE_RE.finditer(proc.stderr):
+        modules.add(m[4].split('.')[0])
+        if not m[3]:
+            total += int(m[2])
+    return total / 1000, modules
+
+
+def dry_run(script):
+    """None if script --dry-run exits cleanly, else the tail of its output."""
+    missing = [p for p in RAW_INPUTS.get(script, []) if not (PIPELINE.parent / p).exists()]
+    if missing:
+        return f'skipped, no {", ".join(missing)}'
+    proc = subprocess.run([sys.executable, str(PIPELINE / script), '--dry-run'],
+                          capture_output=True, text=True, cwd=PIPELINE)
+    if proc.returncode:
+        return 'FAIL\n' + '\n'.join((proc.stdout + proc.stderr).splitlines()[-8:])
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--budget', type=float, default=BUDGET_MS, help=f'ms per script (default {BUDGET_MS})')
+    ap.add_argument('--repeat', type=int, default=5, help='runs per script, best is reported (default 5)')
+    args = ap.parse_args()
+
+    failed = False
+    print(f'{"script":<26}{"imports ms":>11}  heavy modules')
+    for script in SCRIPTS:
+        runs  = [import_profile(script) for _ in range(args.repeat)]
+        best  = min(ms for ms, _ in runs)
+        heavy = sorted(HEAVY & set().union(*(mods for _, mods in runs)))
+        over  = best > args.budget
+        failed |= over or bool(heavy)
+        print(f'{script:<26}{best:>11.1f}  {", ".join(heavy) or "—"}{"  OVER BUDGET" if over else ""}')
+
+    print()
+    for script in SCRIPTS:
+        problem = dry_run(script)
+        failed |= bool(problem) and problem.startswith('FAIL')
+        print(f'{script:<26}--dry-run {problem or "ok"}')
+    print(f'\nbudget {args.budget:.0f} ms per script, dry runs: {"FAIL" if failed else "ok"}')
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
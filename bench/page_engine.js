@@ -0,0 +1,83 @@
+// Loads filterEngine() from a generated page and drives it in-process through
+// its message API (the same code the page runs in its Web Worker). The
+// engine's filter and count steps are also exposed as call.engine, to be
+// timed on their own.
+const fs = require('fs');
+
+function extractFunction(src, name) {
+  const start = src.indexOf(`function ${name}(`);
+  if (start < 0) throw new Error(`${name}() not found`);
+  let depth = 0, i = src.indexOf('{', start);
+  for (; i < src.length; i++) {
+    if (src[i] === '{') depth++;
+    else if (src[i] === '}' && --depth === 0) break;
+  }
+  return src.slice(start, i + 1);
+}
+
+function loadEngine(pagePath) {
+  const html = fs.readFileSync(pagePath, 'utf8');
+  const engineSrc = extractFunction(html, 'filterEngine').slice(0, -1) +
+    'self.engine = {maskExcept, filterIds, facetCounts};\n}';
+  const filterEngine = new Function(`${extractFunction(html, 'decodeColumnar')}
+    ${engineSrc}; return filterEngine;`)();
+  const pending = new Map();
+  let seq = 0;
+  const self = {postMessage: m => {
+    const req = pending.get(m.seq);
+    if ('part' in m) return req.parts.push(m.part);
+    pending.delete(m.seq);
+    'error' in m ? req.reject(new Error(m.error)) : req.resolve({result: m.result, parts: req.parts});
+  }};
+  filterEngine(self);
+  // call(op, args) → Promise<{result, parts}>
+  const call = (op, args) => new Promise((resolve, reject) => {
+    pending.set(++seq, {resolve, reject, parts: []});
+    self.onmessage({data: {seq, op, args}});
+  });
+  call.engine = self.engine;
+  return call;
+}
+
+// base64 bitset of company ids, as build_site.bitset() writes it
+function bitset(ids, n) {
+  const buf = Buffer.alloc(((n + 31) >> 5) * 4);
+  for (const i of ids) buf[i >> 3] |= 1 << (i & 7);
+  return buf.toString('base64');
+}
+
+// base64 one-byte codes of a field, as build_site.stat_codes() writes them
+function statCodes(companies, field, values) {
+  return {values, codes: Buffer.from(companies.map(c => values.indexOf(c[field]))).toString('base64')};
+}
+
+// The columnar companies payload, as columnar.encode() writes it; fields the
+// synthetic records leave out come through empty
+function columns(companies, roles = []) {
+  const b64 = (T, xs) => Buffer.from(new T(xs).buffer).toString('base64');
+  const codes = (values, xs) => b64(values.length <= 256 ? Uint8Array : Uint16Array, xs);
+  const cat = xs => {
+    const values = [...new Set(xs)], index = new Map(values.map((v, i) => [v, i]));
+    return {values, codes: codes(values, xs.map(v => index.get(v)))};
+  };
+  const get = f => companies.map(c => c[f] ?? '');
+  const tags = [...new Set(companies.flatMap(c => c.tags || []))], tagIndex = new Map(tags.map((t, i) => [t, i]));
+  const start = [0], tagCodes = [];
+  for (const c of companies) {
+    for (const t of c.tags || []) tagCodes.push(tagIndex.get(t));
+    start.push(tagCodes.length);
+  }
+  const coord = f => b64(Int32Array, companies.map(c => Math.round((c[f] || 0) * 1e6)));
+  return {
+    v: 1, n: companies.length, prefix: {},
+    text: Object.fromEntries(['name', 'url', 'desc', 'ch_url', 'careers_url', 'contact', 'tech'].map(f => [f, get(f)])),
+    cat: Object.fromEntries(['source', 'hub', 'stage', 'employees', 'hiring', 'postcode', 'sic'].map(f => [f, cat(get(f))])),
+    tags: {values: tags, start: b64(Uint32Array, start), codes: codes(tags, tagCodes)},
+    num: {lat: coord('lat'), lon: coord('lon'), founded: b64(Int16Array, companies.map(c => c.founded || 0))},
+    flags: b64(Uint8Array, companies.map(c => (c.ch ? 1 : 0) | (c.has_careers ? 2 : 0) | (c.loc_approx ? 4 : 0))),
+    roles: {n: roles.length, co: b64(Uint32Array, roles.map(r => r.co)), title: roles.map(r => r.title ?? ''),
+            type: cat(roles.map(r => r.type_ ?? 'unknown')), location: cat(roles.map(r => r.location ?? ''))},
+  };
+}
+
+module.exports = {loadEngine, bitset, statCodes, columns};
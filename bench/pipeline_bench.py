@@ -0,0 +1,353 @@
+"""
+Benchmark: end-to-end throughput of the pipeline, offline and reproducible.
+
+The careers scrape (02), enrichment (03), final merge (04), site build and
+render run on a scratch copy of the repo, against local stand-ins for the
+companies' websites and the OpenAI API (bench/standin.py) that answer from a
+fixture store, with injected latency and errors:
+
+    python bench/pipeline_bench.py synth                       # fixtures from the committed outputs
+    python bench/pipeline_bench.py record --companies 25       # real sites + OpenAI (OPENAI_API_KEY)
+    python bench/pipeline_bench.py run --companies 10000 \\
+        --latency 80:40 --error-rate 0.02 --llm-latency 700:300 --llm-error-rate 0.01
+    python bench/pipeline_bench.py run --stages final,build    # the build alone, on seeded tables
+
+synth writes bench/fixtures/synthetic: a homepage (and careers page, listing
+the roles) per company, and the careers and enrichment answers it was given,
+from careers.csv / enriched_companies.csv. record runs 02 and 03 on the first
+N companies with websites through recording stand-ins, which fetch the real
+pages and ask the real API and keep what they got (bench/fixtures/recorded).
+
+run scales master_companies.csv to --companies: copy k of a company is named
+'<name> ~k' with host 'k<k>--<host>', and the stand-ins serve it the
+original's fixtures. Companies whose homepage is not in the store are left
+out (a partial recording would otherwise benchmark 404s). Tables a stage
+reads but no selected stage writes are seeded, scaled the same way. Pages
+are padded to --page-kb so parsing costs what it does on real sites.
+
+The scripts are unchanged: requests reaches the web stand-in through
+HTTP_PROXY (company URLs are rewritten to http://), openai the API stand-in
+through OPENAI_BASE_URL, and PIPELINE_REQUEST_DELAY=0 drops the polite waits.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import pandas as pd
+
+import standin
+
+REPO     = Path(__file__).resolve().parent.parent
+OUTPUT   = REPO / 'pipeline/output'
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+STAGES   = {   # name: (script, the table whose rows it processes)
+    'careers': ('pipeline/02_find_careers.py',     'careers.csv'),
+    'enrich':  ('pipeline/03_enrich_companies.py', 'enriched_companies.csv'),
+    'final':   ('pipeline/04_merge_final.py',      'final_companies.csv'),
+    'build':   ('build_site.py',                   'final_companies.csv'),
+    'render':  ('gen_html.py',                     'final_companies.csv'),
+}
+SEEDED   = {'careers': 'careers.csv', 'enrich': 'enriched_companies.csv', 'final': 'final_companies.csv'}
+
+
+# ── Fixtures ──────────────────────────────────────────────────────────────────
+def _by_name(csv):
+    path = OUTPUT / csv
+    if not path.exists():
+        return {}
+    df = pd.read_csv(path).drop_duplicates('company_name')
+    return {r['company_name']: r for r in df.to_dict('records')}
+
+
+def _text(v):
+    return '' if pd.isna(v) else str(v)
+
+
+def _json(v, default):
+    try:
+        return json.loads(v) if isinstance(v, str) else default
+    except ValueError:
+        return default
+
+
+def _homepage(name, enriched, careers_link):
+    about = _text(enriched.get('description')) or f'{name} is a technology company based in Cambridge.'
+    tech  = _text(enriched.get('tech_keywords'))
+    link  = '<a href="/careers">Careers</a>' if careers_link else ''
+    return (f'<!doctype html><html><head><title>{name}</title></head><body>\n'
+            f'<nav class="nav"><a href="/">Home</a> <a href="/about">About</a> {link}</nav>\n'
+            f'<main><h1>{name}</h1><p>{about}</p><p>{tech}</p></main>\n</body></html>')
+
+
+def _careers_page(name, roles):
+    items = ''.join(f'<li><a href="{r.get("url") or "#"}">{r.get("title")}</a> · {r.get("type") or ""}'
+                    f' · {r.get("location") or ""}</li>\n' for r in roles)
+    return (f'<!doctype html><html><head><title>Careers at {name}</title></head><body>\n'
+            f'<main><h1>Join {name}</h1><ul>\n{items}</ul></main>\n</body></html>')
+
+
+def synthesize(path):
+    """Fixtures for every company, from the committed careers and enrichment results."""
+    store    = standin.FixtureStore(path)
+    master   = pd.read_csv(OUTPUT / 'master_companies.csv').drop_duplicates('company_name')
+    careers  = _by_name('careers.csv')
+    enriched = _by_name('enriched_companies.csv')
+    html     = 'text/html; charset=utf-8'
+    for row in master.to_dict('records'):
+        name, url = row['company_name'], row['url']
+        c, e = careers.get(name, {}), enriched.get(name, {})
+        roles = [r for r in _json(c.get('roles_json'), []) if isinstance(r, dict)]
+        if isinstance(url, str) and url.strip():
+            url = url.strip() if '://' in url else 'https://' + url.strip()
+            has_page = bool(roles) or str(c.get('has_careers_page')) == 'True'
+            store.add_page(url, 200, html, _homepage(name, e, has_page))
+            if has_page:
+                store.add_page(urljoin(url, '/careers'), 200, html, _careers_page(name, roles))
+        if c:
+            store.add_answer('careers', name, {
+                'has_careers_page': str(c.get('has_careers_page')) == 'True', 'roles': roles,
+                'contact_email': _text(c.get('contact_email')) or None,
+                'apply_url': _text(c.get('apply_url')) or None,
+                'summary': _text(c.get('careers_summary', c.get('summary')))})
+        if e:
+            year = e.get('founded_year')
+            store.add_answer('enrich', name, {
+                'description': _text(e.get('description')), 'sector_tags': _json(e.get('sector_tags'), []),
+                'stage': _text(e.get('stage')) or 'unknown', 'tech_keywords': _text(e.get('tech_keywords')),
+                'employee_est': _text(e.get('employee_est')) or 'unknown',
+                'hiring_status': _text(e.get('hiring_status')) or 'no_info',
+                'founded_year': None if pd.isna(year) else int(year), 'hq_city': 'Cambridge'})
+    store.save()
+    print(f'Fixtures → {path}: {len(store.web)} pages, {len(store.llm)} answers')
+    return store
+
+
+def open_store(path):
+    """The fixture store at path; the synthetic one is built on first use."""
+    store = standin.FixtureStore(path)
+    if not store and Path(path).resolve() == (FIXTURES / 'synthetic').resolve():
+        store = synthesize(path)
+    if not store:
+        sys.exit(f'No fixtures in {path}: run `synth` or `record` first')
+    return store
+
+
+# ── Workspace ─────────────────────────────────────────────────────────────────
+def alias_url(url, k):
+    """Copy k's URL: http:// (through the web stand-in), host aliased for k ≥ 1."""
+    if not isinstance(url, str) or not url.strip():
+        return url
+    p = urlsplit(url.strip() if '://' in url else 'https://' + url.strip())
+    host = f'k{k}--{p.netloc}' if k else p.netloc
+    return f'http://{host}{p.path}' + (f'?{p.query}' if p.query else '')
+
+
+def scale(df, n, url_cols=('url',)):
+    """n rows: df's rows repeated, copy k renamed '<name> ~k' with its URLs aliased."""
+    copies = []
+    for k in range(-(-n // len(df))):
+        c = df.copy()
+        if k:
+            c['company_name'] = c['company_name'] + f' ~{k}'
+            if 'company_number' in c:   # one company number per company
+                c['company_number'] = None
+        for col in url_cols:
+            if col in c:
+                c[col] = c[col].map(lambda u: alias_url(u, k))
+        copies.append(c)
+    out = pd.concat(copies, ignore_index=True).head(n)
+    return out.drop(columns='company_id', errors='ignore')
+
+
+def make_workspace(store, n, stages, record=False):
+    """
+    A scratch copy of the scripts with a scaled master table (record: the first
+    n companies with websites, unscaled) and seeded tables the stages need.
+    """
+    ws = Path(tempfile.mkdtemp(prefix='pipeline-bench-'))
+    (ws / 'pipeline/output').mkdir(parents=True)
+    for p in [*REPO.glob('*.py'), *REPO.glob('pipeline/*.py')]:
+        shutil.copy2(p, ws / p.relative_to(REPO))
+    for p in OUTPUT.glob('geocodes_*.json'):
+        shutil.copy2(p, ws / 'pipeline/output' / p.name)
+
+    master = pd.read_csv(OUTPUT / 'master_companies.csv').drop_duplicates('company_name')
+    if record:
+        master = master[master['has_url'] == True].head(n)
+    else:
+        urls   = master['url'].where(master['url'].map(lambda u: isinstance(u, str) and bool(u.strip())))
+        master = master[urls.isna() | urls.map(lambda u: isinstance(u, str) and standin.page_key(u) in store.web)]
+    master = scale(master, len(master) if record else n)
+    master.to_csv(ws / 'pipeline/output/master_companies.csv', index=False)
+
+    names = set(master['company_name'])
+    for stage, csv in SEEDED.items():
+        if stage in stages or not (OUTPUT / csv).exists():
+            continue
+        df = pd.read_csv(OUTPUT / csv).drop_duplicates('company_name')
+        df = df.rename(columns={'careers_summary': 'summary'})   # the layout 02 writes
+        df = scale(df, len(df) * -(-n // len(df)), url_cols=('url', 'company_url'))
+        df[df['company_name'].isin(names)].to_csv(ws / 'pipeline/output' / csv, index=False)
+    return ws, master
+
+
+# ── Running ───────────────────────────────────────────────────────────────────
+def run_stage(ws, name, env):
+    """Run a stage's script in the workspace, output to its log; (ok, seconds)."""
+    script, _ = STAGES[name]
+    (ws / 'logs').mkdir(exist_ok=True)
+    t = time.perf_counter()
+    with open(ws / 'logs' / f'{name}.log', 'w', encoding='utf-8') as log:
+        proc = subprocess.run([sys.executable, str(ws / script)], cwd=ws / Path(script).parent,
+                              stdout=log, stderr=subprocess.STDOUT, env=env)
+    return proc.returncode == 0, time.perf_counter() - t
+
+
+def stage_env(web, llm, polite):
+    env = {k: v for k, v in os.environ.items() if k.lower() not in ('https_proxy', 'all_proxy')}
+    env.update(HTTP_PROXY=web.url, http_proxy=web.url, NO_PROXY='127.0.0.1,localhost',
+               no_proxy='127.0.0.1,localhost', OPENAI_BASE_URL=llm.url, OPENAI_API_KEY='sk-bench',
+               PYTHONUNBUFFERED='1')
+    if not polite:
+        env['PIPELINE_REQUEST_DELAY'] = '0'
+    return env
+
+
+def rows(ws, csv):
+    path = ws / 'pipeline/output' / csv
+    return len(pd.read_csv(path)) if path.exists() else 0
+
+
+def trace_totals(ws):
+    """{run name: (fetches, llm calls, span errors)} from the workspace's traces."""
+    sys.path.insert(0, str(REPO / 'pipeline'))
+    import instrument
+    totals = {}
+    for path in sorted((ws / 'pipeline/output/traces').glob('*.jsonl')):
+        spans, _ = instrument.load(path)
+        totals[path.name.split('-')[0]] = (sum(s['span'] == 'fetch' for s in spans),
+                                           sum(s['span'] == 'llm' for s in spans),
+                                           sum(bool(s.get('error')) for s in spans))
+    return totals
+
+
+def bench(store, stages, n, web_faults, llm_faults, page_kb=0, keep=False, polite=False, record=False):
+    """Run the stages on n companies against the stand-ins; {stage: (ok, seconds, companies)}."""
+    ws, master = make_workspace(store, n, stages, record)
+    with_url = int((master['has_url'] == True).sum())
+    print(f'{len(master):,} companies ({with_url:,} with websites) in {ws}')
+    results = {}
+    with standin.WebStandIn(store, web_faults, record=record, page_kb=page_kb) as web, \
+         standin.OpenAIStandIn(store, llm_faults, record=record) as llm:
+        env = stage_env(web, llm, polite)
+        for name in STAGES:
+            if name not in stages:
+                continue
+            print(f'▶ {name}', flush=True)
+            ok, seconds = run_stage(ws, name, env)
+            done = with_url if name == 'careers' else len(master) if name == 'enrich' else rows(ws, STAGES[name][1])
+            results[name] = (ok, seconds, done)
+            if not ok:
+                log = (ws / 'logs' / f'{name}.log').read_text(errors='replace').splitlines()
+                print(f'✗ {name} failed, last lines of its log:\n' + '\n'.join('    ' + l for l in log[-15:]))
+                break
+        web_stats, llm_stats = dict(web.stats), dict(llm.stats)
+    print_report(len(master), results, trace_totals(ws), web_stats, llm_stats, web_faults, llm_faults)
+    if keep or not all(ok for ok, _, _ in results.values()):
+        print(f'  Workspace kept   : {ws}')
+    else:
+        shutil.rmtree(ws)
+    return results
+
+
+def print_report(n, results, traces, web_stats, llm_stats, web_faults, llm_faults):
+    """Throughput per stage, and end to end for the n companies in the master table."""
+    print(f"\n{'='*71}")
+    print(f"  {'stage':<9}{'status':<8}{'companies':>10}{'time s':>9}{'companies/s':>13}"
+          f"{'fetches':>9}{'llm':>6}{'errors':>8}")
+    print(f"{'='*71}")
+    for name, (ok, seconds, done) in results.items():
+        fetches, calls, errors = traces.get(name, ('—', '—', '—'))
+        print(f"  {name:<9}{'ok' if ok else 'FAILED':<8}{done:>10,}{seconds:>9.1f}{done / seconds:>13.1f}"
+              f"{fetches:>9}{calls:>6}{errors:>8}")
+    print(f"{'='*71}")
+    total = sum(seconds for _, seconds, _ in results.values())
+    if total:
+        print(f"  {'end to end':<17}{n:>10,}{total:>9.1f}{n / total:>13.1f}")
+
+    def stats(counts):
+        return ', '.join(f'{v:,} {k}' for k, v in counts.items()) or 'not used'
+    print(f"\n  Web stand-in     : {web_faults.describe()}; {stats(web_stats)}")
+    print(f"  OpenAI stand-in  : {llm_faults.describe()}; {stats(llm_stats)}")
+
+
+# ── Entry point ───────────────────────────────────────────────────────────────
+def latency(spec):
+    """'80' or '80:40' (mean:jitter, ms) → (80.0, 40.0)"""
+    mean, _, jitter = spec.partition(':')
+    return float(mean), float(jitter or 0)
+
+
+def main():
+    ap  = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest='command', required=True)
+
+    synth = sub.add_parser('synth', help='build fixtures from the committed pipeline outputs')
+    synth.add_argument('--fixtures', type=Path, default=FIXTURES / 'synthetic')
+
+    rec = sub.add_parser('record', help='record real pages and model answers through the stand-ins')
+    rec.add_argument('--companies', type=int, default=25, help='companies to record (default 25)')
+    rec.add_argument('--fixtures', type=Path, default=FIXTURES / 'recorded')
+
+    run = sub.add_parser('run', help='benchmark the pipeline against the fixtures')
+    run.add_argument('--fixtures', type=Path, default=FIXTURES / 'synthetic')
+    run.add_argument('--companies', type=int, default=1000, help='companies, scaled from the master table (default 1000)')
+    run.add_argument('--stages', default=','.join(STAGES),
+                     help=f'comma-separated, from {",".join(STAGES)} (default all)')
+    run.add_argument('--latency', type=latency, default=(0, 0), metavar='MS[:JITTER]', help='web latency')
+    run.add_argument('--error-rate', type=float, default=0.0, help='share of web requests that fail')
+    run.add_argument('--llm-latency', type=latency, default=(0, 0), metavar='MS[:JITTER]', help='API latency')
+    run.add_argument('--llm-error-rate', type=float, default=0.0, help='share of API calls that fail')
+    run.add_argument('--page-kb', type=float, default=60, help='pad pages to this size (default 60; 0: off)')
+    run.add_argument('--seed', type=int, default=0, help='seed for latency and errors')
+    run.add_argument('--polite', action='store_true', help="keep the scripts' delays between requests")
+    run.add_argument('--keep', action='store_true', help='keep the scratch workspace')
+    args = ap.parse_args()
+
+    if args.command == 'synth':
+        synthesize(args.fixtures)
+    elif args.command == 'record':
+        if not os.environ.get('OPENAI_API_KEY'):
+            sys.exit('record needs OPENAI_API_KEY (the stand-in forwards to the real API)')
+        store = standin.FixtureStore(args.fixtures)
+        try:
+            bench(store, {'careers', 'enrich'}, args.companies, standin.Faults(), standin.Faults(),
+                  polite=True, record=True)
+        finally:
+            store.save()
+            print(f'Fixtures → {args.fixtures}: {len(store.web)} pages, {len(store.llm)} answers')
+    else:
+        stages  = {s.strip() for s in args.stages.split(',') if s.strip()}
+        unknown = stages - set(STAGES)
+        if unknown:
+            ap.error(f'unknown stage(s) {sorted(unknown)}; stages: {", ".join(STAGES)}')
+        if 'render' in stages and 'build' not in stages:
+            ap.error('render needs build (site_data.json is not seeded)')
+        store   = open_store(args.fixtures)
+        results = bench(store, stages, args.companies,
+                        standin.Faults(*args.latency, args.error_rate, args.seed),
+                        standin.Faults(*args.llm_latency, args.llm_error_rate, args.seed),
+                        page_kb=args.page_kb, keep=args.keep, polite=args.polite)
+        sys.exit(0 if all(ok for ok, _, _ in results.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+// Benchmark: role filtering in the Jobs tab, before vs after the id indexes.
+//
+// Runs under Node (no browser). The indexed version is the page's own filter
+// engine, so build the page first:
+//     python build_site.py && python gen_html.py
+//     node bench/roles_filter.js [path/to/cambridge_job_board.html]
+//
+// Synthetic data: 5,000 companies and 50,000 roles (same shapes as site_data.json).
+
+const path = require('path');
+const {loadEngine, bitset, statCodes, columns} = require('./page_engine');
+
+const PAGE = process.argv[2] || path.join(__dirname, '..', 'cambridge_job_board.html');
+const N_COMPANIES = 5000;
+const N_ROLES     = 50000;
+const REPEATS     = 5;
+
+// ── pre-index implementation (as renderJobs/downloadRolesCSV did it) ──
+function legacyRoles(ALL_ROLES, cos, jobQuery) {
+  const q = (jobQuery||'').toLowerCase();
+  return ALL_ROLES.filter(r => {
+    if (!cos.find(c => c.name === r.company)) return false;
+    if (q && !r.title.toLowerCase().includes(q) && !r.company.toLowerCase().includes(q)) return false;
+    return true;
+  });
+}
+function legacyOutreach(ALL_ROLES, cos) {
+  const hasRoleNames = new Set(ALL_ROLES.map(r => r.company));
+  return cos.filter(c => c.hiring === 'actively_hiring' && !hasRoleNames.has(c.name));
+}
+
+// ── synthetic dataset ──
+let seed = 42;
+const rand = () => (seed = (seed * 1103515245 + 12345) % 2147483648) / 2147483648;
+const pick = xs => xs[Math.floor(rand() * xs.length)];
+const TITLES = ['Software Engineer', 'Research Scientist', 'Data Scientist', 'Lab Technician',
+                'Product Manager', 'ML Engineer', 'Operations Lead', 'Sales Executive'];
+const VALUES = {stage: ['startup', 'scaleup', 'established', 'unknown'],
+                hiring: ['actively_hiring', 'possibly_hiring', 'no_info'], source: ['hub', 'companies_house']};
+const companies = Array.from({length: N_COMPANIES}, (_, id) => ({
+  name: `Company ${id}`, tags: [], stage: pick(VALUES.stage), hiring: pick(VALUES.hiring), source: pick(VALUES.source),
+}));
+const roles = [], role_start = [0];
+companies.forEach((c, id) => {
+  // skewed: most companies have a few roles, some have many
+  const n = id === N_COMPANIES - 1 ? N_ROLES - roles.length
+          : Math.min(N_ROLES - roles.length, Math.floor(-Math.log(1 - rand()) * N_ROLES / N_COMPANIES));
+  for (let k = 0; k < n; k++) roles.push({co: id, company: c.name, title: pick(TITLES)});
+  role_start.push(roles.length);
+});
+const facets = {sector: {}};
+for (const key of ['stage', 'hiring', 'source']) {
+  facets[key] = Object.fromEntries(VALUES[key].map(v => [v,
+    bitset(companies.flatMap((c, i) => c[key] === v ? [i] : []), N_COMPANIES)]));
+}
+
+function time(fn) {
+  let best = Infinity, out;
+  for (let r = 0; r < REPEATS; r++) {
+    const t = process.hrtime.bigint();
+    out = fn();
+    best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  return [best, out];
+}
+async function timeAsync(fn) {
+  let best = Infinity, out;
+  for (let r = 0; r < REPEATS; r++) {
+    const t = process.hrtime.bigint();
+    out = await fn();
+    best = Math.min(best, Number(process.hrtime.bigint() - t) / 1e6);
+  }
+  return [best, out];
+}
+
+(async () => {
+  const call = loadEngine(PAGE);
+  const stats = {stage: statCodes(companies, 'stage', VALUES.stage), hiring: statCodes(companies, 'hiring', VALUES.hiring)};
+  await call('init', {companies: columns(companies, roles), index: {role_start, facets, stats}, search: {t: [], p: []}});
+  const blank = {search: '', sector: '', stage: '', hiring: '', source: ''};
+  const scenarios = [
+    ['all companies',             {},                   ''],
+    ['stage=startup',             {stage: 'startup'},   ''],
+    ['startup + hub + "engineer"', {stage: 'startup', source: 'hub'}, 'engineer'],
+  ];
+  console.log(`${N_COMPANIES} companies, ${roles.length} roles (best of ${REPEATS})\n`);
+  console.log('scenario'.padEnd(28) + 'legacy ms'.padStart(12) + 'indexed ms'.padStart(12) + 'speedup'.padStart(10));
+  for (const [label, filters, q] of scenarios) {
+    const state = {...blank, ...filters};
+    const cos = companies.filter(c => Object.entries(filters).every(([k, v]) => c[k] === v));
+    const [tOld, a] = time(() => [legacyRoles(roles, cos, q), legacyOutreach(roles, cos)]);
+    const [tNew, b] = await timeAsync(() => call('filter', {state, jobQuery: q}).then(r => r.result.jobs));
+    if (a[0].length !== b.roles.length || a[1].length !== b.outreach.length) {
+      throw new Error(`${label}: results differ (${a[0].length}/${a[1].length} vs ${b.roles.length}/${b.outreach.length})`);
+    }
+    console.log(label.padEnd(28) + tOld.toFixed(1).padStart(12) + tNew.toFixed(2).padStart(12) +
+                `${(tOld / tNew).toFixed(0)}×`.padStart(10));
+  }
+  console.log('\n(indexed = the whole filter request: company ids, facet counts, roles and outreach)');
+})();
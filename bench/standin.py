@@ -0,0 +1,323 @@
+"""
+Fixture store and local stand-in servers for the offline pipeline benchmark
+(bench/pipeline_bench.py).
+
+FixtureStore holds web pages and model responses, in <dir>/web.jsonl.gz and
+<dir>/llm.jsonl.gz:
+
+    web: {key, status, content_type, body}     key: host/path, no scheme or www.
+    llm: {key, kind, company, response}        key: hash of model + messages;
+                                               kind: careers | enrich | other
+
+WebStandIn is an HTTP forward proxy: with HTTP_PROXY pointing at it, the
+scripts' requests.get('http://host/path') is answered from the store (404 if
+the page is not in it). OpenAIStandIn answers POST /v1/chat/completions with
+OPENAI_BASE_URL pointing at it: the exact request if it was recorded, else a
+recorded answer for the same company and prompt kind, else a synthesized one.
+Both add the latency and errors of a Faults, and in record mode fetch what
+they are asked for from the real site / API and store it.
+
+Scaled copies of a company (pipeline_bench.py --companies) are served the
+original's fixtures: host aliases 'k<n>--' and name suffixes ' ~<n>' are
+dropped before the lookup.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ALIAS_RE   = re.compile(r'^k\d+--')      # host alias of a scaled copy
+SUFFIX_RE  = re.compile(r' ~\d+$')       # name suffix of a scaled copy
+COMPANY_RE = re.compile(r'^Company(?: name)?: (.+)$', re.M)
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36'
+OPENAI_URL = 'https://api.openai.com/v1/chat/completions'
+
+# Markup the pages are padded with to --page-kb (stripped by the scripts' parsers)
+FILLER = ('<script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments)}</script>\n'
+          '<style>.nav a{padding:0 12px;color:#334}.footer{font-size:12px}</style>\n'
+          '<footer class="footer"><a href="/privacy">Privacy</a> <a href="/terms">Terms</a></footer>\n')
+
+
+# ── Fixture store ─────────────────────────────────────────────────────────────
+def page_key(url):
+    """'https://www.Example.com/jobs/' and 'http://k3--example.com/jobs' → 'example.com/jobs'"""
+    p = urlsplit(url if '://' in url else 'http://' + url)
+    host = ALIAS_RE.sub('', p.netloc.lower())
+    host = host[4:] if host.startswith('www.') else host
+    return host + p.path.rstrip('/') + (f'?{p.query}' if p.query else '')
+
+
+def prompt_of(request):
+    return request['messages'][-1]['content']
+
+
+def llm_keys(request):
+    """(exact key, (kind, company)) of a chat completion request."""
+    prompt = prompt_of(request)
+    exact  = hashlib.sha256(json.dumps([request.get('model'), request['messages']],
+                                       sort_keys=True).encode('utf-8')).hexdigest()
+    kind   = ('careers' if '"has_careers_page"' in prompt else
+              'enrich'  if '"sector_tags"' in prompt else 'other')
+    m = COMPANY_RE.search(prompt)
+    return exact, (kind, SUFFIX_RE.sub('', m[1].strip()) if m else None)
+
+
+def _read_jsonl(path):
+    if not path.exists():
+        return []
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def _write_jsonl(path, records):
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        for r in records:
+            f.write(json.dumps(r, ensure_ascii=False) + '\n')
+
+
+class FixtureStore:
+    """Web pages and model responses, recorded or synthesized."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.web  = {r['key']: r for r in _read_jsonl(self.path / 'web.jsonl.gz')}
+        self.llm  = {r['key']: r for r in _read_jsonl(self.path / 'llm.jsonl.gz')}
+        self.by_company = {(r['kind'], r['company']): r for r in self.llm.values()}
+        self.lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.web or self.llm)
+
+    def add_page(self, url, status, content_type, body):
+        with self.lock:
+            key = page_key(url)
+            self.web[key] = dict(key=key, status=status, content_type=content_type, body=body)
+
+    def add_answer(self, kind, company, response, key=None):
+        """response: a chat completion, or just the JSON its message should contain (synthesized)."""
+        rec = dict(key=key or f'{kind}:{company}', kind=kind, company=company, response=response)
+        with self.lock:
+            self.llm[rec['key']] = rec
+            self.by_company[(kind, company)] = rec
+
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        _write_jsonl(self.path / 'web.jsonl.gz', self.web.values())
+        _write_jsonl(self.path / 'llm.jsonl.gz', self.llm.values())
+
+
+# ── Faults ────────────────────────────────────────────────────────────────────
+class Faults:
+    """
+    Injected latency (ms, uniform ± jitter) and errors, reproducible: the draw
+    for a request depends only on the seed, its key and how often it was made.
+    """
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=0):
+        self.latency_ms, self.jitter_ms, self.error_rate, self.seed = latency_ms, jitter_ms, error_rate, seed
+        self.attempts = Counter()
+        self.lock = threading.Lock()
+
+    def apply(self, key):
+        """Sleep for the request's latency; True if it should fail."""
+        with self.lock:
+            self.attempts[key] += 1
+            rng = random.Random(f'{self.seed}:{key}:{self.attempts[key]}')
+        delay = self.latency_ms + (rng.uniform(-1, 1) * self.jitter_ms if self.jitter_ms else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return rng.random() < self.error_rate
+
+    def describe(self):
+        jitter = f'±{self.jitter_ms:g}' if self.jitter_ms else ''
+        return f'{self.latency_ms:g}{jitter} ms, {100 * self.error_rate:g}% errors'
+
+
+# ── Servers ───────────────────────────────────────────────────────────────────
+class _StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, store, faults, record=False):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.store, self.faults, self.record = store, faults, record
+        self.stats = Counter()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, what):
+        with self.store.lock:
+            self.stats[what] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status, body, content_type):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def drop(self):
+        """An injected connection reset: close without answering."""
+        self.close_connection = True
+
+
+class _WebHandler(_Handler):
+    def do_GET(self):
+        srv = self.server
+        url = self.path if '://' in self.path else f'http://{self.headers["Host"]}{self.path}'
+        key = page_key(url)
+        srv.count('requests')
+        if srv.faults.apply(key):
+            srv.count('errors injected')
+            return self.drop() if srv.stats['errors injected'] % 2 else self.reply(503, 'Service Unavailable', 'text/plain')
+        page = srv.store.web.get(key)
+        if page is None and srv.record:
+            page = self.fetch_upstream(url)
+        if page is None:
+            srv.count('not in fixtures')
+            return self.reply(404, 'Not Found', 'text/plain')
+        srv.count('served')
+        body = page['body']
+        if srv.page_bytes and page['status'] == 200 and len(body) < srv.page_bytes:
+            body = body.replace('</body>', FILLER * ((srv.page_bytes - len(body)) // len(FILLER) + 1) + '</body>', 1)
+        self.reply(page['status'], body, page['content_type'])
+
+    def fetch_upstream(self, url):
+        """Fetch the real page (https first) and store it; failures are stored as 502s."""
+        path = url.split('://', 1)[1]
+        status, content_type, body = 502, 'text/plain', 'unreachable'
+        for scheme in ('https', 'http'):
+            req = urllib.request.Request(f'{scheme}://{path}', headers={'User-Agent': USER_AGENT})
+            try:
+                with urllib.request.urlopen(req, timeout=12) as resp:
+                    content_type = resp.headers.get('Content-Type', 'text/html')
+                    charset = resp.headers.get_content_charset() or 'utf-8'
+                    status, body = resp.status, resp.read().decode(charset, errors='replace')
+                break
+            except urllib.error.HTTPError as e:
+                status, content_type, body = e.code, 'text/plain', e.reason
+                break
+            except Exception:
+                continue
+        if 'charset' not in content_type and content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        self.server.store.add_page(url, status, content_type, body)
+        self.server.count('recorded')
+        return self.server.store.web[page_key(url)]
+
+
+class WebStandIn(_StandIn):
+    """Forward proxy serving pages from the store; page_kb pads pages to a realistic size."""
+
+    def __init__(self, store, faults, record=False, page_kb=0):
+        super().__init__(_WebHandler, store, faults, record)
+        self.page_bytes = int(page_kb * 1024)
+
+
+def completion(content, request):
+    """A chat completion wrapping content, with token counts estimated at 4 characters a token."""
+    prompt = prompt_of(request)
+    return {'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': request.get('model', 'gpt-4o-mini'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': content}}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(content) // 4,
+                      'total_tokens': (len(prompt) + len(content)) // 4}}
+
+
+def synthetic_answer(kind, company):
+    """A plausible answer for a company the store has nothing for."""
+    if kind == 'careers':
+        return {'has_careers_page': False, 'roles': [], 'contact_email': None, 'apply_url': None,
+                'summary': 'No open roles found.'}
+    return {'description': f'{company} is a Cambridge technology company.', 'sector_tags': ['software'],
+            'stage': 'unknown', 'tech_keywords': '', 'employee_est': 'unknown',
+            'hiring_status': 'no_info', 'founded_year': None, 'hq_city': 'Cambridge'}
+
+
+class _OpenAIHandler(_Handler):
+    def do_POST(self):
+        srv = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        if not self.path.rstrip('/').endswith('/chat/completions') or 'messages' not in request:
+            return self.reply(404, json.dumps({'error': {'message': 'not found'}}), 'application/json')
+        exact, (kind, company) = llm_keys(request)
+        srv.count('calls')
+        if srv.faults.apply(exact):
+            srv.count('errors injected')
+            status = 429 if srv.stats['errors injected'] % 2 else 500
+            return self.reply(status, json.dumps({'error': {'message': 'injected', 'type': 'bench'}}),
+                              'application/json')
+        rec = srv.store.llm.get(exact)
+        if rec is not None:
+            srv.count('exact match')
+        elif srv.record:
+            rec = self.forward(request)
+            if rec is None:
+                return self.reply(502, json.dumps({'error': {'message': 'upstream failed'}}), 'application/json')
+        elif (kind, company) in srv.store.by_company:
+            rec = srv.store.by_company[(kind, company)]
+            srv.count('same company')
+        else:
+            srv.count('synthesized')
+            rec = dict(response=synthetic_answer(kind, SUFFIX_RE.sub('', company or 'The company')))
+        response = rec['response']
+        if 'choices' not in response:   # synthesized fixtures hold just the message's JSON
+            response = completion(json.dumps(response), request)
+        self.reply(200, json.dumps(response), 'application/json')
+
+    def forward(self, request):
+        """Ask the real API (OPENAI_API_KEY) and store the answer."""
+        req = urllib.request.Request(OPENAI_URL, data=json.dumps(request).encode('utf-8'), headers={
+            'Content-Type': 'application/json', 'Authorization': f'Bearer {self.server.api_key}'})
+        try:
+            with urllib.request.urlopen(req, timeout=120) as resp:
+                response = json.loads(resp.read())
+        except Exception:
+            self.server.count('upstream errors')
+            return None
+        exact, (kind, company) = llm_keys(request)
+        self.server.store.add_answer(kind, company, response, key=exact)
+        self.server.count('recorded')
+        return dict(response=response)
+
+
+class OpenAIStandIn(_StandIn):
+    """OpenAI-compatible chat completions from the store (record: via the real API)."""
+
+    def __init__(self, store, faults, record=False):
+        super().__init__(_OpenAIHandler, store, faults, record)
+        self.api_key = os.environ.get('OPENAI_API_KEY', '') if record else ''
+
+    @property
+    def url(self):
+        return super().url + '/v1'
@@ -1,44 +1,69 @@
-import json, re, random, math
+"""
+Build site_data.json from pipeline/output/final_companies.csv: load → build → save.
+
+    python build_site.py [--incremental]
+
+or in-process (the notebook's rebuild_site), with the inputs and the
+per-company records kept warm between runs:
+
+    import build_site, gen_html
+    site = build_site.run(incremental=True)   # also writes site_data.json
+    gen_html.render(site)
+"""
+
+import json, re, random, math, hashlib, sys, base64
 import pandas as pd
 from pathlib import Path
 from collections import Counter
 from datetime import date
 
-random.seed(42)
 # BASE is the directory containing this script, so it works from any machine
 BASE = Path(__file__).resolve().parent
-df   = pd.read_csv(BASE / 'pipeline/output/final_companies.csv')
+sys.path.insert(0, str(BASE / 'pipeline'))
+import storage   # typed Parquet/CSV loader shared with the pipeline scripts
+import geo       # postcode lookup + k-d tree for radius queries
+
+MASTER_CSV     = BASE / 'pipeline/output/final_companies.csv'
+SITE_DATA_PATH = BASE / 'site_data.json'
+CACHE_PATH     = BASE / 'pipeline/output/.site_build_cache.json'
+
+# ── Inputs ────────────────────────────────────────────────────────────────────
+# Kept per process and re-read only when a file's size or mtime changes, so an
+# in-process rebuild after a small edit skips the CSV/Parquet parse.
+_INPUTS = {}   # name → (file signature, value)
+
+def _signature(*paths):
+    return tuple((p.stat().st_mtime_ns, p.stat().st_size) if p.exists() else None for p in paths)
+
+def _cached(name, paths, loader):
+    sig = _signature(*paths)
+    if name not in _INPUTS or _INPUTS[name][0] != sig:
+        _INPUTS[name] = (sig, loader())
+    return _INPUTS[name][1]
+
+def load():
+    """(companies DataFrame, geocodes {postcode: {lat, lon}}) for a build."""
+    df = _cached('companies', [MASTER_CSV, storage.parquet_path(MASTER_CSV)],
+                 lambda: storage.load_table(MASTER_CSV))
+    geocodes = _cached('geocodes', [BASE / 'pipeline/output' / f for f in ('geocodes_a.json', 'geocodes_b.json')],
+                       lambda: geo.load_geocodes(BASE))
+    return df, geocodes   # build() only reads them
 
 # ── Postcode → (lat, lng) lookup — real geocoded coordinates ─────────────────
-def _load_geocodes():
-    gc = {}
-    for fname in ['geocodes_a.json', 'geocodes_b.json']:
-        p = BASE / 'pipeline/output' / fname
-        if p.exists():
-            with open(p) as f:
-                gc.update(json.load(f))
-    return gc
-
-GEOCODES = _load_geocodes()   # {postcode: {lat, lon}}  (some lon values may be null)
-
-# Outward-code centroids used only as final fallback for companies with no full postcode.
-# These are rough geographic centres for each CB postcode district.
-# For precise pin placement run geocode_postcodes.py (requires internet) to populate geocodes_a.json.
-OUTWARD_CENTRES = {
-    'CB1':  (52.2020, 0.1300),  # Cambridge city centre / Hills Road / Mill Road
-    'CB2':  (52.1980, 0.1200),  # Central / south Cambridge / Trumpington
-    'CB3':  (52.2040, 0.0960),  # West Cambridge / Newnham / Grange Road
-    'CB4':  (52.2280, 0.1310),  # North Cambridge / Science Park / Chesterton
-    'CB5':  (52.2140, 0.1870),  # East Cambridge / Fen Ditton
-    'CB21': (52.1020, 0.2220),  # Granta Park / Great Abington / Linton
-    'CB22': (52.1340, 0.1860),  # Babraham / Great Shelford / Sawston
-    'CB23': (52.1980, 0.0460),  # West / Comberton / Cambourne / Barton
-    'CB24': (52.2880, 0.1130),  # North / Milton / Cottenham / Longstanton
-    'CB25': (52.2830, 0.2720),  # Northeast / Burwell / Swaffham Prior
-}
-CAM_CENTRE = (52.2054, 0.1132)
-
-def postcode_latlon(pc):
+# The geocode files, district centroids and postcode parsing live in geo.py
+# (shared with the notebook's radius queries).
+OUTWARD_CENTRES = geo.OUTWARD_CENTRES
+CAM_CENTRE      = geo.CAM_CENTRE
+
+def company_rng(key):
+    """
+    Random stream seeded from a stable hash of the company identity, so each
+    company's jitter depends only on its own data (not on row order).
+    """
+    digest = hashlib.sha1(str(key).encode('utf-8')).digest()
+    return random.Random(int.from_bytes(digest[:8], 'big'))
+
+def postcode_latlon(pc, rng, geocodes):
     """
     Returns (lat, lon, is_real_geocode).
     is_real_geocode=True  → exact coords from geocodes_a/b.json
@@ -49,55 +74,69 @@ def postcode_latlon(pc):
         return None, None, False
     pc_norm = pc.strip().upper()
     # 1) Real geocoded lookup
-    entry = GEOCODES.get(pc_norm)
+    entry = geocodes.get(pc_norm)
     if entry and entry.get('lat') is not None and entry.get('lon') is not None:
         return entry['lat'], entry['lon'], True
     # 2) Outward-code centroid fallback (approximate)
     outer = pc_norm.split()[0]
     if outer in OUTWARD_CENTRES:
         lat, lon = OUTWARD_CENTRES[outer]
-        return round(lat + random.gauss(0, 0.003), 5), \
-               round(lon + random.gauss(0, 0.004), 5), False
+        return round(lat + rng.gauss(0, 0.003), 5), \
+               round(lon + rng.gauss(0, 0.004), 5), False
     return None, None, False
 
-print(f"Geocodes loaded: {len(GEOCODES)} postcodes ({sum(1 for v in GEOCODES.values() if v.get('lat') is not None)} with real coords)")
+# ── Row fingerprints (for --incremental) ──────────────────────────────────────
+# A row's fingerprint covers its raw CSV values, the geocode entry for its
+# postcode and the source of this script (and of the loader), so editing any of
+# them invalidates it.
+BUILD_VERSION = hashlib.sha1(Path(__file__).read_bytes() +
+                             Path(storage.__file__).read_bytes() +
+                             Path(geo.__file__).read_bytes()).hexdigest()[:12]
+
+def row_fingerprint(raw, geocodes):
+    pc = raw.get('postcode')
+    gc = geocodes.get(pc.strip().upper()) if isinstance(pc, str) else None
+    payload = repr((BUILD_VERSION, tuple(raw), tuple(raw.values()), gc))   # columns in CSV order
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
 
-# ── Clean & prepare data ──────────────────────────────────────────────────────
-def parse_tags(t):
-    if pd.isna(t): return []
-    try: return json.loads(t)
-    except: return [str(t)] if t else []
+def records(df):
+    """df's rows as dicts; one tolist() per column is far cheaper than iterrows()/to_dict()."""
+    cols = list(df.columns)
+    return [dict(zip(cols, vals)) for vals in zip(*(df[c].tolist() for c in cols))]
 
-def parse_roles(r):
-    if pd.isna(r): return []
+_ROWS = {}   # the last build's records by fingerprint, for in-process --incremental
+
+def load_row_cache():
+    """Per-company records of the last build: this process's, else the cache file's."""
+    if _ROWS:
+        return _ROWS
+    if not CACHE_PATH.exists():
+        return {}
     try:
-        roles = json.loads(r)
-        return roles if isinstance(roles, list) else []
-    except: return []
-
-df['has_url']          = df['has_url'].fillna(False).astype(bool)
-df['ch_validated']     = df['ch_validated'].fillna(False).astype(bool)
-df['has_careers_page'] = df['has_careers_page'].fillna(False)
-df['has_careers_page'] = df['has_careers_page'].astype(str).str.lower().isin(['true','1'])
-df['role_count']       = df['role_count'].fillna(0).astype(int)
-df['description']      = df['description'].fillna('')
-df['stage']            = df['stage'].fillna('unknown')
-df['hiring_status']    = df['hiring_status'].fillna('no_info')
-df['employee_est']     = df['employee_est'].fillna('unknown')
-df['tech_keywords']    = df['tech_keywords'].fillna('')
-if 'careers_summary' not in df.columns:
-    df['careers_summary'] = ''
-df['careers_summary']  = df['careers_summary'].fillna('')
-df['tags_list']        = df['sector_tags'].apply(parse_tags)
-df['roles_list']       = df['roles_json'].apply(parse_roles)
-
-# Build JS records
-companies, roles_list = [], []
-for _, r in df.iterrows():
-    lat, lon, is_real = postcode_latlon(r.get('postcode'))
+        with open(CACHE_PATH, encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('rows', {}) if cache.get('version') == BUILD_VERSION else {}
+
+def save_row_cache(rows):
+    global _ROWS
+    _ROWS = rows
+    with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(dict(version=BUILD_VERSION, rows=rows), ensure_ascii=False))
+
+# ── Build JS records ──────────────────────────────────────────────────────────
+def build_company(r, geocodes):
+    """Derive the JS record and the roles (title, type, location) for one row."""
+    # storage.load_table() has already typed the booleans, enums (with their
+    # 'unknown'/'no_info' defaults) and the sector_tags/roles_json list columns
+    desc = r['description'] if isinstance(r['description'], str) else ''
+    tech = r['tech_keywords'] if isinstance(r['tech_keywords'], str) else ''
+    rng  = company_rng(r['company_id'])
+    lat, lon, is_real = postcode_latlon(r.get('postcode'), rng, geocodes)
     if lat is None:      # no postcode: scatter loosely around Cambridge centre
-        lat = round(CAM_CENTRE[0] + random.gauss(0, 0.006), 5)
-        lon = round(CAM_CENTRE[1] + random.gauss(0, 0.007), 5)
+        lat = round(CAM_CENTRE[0] + rng.gauss(0, 0.006), 5)
+        lon = round(CAM_CENTRE[1] + rng.gauss(0, 0.007), 5)
         loc_approx = True
     else:
         # loc_approx=True for both no-postcode scatter AND outward-code estimates
@@ -105,11 +144,10 @@ for _, r in df.iterrows():
         loc_approx = not is_real
 
     # Companies House profile URL — generated from company_number when available
-    co_num = str(r.get('company_number','') or '').strip().replace('.0','')
+    co_num = r.get('company_number')
     ch_profile_url = (
         f'https://find-and-update.company-information.service.gov.uk/company/{co_num}'
-        if co_num and co_num.lower() not in ('nan','')
-        else ''
+        if pd.notna(co_num) else ''
     )
 
     rec = dict(
@@ -117,11 +155,11 @@ for _, r in df.iterrows():
         url        = str(r['url']) if pd.notna(r.get('url')) and str(r.get('url')) not in ('nan','') else '',
         source     = r.get('source',''),
         hub        = str(r['hub_name']) if pd.notna(r.get('hub_name')) else '',
-        desc       = r['description'][:280] if r['description'] else '',
-        tags       = r['tags_list'],
-        tags_str   = ', '.join(r['tags_list']),
+        desc       = desc[:280],
+        tags       = r['sector_tags'],
+        tags_str   = ', '.join(r['sector_tags']),
         stage      = r['stage'],
-        employees  = r['employee_est'].replace('unknown','?'),
+        employees  = r['employee_est'].replace('unknown', EMP_UNKNOWN),
         hiring     = r['hiring_status'],
         ch         = bool(r['ch_validated']),
         ch_url     = ch_profile_url,
@@ -130,118 +168,154 @@ for _, r in df.iterrows():
         founded    = int(r['founded_year']) if pd.notna(r.get('founded_year')) else None,
         careers_url= str(r['careers_url']) if pd.notna(r.get('careers_url')) and str(r.get('careers_url')) not in ('nan','') else '',
         has_careers= bool(r['has_careers_page']),
-        roles      = r['roles_list'],
         contact    = str(r['contact_email']) if pd.notna(r.get('contact_email')) else '',
-        tech       = r['tech_keywords'],
+        tech       = tech,
         lat        = lat, lon = lon, loc_approx = loc_approx,
     )
-    companies.append(rec)
-
-    # Flatten roles for jobs tab
-    for role in r['roles_list']:
-        roles_list.append(dict(
-            company    = r['company_name'],
-            url        = rec['url'],
-            careers_url= rec['careers_url'],
-            tags       = rec['tags'],
-            stage      = rec['stage'],
-            title      = role.get('title',''),
-            type_      = role.get('type','unknown'),
-            location   = role.get('location','Cambridge'),
-        ))
-
-# Stats
-all_tags     = [t for c in companies for t in c['tags']]
-tag_counts   = Counter(all_tags).most_common(14)
-stage_counts = Counter(c['stage'] for c in companies)
-hire_counts  = Counter(c['hiring'] for c in companies)
-all_sectors  = sorted(set(all_tags))
-LAST_UPDATED = date.today().strftime('%-d %B %Y')
-
-# Chart data
-tag_labels = [t[0] for t in tag_counts]
-tag_vals   = [t[1] for t in tag_counts]
-stage_ord  = ['startup','scaleup','established','unknown']
-stage_vals = [stage_counts.get(s,0) for s in stage_ord]
-hire_keys  = ['actively_hiring','possibly_hiring','no_info']
-hire_vals  = [hire_counts.get(k,0) for k in hire_keys]
-emp_ord    = ['1-10','11-50','51-200','200-1000','1000+','unknown']
-emp_counts = Counter(c['employees'] for c in companies)
-emp_vals   = [emp_counts.get(e,0) for e in emp_ord]
-
-sector_opts = '\n'.join(f'<option value="{s}">{s}</option>' for s in all_sectors)
-
-# ── Table rows HTML ───────────────────────────────────────────────────────────
-SECTOR_COLS = {
-    'biotech':'#2d6a4f','pharma':'#1b4332','medtech':'#40916c',
-    'diagnostics':'#52b788','genomics':'#74c69d','drug discovery':'#095d40',
-    'AI/ML':'#023e8a','deep learning':'#0077b6','computer vision':'#0096c7',
-    'NLP':'#00b4d8','data analytics':'#48cae4',
-    'SaaS':'#7b2d8b','developer tools':'#9b59b6','software':'#6c3483',
-    'hardware':'#d4380d','semiconductors':'#fa541c','photonics':'#ff7a45',
-    'robotics':'#e67e22','IoT':'#f39c12',
-    'quantum computing':'#1a1a2e','space':'#16213e','defence':'#0f3460',
-    'cleantech':'#2e7d32','climate':'#388e3c','agritech':'#558b2f',
-    'foodtech':'#689f38','healthtech':'#00695c','fintech':'#1565c0',
-    'edtech':'#6a1b9a','cybersecurity':'#b71c1c',
-    'consulting':'#37474f','research':'#455a64',
-}
-def sector_badge(tag):
-    col = SECTOR_COLS.get(tag,'#607d8b')
-    return f'<span class="badge" style="background:{col}">{tag}</span>'
-
-rows_html = []
-for c in companies:
-    name_cell = f'<a href="{c["url"]}" target="_blank" class="co-link">{c["name"]}</a>' if c['url'] else c['name']
-    tags_html = ' '.join(sector_badge(t) for t in c['tags'][:3])
-    stage_cls = {'startup':'info','scaleup':'primary','established':'dark','unknown':'secondary'}.get(c['stage'],'secondary')
-    hire_cls  = {'actively_hiring':'success','possibly_hiring':'warning','no_info':'secondary'}.get(c['hiring'],'secondary')
-    hire_lbl  = {'actively_hiring':'Hiring','possibly_hiring':'Possibly','no_info':'?'}.get(c['hiring'],'?')
-    jobs_lnk  = f'<a href="{c["careers_url"]}" target="_blank" class="btn btn-xs btn-outline-success">Jobs↗</a>' if c['careers_url'] else ''
-    src_lbl   = 'Hub' if c['source']=='hub' else 'CH'
-    src_cls   = 'primary' if c['source']=='hub' else 'secondary'
-    # Companies House profile link — shown as small CH badge/link if available
-    ch_lnk    = (f'<a href="{c["ch_url"]}" target="_blank" title="Companies House profile" '
-                 f'class="text-muted small">CH↗</a>'
-                 if c.get('ch_url') else '')
-    rows_html.append(
-        f'<tr data-tags="{c["tags_str"]}" data-stage="{c["stage"]}" '
-        f'data-hiring="{c["hiring"]}" data-source="{c["source"]}">'
-        f'<td>{name_cell}'
-        f'<br><small class="text-muted">{c["desc"][:100]}{"…" if len(c["desc"])>100 else ""}</small></td>'
-        f'<td class="nowrap">{tags_html}</td>'
-        f'<td><span class="badge bg-{stage_cls}">{c["stage"]}</span></td>'
-        f'<td class="text-center small">{c["employees"]}</td>'
-        f'<td class="text-center"><span class="badge bg-{hire_cls}">{hire_lbl}</span></td>'
-        f'<td class="text-center">{jobs_lnk}</td>'
-        f'<td class="text-center">{ch_lnk}</td>'
-        f'<td class="text-center"><span class="badge bg-{src_cls} opacity-75">{src_lbl}</span></td>'
-        f'</tr>'
+
+    # Roles for the jobs tab; the company's fields are not copied in, the page
+    # joins them back through index.role_start
+    roles = [dict(title    = role.get('title',''),
+                  type     = role.get('type','unknown'),
+                  location = role.get('location','Cambridge'))
+             for role in r['roles_json']]
+    return rec, roles
+
+# Id indexes for the page (ids are positions in companies / roles)
+def bitset(ids, n):
+    """Company ids → base64 bitset (bit i of little-endian 32-bit word i//32)."""
+    buf = bytearray((n + 31) // 32 * 4)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return base64.b64encode(bytes(buf)).decode('ascii')
+
+FACET_FIELDS = dict(sector='tags', stage='stage', hiring='hiring', source='source')
+
+# Chart buckets. Team sizes are keyed the way the records show them, with
+# employee_est 'unknown' as '?', so the '?' bar counts those companies (keyed
+# 'unknown' it was always empty). Sectors with equal counts rank
+# alphabetically, as the page ranks them when it recounts under filters.
+EMP_UNKNOWN = '?'
+EMP_ORDER   = ['1-10','11-50','51-200','200-1000','1000+',EMP_UNKNOWN]
+TOP_SECTORS = 14
+
+# Per-company stat codes (position in `values`), so the page can recount the
+# hero pills and charts for the filtered companies in one typed-array pass
+def stat_codes(companies, field, values):
+    pos = {v: i for i, v in enumerate(values)}
+    codes = bytes(pos.get(c[field], len(values) - 1) for c in companies)
+    return dict(values=values, codes=base64.b64encode(codes).decode('ascii'))
+
+# ── Transform ─────────────────────────────────────────────────────────────────
+def build(df, geocodes, cache=None):
+    """
+    The site data for the companies in df: (site, rows), where site is what
+    site_data.json holds and rows the per-company records by row fingerprint.
+    With a cache (an earlier build's rows), rows whose fingerprint is in it are
+    reused; every row is still fingerprinted and the stats and indexes are
+    rebuilt from all the records, so that part of the cost stays.
+    """
+    rows = {}
+    companies, roles_list = [], []
+    role_start = [0]   # roles of company i are roles_list[role_start[i]:role_start[i+1]]
+    hits = 0
+    for raw in records(df):
+        fp = row_fingerprint(raw, geocodes)
+        if cache and fp in cache:
+            entry = cache[fp]
+            hits += 1
+        else:
+            rec, roles = build_company(raw, geocodes)
+            entry = dict(rec=rec, roles=roles)
+        rows[fp] = entry
+        companies.append(entry['rec'])
+        roles_list.extend(entry['roles'])
+        role_start.append(len(roles_list))
+    if cache is not None:
+        print(f'Incremental build: {hits} cached, {len(df) - hits} recomputed')
+
+    # Stats
+    all_tags     = [t for c in companies for t in c['tags']]
+    tag_counts   = sorted(Counter(all_tags).items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_SECTORS]
+    stage_counts = Counter(c['stage'] for c in companies)
+    hire_counts  = Counter(c['hiring'] for c in companies)
+    all_sectors  = sorted(set(all_tags))
+
+    # Chart data
+    tag_labels = [t[0] for t in tag_counts]
+    tag_vals   = [t[1] for t in tag_counts]
+    stage_ord  = ['startup','scaleup','established','unknown']
+    stage_vals = [stage_counts.get(s,0) for s in stage_ord]
+    hire_keys  = ['actively_hiring','possibly_hiring','no_info']
+    hire_vals  = [hire_counts.get(k,0) for k in hire_keys]
+    emp_ord    = EMP_ORDER
+    emp_counts = Counter(c['employees'] for c in companies)
+    emp_vals   = [emp_counts.get(e,0) for e in emp_ord]
+
+    facet_ids = {facet: {} for facet in FACET_FIELDS}
+    for i, c in enumerate(companies):
+        for facet, field in FACET_FIELDS.items():
+            for v in (c[field] if field == 'tags' else [c[field]]):
+                facet_ids[facet].setdefault(v, []).append(i)
+
+    # Radius queries: a k-d tree over the companies with a postcode, placed at
+    # its geocode (else its district centre, flagged inexact) as in
+    # geo.CompanyLocator, not at their jittered map pins; and the postcodes the
+    # page can resolve (exact geocodes, else the district centre)
+    points = [geo.postcode_point(pc, geocodes) for pc in df['postcode']]
+    kdtree = geo.KDTree([(i, p[0], p[1]) for i, p in enumerate(points) if p])
+    places = {pc: [v['lat'], v['lon']] for pc, v in sorted(geocodes.items())
+              if v.get('lat') is not None and v.get('lon') is not None}
+    places.update({outer: list(centre) for outer, centre in OUTWARD_CENTRES.items()})
+
+    stat_fields = dict(stage=stage_ord, hiring=hire_keys, employees=emp_ord, ch=[False, True])
+    index = dict(
+        role_start=role_start,   # company → role ids (contiguous range)
+        facets={facet: {v: bitset(ids, len(companies)) for v, ids in sorted(vals.items())}
+                for facet, vals in facet_ids.items()},
+        kd=[[i, lat, lon, int(points[i][2])] for i, lat, lon in kdtree.nodes],   # see geo.KDTree
+        places=places,
+        stats={field: stat_codes(companies, field, values) for field, values in stat_fields.items()},
+    )
+
+    stats = dict(
+        total=len(companies), hiring=hire_counts.get('actively_hiring',0),
+        startups=stage_counts.get('startup',0), scaleups=stage_counts.get('scaleup',0),
+        ch_verified=sum(1 for c in companies if c['ch']),
+        sectors=len(all_sectors), roles=len(roles_list),
+        tag_labels=tag_labels, tag_vals=tag_vals,
+        stage_vals=stage_vals, hire_vals=hire_vals,
+        emp_vals=emp_vals,
     )
-table_rows = '\n'.join(rows_html)
-
-# ── Write out JSON for JS embedding ──────────────────────────────────────────
-co_json    = json.dumps(companies, ensure_ascii=False)
-roles_json = json.dumps(roles_list, ensure_ascii=False)
-stats_json = json.dumps(dict(
-    total=len(companies), hiring=hire_counts.get('actively_hiring',0),
-    startups=stage_counts.get('startup',0), scaleups=stage_counts.get('scaleup',0),
-    ch_verified=sum(1 for c in companies if c['ch']),
-    sectors=len(all_sectors), roles=len(roles_list),
-    tag_labels=tag_labels, tag_vals=tag_vals,
-    stage_vals=stage_vals, hire_vals=hire_vals,
-    emp_vals=emp_vals,
-))
-
-print(f'Companies: {len(companies)}, Roles: {len(roles_list)}')
-print(f'Sector options: {len(all_sectors)}')
-print('Data ready.')
-
-# Save intermediate JSON for use in next script (same directory as this script)
-SITE_DATA_PATH = BASE / 'site_data.json'
-with open(SITE_DATA_PATH,'w') as f:
-    json.dump(dict(companies=companies, roles=roles_list,
-                   sector_opts=sector_opts, table_rows=table_rows,
-                   stats_json=stats_json, co_json=co_json,
-                   roles_json=roles_json, last_updated=LAST_UPDATED), f)
-print(f'Saved {SITE_DATA_PATH}')
+
+    print(f'Companies: {len(companies)}, Roles: {len(roles_list)}')
+    print(f'Sector options: {len(all_sectors)}')
+    site = dict(companies=companies, roles=roles_list, index=index,
+                sectors=all_sectors, stats=stats,
+                last_updated=date.today().strftime('%-d %B %Y'))
+    return site, rows
+
+# ── Output ────────────────────────────────────────────────────────────────────
+def save(site, path=SITE_DATA_PATH):
+    """
+    Save the intermediate JSON that gen_html.py renders. Each datum is stored
+    once; gen_html.py derives the JS literals, <option> list and table-row HTML
+    from it.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(site, ensure_ascii=False))
+    print(f'Saved {path}')
+
+def run(incremental=False):
+    """load → build → save; returns the site data. incremental: reuse unchanged rows."""
+    df, geocodes = load()
+    print(f"Geocodes loaded: {len(geocodes)} postcodes ({sum(1 for v in geocodes.values() if v.get('lat') is not None)} with real coords)")
+    site, rows = build(df, geocodes, load_row_cache() if incremental else None)
+    print('Data ready.')
+    save(site)
+    save_row_cache(rows)   # for the next incremental build
+    return site
+
+if __name__ == '__main__':
+    # --incremental: reuse per-company records from the last build for unchanged rows
+    run(incremental='--incremental' in sys.argv[1:])
@@ -0,0 +1,99 @@
+"""
+Columnar encoding of the companies and their roles, as the board ships them
+(used by gen_html.py; the page's decodeColumnar() rebuilds the records).
+
+site_data.json keeps one object per company and per role, which repeats
+every key and spells out every categorical. Here each field is one column
+instead:
+
+  {v, n,
+   text:  {field: [str] * n}                      free text, as is, less ...
+   prefix:{field: str}                            ... a prefix all its non-empty
+                                                  values share (URL stems)
+   cat:   {field: {values: [str], codes: b64}}    dictionary-coded categoricals
+   tags:  {values: [str], start: b64 u32 * (n + 1), codes: b64}
+                                                  company i's tags are
+                                                  codes[start[i]:start[i+1]]
+   num:   {lat, lon: b64 i32 (degrees * 1e6), founded: b64 i16 (0 = unknown)}
+   flags: b64 u8 * n                              bits, see FLAGS
+   roles: {n, co: b64 u32 (company index), title: [str], type: cat, location: cat}}
+
+Codes are one byte per row, two when a column has more than 256 values (the
+decoder tells them apart by length). Typed arrays are little-endian. What the
+page can derive is not stored at all: tags_str, and each role's company
+fields and each company's roles list (both joined through co).
+"""
+
+import base64
+import struct
+
+VERSION = 1
+TEXT    = ('name', 'url', 'desc', 'ch_url', 'careers_url', 'contact', 'tech')
+CATS    = ('source', 'hub', 'stage', 'employees', 'hiring', 'postcode', 'sic')
+FLAGS   = ('ch', 'has_careers', 'loc_approx')   # bit 0, 1, 2
+DERIVED = ('tags', 'tags_str', 'lat', 'lon', 'founded')
+COORD_SCALE = 1e6
+
+
+def _b64(fmt, values):
+    return base64.b64encode(struct.pack(f'<{len(values)}{fmt}', *values)).decode('ascii')
+
+
+def _cat(values):
+    """{values, codes}: distinct values by first appearance, one code per row."""
+    index = {}
+    codes = [index.setdefault(v, len(index)) for v in values]
+    return dict(values=list(index), codes=_b64('B' if len(index) <= 256 else 'H', codes))
+
+
+def _prefix(values):
+    """
+    Longest common prefix of the non-empty values, up to its last '/', and
+    shorter than each of them: a value stripped to '' would decode as empty.
+    """
+    values = [v for v in values if v]
+    if len(values) < 2:
+        return ''
+    lo, hi = min(values), max(values)
+    n = next((i for i, (a, b) in enumerate(zip(lo, hi)) if a != b), min(len(lo), len(hi)))
+    n = min(n, min(map(len, values)) - 1)
+    return lo[:lo.rfind('/', 0, n) + 1]
+
+
+def _list_cat(lists):
+    index, start, codes = {}, [0], []
+    for items in lists:
+        codes.extend(index.setdefault(v, len(index)) for v in items)
+        start.append(len(codes))
+    return dict(values=list(index), start=_b64('I', start),
+                codes=_b64('B' if len(index) <= 256 else 'H', codes))
+
+
+def encode(companies, roles, role_start):
+    """
+    The columnar payload for the companies and their roles, as site_data.json
+    holds them: company i's roles are roles[role_start[i]:role_start[i + 1]].
+    """
+    known = set(TEXT + CATS + FLAGS + DERIVED)
+    for c in companies:
+        if c.keys() != known:
+            raise ValueError(f'columnar.encode: unexpected company fields {sorted(c.keys() ^ known)}')
+    prefix = {f: p for f in TEXT if (p := _prefix([c[f] for c in companies]))}
+    co     = [i for i in range(len(companies)) for _ in range(role_start[i], role_start[i + 1])]
+    return dict(
+        v     = VERSION,
+        n     = len(companies),
+        text  = {f: [c[f][len(prefix.get(f, '')):] for c in companies] for f in TEXT},
+        prefix= prefix,
+        cat   = {f: _cat([c[f] for c in companies]) for f in CATS},
+        tags  = _list_cat([c['tags'] for c in companies]),
+        num   = dict(lat    =_b64('i', [round(c['lat'] * COORD_SCALE) for c in companies]),
+                     lon    =_b64('i', [round(c['lon'] * COORD_SCALE) for c in companies]),
+                     founded=_b64('h', [c['founded'] or 0 for c in companies])),
+        flags = _b64('B', [sum(1 << b for b, f in enumerate(FLAGS) if c[f]) for c in companies]),
+        roles = dict(n       =len(roles),
+                     co      =_b64('I', co),
+                     title   =[r['title'] for r in roles],
+                     type    =_cat([r['type'] for r in roles]),
+                     location=_cat([r['location'] for r in roles])),
+    )
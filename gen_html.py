@@ -1,17 +1,422 @@
+"""
+Render the job board from site_data.json (see build_site.py).
+
+    python gen_html.py [--split [--out-dir DIR] [--api]] [--minify] [--compress]
+
+or in-process, from the dict build_site.run() returns: gen_html.render(site, split=True, ...)
+"""
+
+import argparse
+import gzip
+import hashlib
 import json
+import math
+import re
+import shutil
+from html import escape
 from pathlib import Path
 
-# Read site_data.json from same directory as this script
-SCRIPT_DIR = Path(__file__).resolve().parent
-with open(SCRIPT_DIR / 'site_data.json') as f:
-    d = json.load(f)
-
-sector_opts  = d['sector_opts']
-table_rows   = d['table_rows']
-stats_json   = d['stats_json']
-co_json      = d['co_json']
-roles_json   = d['roles_json']
-last_updated = d['last_updated']
+import columnar
+import map_tiles
+
+try:
+    import brotli   # optional: pip install brotli, for .br siblings
+except ImportError:
+    brotli = None
+
+SCRIPT_DIR     = Path(__file__).resolve().parent
+SITE_DATA_PATH = SCRIPT_DIR / 'site_data.json'
+
+def load_site(path=SITE_DATA_PATH):
+    """site_data.json, as build_site.py saves it (build_site.run() returns the same dict)."""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+# ── Sector badge colours (shared with the page) ───────────────────────────────
+SECTOR_COLS = {
+    'biotech':'#2d6a4f','pharma':'#1b4332','medtech':'#40916c',
+    'diagnostics':'#52b788','genomics':'#74c69d','drug discovery':'#095d40',
+    'AI/ML':'#023e8a','deep learning':'#0077b6','computer vision':'#0096c7',
+    'NLP':'#00b4d8','data analytics':'#48cae4',
+    'SaaS':'#7b2d8b','developer tools':'#9b59b6','software':'#6c3483',
+    'hardware':'#d4380d','semiconductors':'#fa541c','photonics':'#ff7a45',
+    'robotics':'#e67e22','IoT':'#f39c12',
+    'quantum computing':'#1a1a2e','space':'#16213e','defence':'#0f3460',
+    'cleantech':'#2e7d32','climate':'#388e3c','agritech':'#558b2f',
+    'foodtech':'#689f38','healthtech':'#00695c','fintech':'#1565c0',
+    'edtech':'#6a1b9a','cybersecurity':'#b71c1c',
+    'consulting':'#37474f','research':'#455a64',
+}
+
+# ── Company search index ──────────────────────────────────────────────────────
+# Inverted index over the fields the company filter searches. The page matches
+# each query term as a prefix of an indexed token (binary search over the
+# sorted token list), so a keystroke costs O(log V + matches) instead of a
+# lowercase-and-scan of every company.
+#   t: sorted tokens
+#   p: per token, flat [id delta, field bits, id delta, field bits, ...]
+#      with ids = positions in the companies array and field bits
+#      4 = name, 2 = tags, 1 = description (used for ranking)
+SEARCH_FIELDS = (('name', 4), ('tags_str', 2), ('desc', 1))
+TOKEN_RE      = re.compile(r'[^\W_]+')   # same as /[\p{L}\p{N}]+/gu in the page
+
+def build_search_index(cos):
+    postings = {}
+    for i, c in enumerate(cos):
+        for field, bit in SEARCH_FIELDS:
+            for tok in TOKEN_RE.findall((c.get(field) or '').lower()):
+                bits = postings.setdefault(tok, {})
+                bits[i] = bits.get(i, 0) | bit
+    tokens = sorted(postings)
+    flat = []
+    for tok in tokens:
+        prev, row = 0, []
+        for i, bits in sorted(postings[tok].items()):
+            row += [i - prev, bits]
+            prev = i
+        flat.append(row)
+    return dict(t=tokens, p=flat)
+
+
+# ── Output ────────────────────────────────────────────────────────────────────
+class Output:
+    """The directory one render writes to, and every file written there."""
+
+    def __init__(self, path):
+        self.dir    = path
+        self.assets = []   # (path, size before minification) of every file written
+
+    def write(self, path, text, unminified_size=None):
+        """Write an asset and drop its .gz/.br siblings, stale now (compress_assets rewrites them)."""
+        body = text.encode('utf-8')
+        path.write_bytes(body)
+        for ext in ('.gz', '.br'):
+            Path(f'{path}{ext}').unlink(missing_ok=True)
+        self.assets.append((path, unminified_size or len(body)))
+
+    def write_hashed(self, stem, payload, unminified_size=None):
+        """Write data/<stem>.<content hash>.json, replacing older versions."""
+        name = f'{stem}.{hashlib.sha256(payload.encode("utf-8")).hexdigest()[:10]}.json'
+        data_dir = self.dir / 'data'
+        data_dir.mkdir(parents=True, exist_ok=True)
+        for old in data_dir.glob(f'{stem}.*.json*'):   # incl. .gz/.br siblings
+            if not old.name.startswith(name):
+                old.unlink()
+        self.write(data_dir / name, payload, unminified_size)
+        return f'data/{name}'
+
+def write_tiles(out, tile_json):
+    """Write the map tiles to data/tiles.<content hash>/<level>/<tx>/<ty>.json."""
+    digest = hashlib.sha256()
+    for key in sorted(tile_json):
+        digest.update(f'{key}={tile_json[key]}\n'.encode('utf-8'))
+    name = f'tiles.{digest.hexdigest()[:10]}'
+    data_dir = out.dir / 'data'
+    for old in data_dir.glob('tiles.*'):
+        if old.name != name:
+            shutil.rmtree(old)
+    for key, payload in tile_json.items():
+        path = data_dir / name / f'{key}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        out.write(path, payload)
+    return f'data/{name}'
+
+# ── Static JSON API (--api) ───────────────────────────────────────────────────
+# api/manifest.json is the entry point (fetch it fresh); every shard is named
+# by its content hash, so it can be cached forever and fetched on its own:
+#   manifest = {version, last_updated, total, page_size, fields,
+#               all:    {count, pages: [{url, count, sha256}]},
+#               facets: {sector|stage|hiring: {value: {slug, count, pages}}}}
+#   shard    = {collection, value, page, pages, count, companies: [...]}
+# Company records are those of site_data.json plus their `id` (position) and
+# `roles`. It is written with the split build, to <out dir>/api.
+API_VERSION   = 1
+API_PAGE_SIZE = 100
+API_FACETS    = dict(sector='tags', stage='stage', hiring='hiring')
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or 'none'
+
+def write_api(out, site):
+    """The sharded JSON API; each company record carries its id and roles."""
+    companies, roles, start = site['companies'], site['roles'], site['index']['role_start']
+    api_dir = out.dir / 'api'
+    written = set()
+
+    def collection(name, value, ids, slug):
+        pages = []
+        chunks = [ids[i:i + API_PAGE_SIZE] for i in range(0, len(ids), API_PAGE_SIZE)] or [[]]
+        for n, chunk in enumerate(chunks, 1):
+            records = [dict(companies[i], id=i, roles=roles[start[i]:start[i + 1]]) for i in chunk]
+            payload = json.dumps(dict(collection=name, value=value, page=n, pages=len(chunks),
+                                      count=len(ids), companies=records),
+                                 ensure_ascii=False, separators=(',', ':'))
+            digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+            path = api_dir / name / slug / f'{n}.{digest[:10]}.json'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            out.write(path, payload)
+            written.add(path)
+            pages.append(dict(url=path.relative_to(api_dir).as_posix(), count=len(chunk), sha256=digest))
+        return dict(count=len(ids), pages=pages)
+
+    members = {facet: {} for facet in API_FACETS}
+    for i, c in enumerate(companies):
+        for facet, field in API_FACETS.items():
+            for v in (c[field] if field == 'tags' else [c[field]]):
+                members[facet].setdefault(v, []).append(i)
+    facets = {}
+    for facet, vals in members.items():
+        slugs = {}
+        for v in sorted(vals):
+            slug = _slug(v)
+            while slug in slugs.values():   # e.g. 'AI/ML' vs 'AI ML'
+                slug += '-'
+            slugs[v] = slug
+        facets[facet] = {v: dict(slug=slugs[v], **collection(facet, v, ids, slugs[v]))
+                         for v, ids in sorted(vals.items())}
+
+    manifest = dict(version=API_VERSION, last_updated=site['last_updated'], total=len(companies),
+                    page_size=API_PAGE_SIZE, fields=sorted({k for c in companies for k in c} | {'id', 'roles'}),
+                    all=collection('all', None, list(range(len(companies))), 'all'),
+                    facets=facets)
+    out.write(api_dir / 'manifest.json', json.dumps(manifest, ensure_ascii=False, separators=(',', ':')))
+    written.add(api_dir / 'manifest.json')
+    for old in api_dir.rglob('*.json*'):   # shards of earlier builds, incl. .gz/.br siblings
+        if Path(str(old).removesuffix('.gz').removesuffix('.br')) not in written:
+            old.unlink()
+    for folder in sorted((p for p in api_dir.rglob('*') if p.is_dir()), reverse=True):
+        if not any(folder.iterdir()):
+            folder.rmdir()
+    print(f"API: {api_dir / 'manifest.json'} + {len(written) - 1} shards")
+
+# ── Service worker (--split) ──────────────────────────────────────────────────
+# sw.js + asset-manifest.json, written after every other asset. The manifest
+# lists the files to precache and every content-hashed file of this build; its
+# hash is baked into sw.js, so a rebuild that changes any asset installs a new
+# worker, which fetches only the hashed files it has not cached yet.
+SW_HASHED = re.compile(r'\.[0-9a-f]{10}(\.json$|/)')   # same test as HASHED in sw.js
+SW_JS = r'''// Service worker for the split build, generated by gen_html.py.
+// The shell is served stale-while-revalidate; content-hashed files (data,
+// map tiles, API shards) never change, so they are served cache-first and
+// a rebuild only downloads the ones whose hash changed. asset-manifest.json
+// lists the current files: install precaches its `precache` list, activate
+// drops cached hashed files that are no longer in `hashed`. There is no
+// skipWaiting(): a new worker takes over once the board's open tabs are
+// closed, so a running page never loses the data files it was built with.
+const VERSION = '__VERSION__';   // asset-manifest.json hash: a rebuild changes this file
+const SHELL = 'board-shell', DATA = 'board-data', RUNTIME = 'board-runtime';
+const scope = new URL(self.registration.scope);
+const rel = url => new URL(url, scope).href;
+const HASHED = /\.[0-9a-f]{10}(\.json$|\/)/;   // name.<hash>.json, tiles.<hash>/...
+let manifest = null;
+
+async function loadManifest() {
+  if (!manifest) {
+    const res = await fetch(rel(`asset-manifest.json?v=${VERSION}`), {cache: 'no-store'});
+    manifest = await res.json();
+    manifest.hashedSet = new Set(manifest.hashed.map(rel));
+  }
+  return manifest;
+}
+
+self.addEventListener('install', event => {
+  event.waitUntil((async () => {
+    const m = await loadManifest();
+    const shell = await caches.open(SHELL);
+    await shell.put(rel('./'), await fetch(rel('./'), {cache: 'no-cache'}));
+    const data = await caches.open(DATA);
+    for (const url of m.precache.map(rel)) {
+      if (!(await data.match(url))) await data.add(url);
+    }
+  })());
+});
+
+self.addEventListener('activate', event => {
+  event.waitUntil((async () => {
+    const m = await loadManifest();
+    const data = await caches.open(DATA);
+    for (const req of await data.keys()) {
+      if (!m.hashedSet.has(req.url)) await data.delete(req);
+    }
+    await self.clients.claim();
+  })());
+});
+
+async function cacheFirst(cacheName, req) {
+  const cache = await caches.open(cacheName);
+  const hit = await cache.match(req);
+  if (hit) return hit;
+  const res = await fetch(req);
+  if (res.ok || res.type === 'opaque') cache.put(req, res.clone());
+  return res;
+}
+async function staleWhileRevalidate(cacheName, req, key = req) {
+  const cache = await caches.open(cacheName);
+  const hit = await cache.match(key);
+  const update = fetch(req).then(res => {
+    if (res.ok) cache.put(key, res.clone());
+    return res;
+  });
+  if (!hit) return update;
+  update.catch(() => {});   // offline: the cached copy stands
+  return hit;
+}
+
+self.addEventListener('fetch', event => {
+  const req = event.request;
+  if (req.method !== 'GET') return;
+  const url = new URL(req.url);
+  if (url.origin === scope.origin) {
+    if (!url.href.startsWith(scope.href)) return;
+    if (req.mode === 'navigate') {
+      event.respondWith(staleWhileRevalidate(SHELL, req, rel('./')));
+    } else if (HASHED.test(url.pathname)) {
+      event.respondWith(cacheFirst(DATA, req));
+    } else {
+      event.respondWith(staleWhileRevalidate(RUNTIME, req));
+    }
+  } else if (['script', 'style', 'font'].includes(req.destination)) {
+    event.respondWith(cacheFirst(RUNTIME, req));   // CDN libraries, pinned versions
+  }
+});
+'''
+
+def write_service_worker(out, data_files, minify=False):
+    hashed = sorted(rel for rel in (p.relative_to(out.dir).as_posix() for p, _ in out.assets)
+                    if SW_HASHED.search(rel))
+    manifest = json.dumps(dict(shell='./', precache=sorted(data_files.values()), hashed=hashed),
+                          separators=(',', ':'))
+    out.write(out.dir / 'asset-manifest.json', manifest)
+    sw = SW_JS.replace('__VERSION__', hashlib.sha256(manifest.encode('utf-8')).hexdigest()[:10])
+    out.write(out.dir / 'sw.js', minify_js(sw) if minify else sw, len(sw))
+
+def _json_size(obj):
+    return len(json.dumps(obj, ensure_ascii=False).encode('utf-8'))
+
+# ── Minification (conservative: whitespace and comments only) ────────────────
+def minify_css(css):
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)          # never touch the space *before* ':'
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    # Line-based so ASI, strings, regex literals and template literals are safe:
+    # drop indentation, blank lines and whole-line // comments.
+    lines = (l.strip() for l in js.split('\n'))
+    return '\n'.join(l for l in lines if l and not l.startswith('//'))
+
+def minify_html(html):
+    parts = re.split(r'(<script\b[^>]*>.*?</script>|<style\b[^>]*>.*?</style>)', html, flags=re.S)
+    out = []
+    for part in parts:
+        if part.startswith('<script'):
+            open_tag, body = part.split('>', 1)
+            out.append(open_tag + '>' + minify_js(body[:-len('</script>')]) + '</script>')
+        elif part.startswith('<style'):
+            open_tag, body = part.split('>', 1)
+            out.append(open_tag + '>' + minify_css(body[:-len('</style>')]) + '</style>')
+        else:
+            part = re.sub(r'<!--.*?-->', '', part, flags=re.S)
+            out.append('\n'.join(l.strip() for l in part.split('\n') if l.strip()))
+    return '\n'.join(p for p in out if p)
+
+def compress_assets(out):
+    """Write .gz (and .br) siblings next to every emitted asset."""
+    for path, _ in out.assets:
+        raw = path.read_bytes()
+        with open(f'{path}.gz', 'wb') as f:
+            with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=9, mtime=0) as gz:
+                gz.write(raw)
+        if brotli is not None:
+            Path(f'{path}.br').write_bytes(brotli.compress(raw, quality=11))
+
+def print_size_report(out, compress=False):
+    kb = lambda n: f'{n/1024:8.1f}'
+    print(f"\n{'asset':<44}{'source KB':>10}{'written':>10}{'gzip':>10}{'brotli':>10}")
+    rows = {}   # label → summed sizes; the map tiles and the API share a row each
+    for path, before in out.assets:
+        sizes = [before, path.stat().st_size]
+        for ext in ('.gz', '.br'):
+            sib = Path(f'{path}{ext}')
+            sizes.append(sib.stat().st_size if sib.exists() else 0)
+        group = next((p for p in path.parents if p.name.startswith('tiles.') or p.name == 'api'), None)
+        label = f'{group.name}/*.json' if group else path.name
+        rows[label] = [a + b for a, b in zip(rows.get(label, [0, 0, 0, 0]), sizes)]
+    tot = [0, 0, 0, 0]
+    for label, sizes in rows.items():
+        tot = [a + b for a, b in zip(tot, sizes)]
+        print(f"{label:<44}" + ''.join(f'{kb(n):>10}' if n else f"{'—':>10}" for n in sizes))
+    print(f"{'total':<44}" + ''.join(f'{kb(n):>10}' if n else f"{'—':>10}" for n in tot))
+    best = min(n for n in tot[1:] if n)
+    print(f"Transfer size: {best/1024:.0f} KB vs {tot[0]/1024:.0f} KB unminified/uncompressed "
+          f"({100 * (1 - best / tot[0]):.0f}% smaller)")
+    if compress and brotli is None:
+        print('(brotli not installed — wrote .gz only; pip install brotli for .br)')
+
+# ── Landscape charts: inline SVG rendered at build time ──────────────────────
+# Static charts, no charting library; each bar / slice carries a <title> (native
+# tooltip) and data-tip, which the page's small tooltip script picks up. The
+# page redraws them in place for the active filters (see updateStats), so the
+# geometry it needs rides along as data- attributes and rows carry data-key.
+CHART_H    = 220
+CHART_FONT = 'font-family="system-ui,-apple-system,Segoe UI,Roboto,sans-serif"'
+
+def _tip(label, n):
+    return escape(f'{label}: {n} companies')
+
+def _key(keys, i, label=None):
+    attrs = f' data-key="{escape(str(keys[i]))}"' if keys else ''
+    return attrs + (f' data-label="{escape(label)}"' if label is not None else '')
+
+def svg_hbar(chart_id, labels, values, colour, width=480, keys=None, label_len=None):
+    """Horizontal bar chart: label column, bar, value at the bar's end."""
+    row     = CHART_H / max(len(values), 1)
+    label_w = (label_len or max((len(l) for l in labels), default=0)) * 6.6 + 12
+    bar_w   = width - label_w - 34
+    top     = max(values, default=0) or 1
+    parts = []
+    for i, (label, n) in enumerate(zip(labels, values)):
+        y, h = i * row + row * 0.15, row * 0.7
+        w = max(bar_w * n / top, 1 if n else 0)
+        parts.append(
+            f'<g data-tip="{_tip(label, n)}"{_key(keys, i)}><title>{_tip(label, n)}</title>'
+            f'<text x="{label_w - 8:.0f}" y="{y + h / 2:.1f}" text-anchor="end" dominant-baseline="central" '
+            f'font-size="11" fill="#555">{escape(label)}</text>'
+            f'<rect x="{label_w:.0f}" y="{y:.1f}" width="{w:.1f}" height="{h:.1f}" rx="4" fill="{colour}"/>'
+            f'<text x="{label_w + w + 5:.1f}" y="{y + h / 2:.1f}" dominant-baseline="central" '
+            f'font-size="10" fill="#888">{n}</text></g>')
+    return (f'<svg id="{chart_id}" class="svg-chart" viewBox="0 0 {width} {CHART_H}" role="img" {CHART_FONT} '
+            f'data-x0="{label_w:.0f}" data-span="{bar_w:.1f}" '
+            f'aria-label="{escape(", ".join(f"{l} {n}" for l, n in zip(labels, values)))}">{"".join(parts)}</svg>')
+
+def svg_doughnut(chart_id, keys, labels, values, colours, width=240):
+    """Doughnut (stroked circle segments) with a two-column legend underneath."""
+    r, stroke = 52, 30
+    cx, cy = width / 2, r + stroke / 2 + 14
+    circ   = 2 * math.pi * r
+    total  = sum(values) or 1
+    parts, offset = [], 0.0
+    for i, (label, n, colour) in enumerate(zip(labels, values, colours)):
+        seg = circ * n / total
+        parts.append(
+            f'<circle class="seg" data-tip="{_tip(label, n)}"{_key(keys, i, label)} cx="{cx:.0f}" cy="{cy:.0f}" r="{r}" '
+            f'fill="none" stroke="{colour}" stroke-width="{stroke}" '
+            f'stroke-dasharray="{max(seg - 1.5, 0.5) if n else 0:.2f} {circ:.2f}" '
+            f'stroke-dashoffset="{-offset:.2f}" transform="rotate(-90 {cx:.0f} {cy:.0f})">'
+            f'<title>{_tip(label, n)}</title></circle>')
+        offset += seg
+    legend_y = cy + r + stroke / 2 + 18
+    for i, (label, n, colour) in enumerate(zip(labels, values, colours)):
+        x, y = 20 + (i % 2) * (width / 2 - 10), legend_y + (i // 2) * 20
+        parts.append(
+            f'<g data-tip="{_tip(label, n)}"{_key(keys, i, label)}><circle cx="{x:.0f}" cy="{y:.0f}" r="5" fill="{colour}"/>'
+            f'<text x="{x + 10:.0f}" y="{y:.0f}" dominant-baseline="central" font-size="11" fill="#555">'
+            f'{escape(label)}</text></g>')
+    return (f'<svg id="{chart_id}" class="svg-chart" viewBox="0 0 {width} {CHART_H}" role="img" {CHART_FONT} '
+            f'data-circ="{circ:.2f}" '
+            f'aria-label="{escape(", ".join(f"{l} {n}" for l, n in zip(labels, values)))}">{"".join(parts)}</svg>')
 
 STAGE_COLOURS = {'startup':'#0077b6','scaleup':'#6a0dad','established':'#333333','unknown':'#888888'}
 
@@ -47,7 +452,21 @@ hub_links_html = '\n'.join(
     for name, url in HUB_LINKS
 )
 
-html = f'''<!DOCTYPE html>
+# ── Page ──────────────────────────────────────────────────────────────────────
+def page_html(site, data_js, json_sep=None):
+    """The board's HTML; data_js defines INLINE and DATA_URLS (see render)."""
+    sector_opts  = '\n'.join(f'<option value="{s}">{s}</option>' for s in site['sectors'])
+    stats_json   = json.dumps(site['stats'], separators=json_sep)
+    last_updated = site['last_updated']
+    stats        = site['stats']
+    sector_chart = svg_hbar('sectorChart', stats['tag_labels'], stats['tag_vals'], '#1b3a6b',
+                            label_len=max((len(s) for s in site['sectors']), default=0))
+    stage_chart  = svg_doughnut('stageChart', ['startup', 'scaleup', 'established', 'unknown'],
+                                ['Startup', 'Scaleup', 'Established', 'Unknown'], stats['stage_vals'],
+                                ['#0077b6', '#6a0dad', '#333', '#adb5bd'])
+    emp_chart    = svg_hbar('empChart', ['1-10', '11-50', '51-200', '200-1k', '1k+', '?'], stats['emp_vals'], '#40916c',
+                            width=240, keys=['1-10', '11-50', '51-200', '200-1000', '1000+', '?'])
+    return f'''<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
@@ -56,8 +475,6 @@ html = f'''<!DOCTYPE html>
 <link rel="stylesheet" href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css">
 <link rel="stylesheet" href="https://cdn.datatables.net/1.13.6/css/dataTables.bootstrap5.min.css">
 <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css">
-<link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.4.1/dist/MarkerCluster.css">
-<link rel="stylesheet" href="https://unpkg.com/leaflet.markercluster@1.4.1/dist/MarkerCluster.Default.css">
 <style>
 :root {{
   --navy:#0d1b2a; --blue:#1b3a6b; --accent:#e63946;
@@ -98,6 +515,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
   font-size:.83rem; height:34px; color:#555; cursor:pointer;
 }}
 .btn-reset:hover {{ background:#f0f2f5; }}
+.near-info {{ font-size:.8rem; color:#666; }}
 .btn-export {{
   background:var(--navy); color:#fff; border:none; border-radius:8px;
   font-size:.8rem; height:34px; padding:0 .85rem; cursor:pointer;
@@ -124,6 +542,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
 .sec-sub {{ font-size:.82rem; color:#888; margin-bottom:1rem; margin-top:.15rem; }}
 
 /* ── hiring cards ── */
+.vblock {{ display:flow-root; padding-bottom:1rem; }}
 .hire-card {{
   border:1px solid #e4eef6; border-radius:var(--card-r); background:#fff;
   padding:1rem 1.1rem; height:100%;
@@ -201,6 +620,12 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
   background:#fff; border-radius:var(--card-r);
   box-shadow:0 2px 10px rgba(0,0,0,.06); padding:1.1rem 1.3rem;
 }}
+.svg-chart {{ display:block; width:100%; height:auto; overflow:visible; }}
+.svg-chart [data-tip]:hover {{ opacity:.8; }}
+.chart-tip {{
+  position:fixed; display:none; pointer-events:none; z-index:2000;
+  background:rgba(0,0,0,.8); color:#fff; font-size:.75rem; padding:.25rem .5rem; border-radius:6px;
+}}
 
 /* ── count badge ── */
 .count-badge {{
@@ -256,7 +681,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
     <div class="col-6 col-md-2">
       <select id="fStage" class="form-select">
         <option value="">All stages</option>
-        <option>startup</option><option>scaleup</option><option>established</option>
+        <option value="startup">startup</option><option value="scaleup">scaleup</option><option value="established">established</option>
       </select>
     </div>
     <div class="col-6 col-md-2">
@@ -279,6 +704,23 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
       <button class="btn-export" onclick="downloadCompaniesCSV()" title="Download filtered companies as CSV">↓ CSV</button>
     </div>
   </div>
+  <div class="row g-2 align-items-center mt-0">
+    <div class="col-6 col-md-2">
+      <input type="text" id="fNear" class="form-control" placeholder="📍  Near postcode…" autocomplete="postal-code">
+    </div>
+    <div class="col-3 col-md-1">
+      <select id="fRadius" class="form-select" title="Distance">
+        <option value="1">1 km</option><option value="2">2 km</option><option value="5" selected>5 km</option>
+        <option value="10">10 km</option><option value="25">25 km</option>
+      </select>
+    </div>
+    <div class="col-3 col-md-auto">
+      <button class="btn-reset px-2" onclick="nearMe()" title="Use my location">Near me</button>
+    </div>
+    <div class="col-12 col-md">
+      <span class="near-info" id="nearInfo"></span>
+    </div>
+  </div>
 </div>
 </div>
 
@@ -305,9 +747,9 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
     <div class="sec-title">📊 Ecosystem Snapshot</div>
     <div class="sec-sub">What does Cambridge tech actually look like? (AI-classified, so grain of salt.)</div>
     <div class="row g-3">
-      <div class="col-md-6"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Top sectors</h6><canvas id="sectorChart" height="220"></canvas></div></div>
-      <div class="col-md-3"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Company stage</h6><canvas id="stageChart" height="220"></canvas></div></div>
-      <div class="col-md-3"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Team size</h6><canvas id="empChart" height="220"></canvas></div></div>
+      <div class="col-md-6"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Top sectors</h6>{sector_chart}</div></div>
+      <div class="col-md-3"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Company stage</h6>{stage_chart}</div></div>
+      <div class="col-md-3"><div class="chart-card"><h6 class="text-muted" style="font-size:.72rem;text-transform:uppercase;letter-spacing:.06em">Team size</h6>{emp_chart}</div></div>
     </div>
   </div>
 
@@ -315,7 +757,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
   <div class="mb-4">
     <div class="sec-title">🟢 Actively Hiring <span class="count-badge" id="hiringCount">0</span></div>
     <div class="sec-sub">Found by an automated pipeline scanning career pages. Always double-check, these things go stale.</div>
-    <div class="row g-3" id="hiringCards"></div>
+    <div id="hiringCards"></div>
     <div class="no-results d-none" id="hiringNone">No actively hiring companies match the current filters.</div>
   </div>
 
@@ -336,7 +778,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
             <th class="text-center">Src</th>
           </tr>
         </thead>
-        <tbody>{table_rows}</tbody>
+        <tbody></tbody>
       </table>
     </div>
   </div>
@@ -363,7 +805,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
   <div class="mt-4">
     <div class="sec-title" style="font-size:.95rem">📩 Actively Hiring: Worth a Cold Email <span class="count-badge" id="outreachCount">0</span></div>
     <div class="sec-sub">These companies look like they're hiring but didn't have specific roles listed publicly. A speculative email often works better anyway.</div>
-    <div class="row g-3" id="outreachCards"></div>
+    <div id="outreachCards"></div>
   </div>
 
 </div><!-- /container -->
@@ -484,7 +926,7 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
         <h6 class="fw-bold">Built with</h6>
         <p style="font-size:.85rem;margin:0;color:#555;line-height:1.7">
           Python (pandas, polars, BeautifulSoup), GPT-4o mini,
-          Companies House bulk data, Leaflet.js, Chart.js,
+          Companies House bulk data, Leaflet.js,
           Bootstrap 5, DataTables.
         </p>
       </div>
@@ -521,60 +963,576 @@ body {{ background:#f0f2f7; font-family:-apple-system,BlinkMacSystemFont,"Segoe
 <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js"></script>
 <script src="https://cdn.datatables.net/1.13.6/js/jquery.dataTables.min.js"></script>
 <script src="https://cdn.datatables.net/1.13.6/js/dataTables.bootstrap5.min.js"></script>
-<script src="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js"></script>
 <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-<script src="https://unpkg.com/leaflet.markercluster@1.4.1/dist/leaflet.markercluster.js"></script>
 <script src="https://cdnjs.cloudflare.com/ajax/libs/leaflet.heat/0.2.0/leaflet-heat.js"></script>
 
 <script>
-const ALL = {co_json};
-const ALL_ROLES = {roles_json};
+{data_js}
 const STATS = {stats_json};
+let ALL = [];          // companies, filled once loaded
+let ALL_ROLES = null;  // roles (flattened, see decodeColumnar), filled once loaded
 
 // ── colour maps ──
 const SCOL = {json.dumps(STAGE_COLOURS)};
-const TCOL = {json.dumps({k: v for k, v in {
-  'biotech':'#2d6a4f','pharma':'#1b4332','medtech':'#40916c',
-  'diagnostics':'#52b788','genomics':'#74c69d','drug discovery':'#095d40',
-  'AI/ML':'#023e8a','deep learning':'#0077b6','computer vision':'#0096c7',
-  'NLP':'#00b4d8','data analytics':'#48cae4',
-  'SaaS':'#7b2d8b','developer tools':'#9b59b6','software':'#6c3483',
-  'hardware':'#d4380d','semiconductors':'#fa541c','photonics':'#ff7a45',
-  'robotics':'#e67e22','IoT':'#f39c12',
-  'quantum computing':'#1a1a2e','space':'#16213e','defence':'#0f3460',
-  'cleantech':'#2e7d32','climate':'#388e3c','agritech':'#558b2f',
-  'foodtech':'#689f38','healthtech':'#00695c','fintech':'#1565c0',
-  'edtech':'#6a1b9a','cybersecurity':'#b71c1c',
-  'consulting':'#37474f','research':'#455a64',
-}.items()})};
+const TCOL = {json.dumps(SECTOR_COLS)};
 
 function tagBadge(t) {{
   const col = TCOL[t] || '#607d8b';
   return `<span class="badge" style="background:${{col}}">${{t}}</span>`;
 }}
 
+// ── columnar data (see columnar.py) ──
+// The companies and their roles ship as columns; this rebuilds the records the
+// page and the engine work with, field for field as in site_data.json:
+// {{companies, roles}}, each role carrying its company's name, URLs, tags and stage.
+function decodeColumnar(p) {{
+  const bytes = b64 => {{
+    const s = atob(b64), b = new Uint8Array(s.length);
+    for (let i = 0; i < s.length; i++) b[i] = s.charCodeAt(i);
+    return b;
+  }};
+  const codes = (b64, n) => {{ const b = bytes(b64); return b.length === n ? b : new Uint16Array(b.buffer); }};
+  const cat = (c, n) => Array.from(codes(c.codes, n), k => c.values[k]);
+  const n = p.n, col = {{}};
+  for (const [f, vals] of Object.entries(p.text)) {{
+    const pre = p.prefix[f];
+    col[f] = pre ? vals.map(v => v && pre + v) : vals;
+  }}
+  for (const [f, c] of Object.entries(p.cat)) col[f] = cat(c, n);
+  const tagStart = new Uint32Array(bytes(p.tags.start).buffer);
+  const tagCodes = codes(p.tags.codes, tagStart[n]), tagValues = p.tags.values;
+  const lat = new Int32Array(bytes(p.num.lat).buffer), lon = new Int32Array(bytes(p.num.lon).buffer);
+  const founded = new Int16Array(bytes(p.num.founded).buffer), flags = bytes(p.flags);
+  const companies = new Array(n);
+  for (let i = 0; i < n; i++) {{
+    const tags = [];
+    for (let k = tagStart[i]; k < tagStart[i + 1]; k++) tags.push(tagValues[tagCodes[k]]);
+    companies[i] = {{
+      name: col.name[i], url: col.url[i], source: col.source[i], hub: col.hub[i], desc: col.desc[i],
+      tags, tags_str: tags.join(', '), stage: col.stage[i], employees: col.employees[i],
+      hiring: col.hiring[i], ch: !!(flags[i] & 1), ch_url: col.ch_url[i], postcode: col.postcode[i],
+      sic: col.sic[i], founded: founded[i] || null, careers_url: col.careers_url[i],
+      has_careers: !!(flags[i] & 2), roles: [], contact: col.contact[i], tech: col.tech[i],
+      lat: lat[i] / 1e6, lon: lon[i] / 1e6, loc_approx: !!(flags[i] & 4),
+    }};
+  }}
+  const r = p.roles, co = new Uint32Array(bytes(r.co).buffer);
+  const type = cat(r.type, r.n), location = cat(r.location, r.n), roles = new Array(r.n);
+  for (let j = 0; j < r.n; j++) {{
+    const c = companies[co[j]];
+    c.roles.push({{title: r.title[j], type: type[j], location: location[j]}});
+    roles[j] = {{company: c.name, url: c.url, careers_url: c.careers_url, tags: c.tags, stage: c.stage,
+                title: r.title[j], type_: type[j], location: location[j], co: co[j]}};
+  }}
+  return {{companies, roles}};
+}}
+
+// ── filter engine ──
+// Owns the data set, the search index and the facet bitsets, and answers
+// filter / jobs / CSV requests by message. It runs in a Web Worker built from
+// this function's source, so typing and scrolling never wait on it; when
+// Workers are unavailable the same code runs in-page (see the engine client).
+//   init   {{companies, index, search}}  data, or absolute URLs to fetch;
+//                                       companies = the columnar payload
+//   filter {{state, jobQuery}}           → {{ids, hiring, counts, jobs, near, stats}}
+//   jobs   {{jobQuery}}                  → {{roles, outreach}} for the last filter
+//   csv    {{kind}}                      → streams CSV chunks for the last filter
+// ids are company positions in the companies array (role positions for roles).
+function filterEngine(self) {{
+  let ALL = [], ROLES = null, IDX = null, FACETS = null, HIRING = null, CODES = null;
+  let SEARCH = null, searchSrc = null;
+  let current = null;   // Int32Array of company ids from the last filter
+  const FACET_KEYS = ['sector', 'stage', 'hiring', 'source'];
+  const CSV_CHUNK  = 5000;   // rows per posted chunk
+
+  const load = src => typeof src !== 'string' ? Promise.resolve(src) : fetch(src).then(r => {{
+    if (!r.ok) throw new Error(`${{src}}: HTTP ${{r.status}}`);
+    return r.json();
+  }});
+
+  // ── facet bitsets: bit i of word i>>5 = company i ──
+  const decodeBytes = b64 => Uint8Array.from(atob(b64), ch => ch.charCodeAt(0));
+  const decodeBits  = b64 => new Uint32Array(decodeBytes(b64).buffer);
+  const hasBit = (bits, i) => (bits[i >> 5] >>> (i & 31)) & 1;
+  // The ids (in order) whose bit is set and that pass an optional extra test
+  function keepBits(ids, bits, test) {{
+    const out = new Int32Array(ids.length);
+    let n = 0;
+    for (let k = 0; k < ids.length; k++) {{
+      const id = ids[k];
+      if ((bits[id >> 5] >>> (id & 31)) & 1 && (!test || test(id))) out[n++] = id;
+    }}
+    return out.slice(0, n);
+  }}
+  function popcount(x) {{
+    x -= (x >>> 1) & 0x55555555;
+    x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+    return (((x + (x >>> 4)) & 0x0f0f0f0f) * 0x01010101) >>> 24;
+  }}
+  // Company ids → bitset
+  function toBits(ids) {{
+    const bits = new Uint32Array(HIRING.length);
+    for (const i of ids) bits[i >> 5] |= 1 << (i & 31);
+    return bits;
+  }}
+  function andBits(a, b) {{
+    if (!a || !b) return a || b;
+    const out = a.slice();
+    for (let w = 0; w < out.length; w++) out[w] &= b[w];
+    return out;
+  }}
+  // AND of the active facet filters (and the search / distance bits), leaving
+  // out one facet; null when nothing restricts the set. A single restriction
+  // is returned as is (callers only read masks), so there is no AND pass
+  function maskExcept(state, skip, baseBits) {{
+    const sets = baseBits ? [baseBits] : [];
+    for (const key of FACET_KEYS) {{
+      if (key === skip || !state[key]) continue;
+      sets.push(FACETS[key][state[key]] || new Uint32Array(HIRING.length));
+    }}
+    if (sets.length < 2) return sets[0] || null;
+    const mask = sets[0].slice();
+    for (let k = 1; k < sets.length; k++) {{
+      const bits = sets[k];
+      for (let w = 0; w < mask.length; w++) mask[w] &= bits[w];
+    }}
+    return mask;
+  }}
+  // Companies per value of each facet under the other active filters
+  function facetCounts(state, baseBits) {{
+    const counts = {{}};
+    for (const key of FACET_KEYS) {{
+      const base = maskExcept(state, key, baseBits);
+      counts[key] = {{}};
+      for (const [value, bits] of Object.entries(FACETS[key])) {{
+        let n = 0;
+        for (let w = 0; w < bits.length; w++) n += popcount(base ? bits[w] & base[w] : bits[w]);
+        counts[key][value] = n;
+      }}
+    }}
+    return counts;
+  }}
+
+  // ── live stats for the hero pills and charts ──
+  // One pass over the filtered ids through the per-company stat codes; the
+  // sectors (multi-valued) are popcounts of their bitsets under the filter.
+  function liveStats(ids) {{
+    const fields = Object.keys(CODES);
+    const hists = fields.map(f => new Int32Array(CODES[f].values.length));
+    const cols = fields.map(f => CODES[f].codes);
+    for (let k = 0; k < ids.length; k++) {{
+      const id = ids[k];
+      for (let f = 0; f < cols.length; f++) hists[f][cols[f][id]]++;
+    }}
+    const hist = {{}};
+    fields.forEach((f, i) => {{
+      hist[f] = Object.fromEntries(CODES[f].values.map((v, j) => [v, hists[i][j]]));
+    }});
+    const mask = ids.length === ALL.length ? null : toBits(ids), sectors = [];
+    for (const [value, bits] of Object.entries(FACETS.sector)) {{
+      let n = 0;
+      for (let w = 0; w < bits.length; w++) n += popcount(mask ? bits[w] & mask[w] : bits[w]);
+      if (n) sectors.push([value, n]);
+    }}
+    sectors.sort((a, b) => b[1] - a[1] || (a[0] < b[0] ? -1 : 1));
+    return {{total: ids.length, hist, sectors}};
+  }}
+
+  // ── company search (prebuilt index, see build_search_index in gen_html.py) ──
+  const FIELD_SCORE = [0, 1, 2, 3, 4, 5, 6, 7].map(b => (b & 4 ? 6 : 0) + (b & 2 ? 3 : 0) + (b & 1 ? 1 : 0));
+  const termCache = new Map();
+  // Best score per company for one term, matched as a prefix of indexed tokens:
+  // {{ids: matching company ids, score: Uint8Array indexed by company}}
+  function termHits(term) {{
+    if (termCache.has(term)) return termCache.get(term);
+    const t = SEARCH.t;
+    let lo = 0, hi = t.length;
+    while (lo < hi) {{ const mid = (lo + hi) >> 1; if (t[mid] < term) lo = mid + 1; else hi = mid; }}
+    const score = new Uint8Array(ALL.length), ids = [];
+    for (let i = lo; i < t.length && t[i].startsWith(term); i++) {{
+      const bonus = t[i].length === term.length ? 1 : 0;   // whole-word match
+      const p = SEARCH.p[i];
+      for (let k = 0, id = 0; k < p.length; k += 2) {{
+        id += p[k];
+        const s = FIELD_SCORE[p[k + 1]] + bonus;
+        if (!score[id]) ids.push(id);
+        if (s > score[id]) score[id] = s;
+      }}
+    }}
+    const hits = {{ids, score}};
+    if (termCache.size > 64) termCache.clear();
+    termCache.set(term, hits);
+    return hits;
+  }}
+  // All terms must match (AND); a company's score is the sum over the terms.
+  // Returns Map company id → score, or null when the query has no terms.
+  function runSearch(q) {{
+    const terms = [...new Set(q.toLowerCase().match(/[\\p{{L}}\\p{{N}}]+/gu) || [])];
+    if (!terms.length) return null;
+    const hits = terms.map(termHits).sort((a, b) => a.ids.length - b.ids.length);
+    const out = new Map();
+    for (const id of hits[0].ids) {{
+      let s = 0;
+      for (const h of hits) {{
+        if (!h.score[id]) {{ s = 0; break; }}
+        s += h.score[id];
+      }}
+      if (s) out.set(id, s);
+    }}
+    return out;
+  }}
+
+  // ── distance filter (implicit k-d tree of the companies' postcodes, see geo.KDTree) ──
+  const KM_PER_DEG = Math.PI * 6371 / 180;
+  const RAD = Math.PI / 180;
+  function haversineKm(lat1, lon1, lat2, lon2) {{
+    const a = Math.sin((lat2 - lat1) * RAD / 2) ** 2 +
+              Math.cos(lat1 * RAD) * Math.cos(lat2 * RAD) * Math.sin((lon2 - lon1) * RAD / 2) ** 2;
+    return 2 * 6371 * Math.asin(Math.min(1, Math.sqrt(a)));
+  }}
+  // {{q: postcode (full or district)}} or {{lat, lon}} → {{lat, lon, label, approx}}; null if unknown
+  function locate(near) {{
+    if (near.lat !== undefined) return {{lat: near.lat, lon: near.lon, label: 'your location', approx: false}};
+    const m = (near.q || '').toUpperCase().replace(/\\s+/g, '').match(/^([A-Z]{{1,2}}\\d[A-Z\\d]?)(\\d[A-Z]{{2}})?$/);
+    if (!m) return null;
+    const full = m[2] ? `${{m[1]}} ${{m[2]}}` : m[1];
+    const [pc, approx] = IDX.places[full] ? [full, !m[2]] : [m[1], true];
+    const p = IDX.places[pc];
+    return p ? {{lat: p[0], lon: p[1], label: m[2] && approx ? `${{pc}} (district centre)` : pc, approx}} : null;
+  }}
+  // Map company id → -distance (so nearer ranks higher) of the companies whose
+  // postcode is within km; the ids placed by district centre only go in approx
+  function withinKm(lat, lon, km, approx) {{
+    const kd = IDX.kd, out = new Map();
+    const dlat = km / KM_PER_DEG;
+    const dlon = km / (KM_PER_DEG * Math.max(Math.cos(Math.min(Math.abs(lat) + dlat, 89.9) * RAD), 1e-6));
+    const stack = [0, kd.length, 0];   // lo, hi, depth
+    while (stack.length) {{
+      const depth = stack.pop(), hi = stack.pop(), lo = stack.pop();
+      if (lo >= hi) continue;
+      const mid = (lo + hi) >> 1, [id, plat, plon, exact] = kd[mid];
+      const d = haversineKm(lat, lon, plat, plon);
+      if (d <= km) {{
+        out.set(id, -d);
+        if (!exact) approx.add(id);
+      }}
+      const [q, v, r] = depth & 1 ? [lon, plon, dlon] : [lat, plat, dlat];
+      if (q - r <= v) stack.push(lo, mid, depth + 1);
+      if (q + r >= v) stack.push(mid + 1, hi, depth + 1);
+    }}
+    return out;
+  }}
+
+  // Company ids passing the filters; ranked by score (search, else nearness) while one is active
+  function filterIds(state, hits, mask) {{
+    if (hits) {{
+      return Int32Array.from([...hits.keys()]
+        .filter(i => !mask || hasBit(mask, i))
+        .sort((a, b) => hits.get(b) - hits.get(a) || a - b));
+    }}
+    if (!mask) {{
+      const all = new Int32Array(ALL.length);
+      for (let i = 0; i < all.length; i++) all[i] = i;
+      return all;
+    }}
+    const out = [];
+    for (let w = 0; w < mask.length; w++) {{
+      for (let bits = mask[w]; bits; bits &= bits - 1) out.push((w << 5) + 31 - Math.clz32(bits & -bits));
+    }}
+    return Int32Array.from(out);
+  }}
+
+  // ── jobs: company → role id ranges ──
+  // Roles of the given companies, optionally narrowed to titles/companies containing jobQuery
+  function rolesFor(ids, jobQuery) {{
+    const q = (jobQuery||'').toLowerCase();
+    const start = IDX.role_start, out = [];
+    for (const id of ids) {{
+      for (let i = start[id]; i < start[id + 1]; i++) {{
+        const r = ROLES[i];
+        if (q && !r.title.toLowerCase().includes(q) && !r.company.toLowerCase().includes(q)) continue;
+        out.push(i);
+      }}
+    }}
+    return Int32Array.from(out);
+  }}
+  // Actively hiring companies with no listed roles
+  function outreachFor(ids) {{
+    const start = IDX.role_start;
+    return keepBits(ids, HIRING, id => start[id] === start[id + 1]);
+  }}
+  const jobsFor = (ids, jobQuery) => ROLES && {{roles: rolesFor(ids, jobQuery), outreach: outreachFor(ids)}};
+
+  // ── CSV ──
+  function escapeCSV(v) {{
+    if (v === null || v === undefined) return '';
+    const s = String(v);
+    return s.includes(',') || s.includes('"') || s.includes('\\n')
+      ? '"' + s.replace(/"/g, '""') + '"' : s;
+  }}
+  const CSV = {{
+    companies: {{
+      headers: ['Company','URL','Stage','Employees','Hiring Status','Sectors','Postcode','CH Verified','Source','Hub','Description','Careers URL','Tech Keywords','Founded'],
+      cols: ['name','url','stage','employees','hiring','tags_str','postcode','ch','source','hub','desc','careers_url','tech','founded'],
+      rows: () => Array.from(current, i => ALL[i]),
+      value: (c, k) => k === 'tags_str' ? c.tags.join('; ') : c[k],
+    }},
+    roles: {{
+      headers: ['Role','Company','Type','Location','Stage','Apply URL','Company URL'],
+      cols: ['title','company','type_','location','stage','careers_url','url'],
+      rows: () => Array.from(rolesFor(current, ''), i => ROLES[i]),
+      value: (r, k) => r[k],
+    }},
+  }};
+
+  const ops = {{
+    async init({{companies, index, search}}) {{
+      const [data, idx] = await Promise.all([load(companies), load(index)]);
+      ({{companies: ALL, roles: ROLES}} = decodeColumnar(data));
+      IDX = idx;
+      FACETS = {{}};
+      for (const [key, vals] of Object.entries(IDX.facets)) {{
+        FACETS[key] = Object.fromEntries(Object.entries(vals).map(([v, b64]) => [v, decodeBits(b64)]));
+      }}
+      HIRING = FACETS.hiring.actively_hiring || new Uint32Array((ALL.length + 31) >> 5);
+      CODES = Object.fromEntries(Object.entries(IDX.stats).map(([f, s]) => [f, {{values: s.values, codes: decodeBytes(s.codes)}}]));
+      searchSrc = search;
+      current = filterIds({{}}, null, null);
+      return {{count: ALL.length}};
+    }},
+    async filter({{state, jobQuery}}) {{
+      let hits = null, searchBits = null, near = null, nearBits = null, districtOnly = null;
+      if (state.search && state.search.trim()) {{
+        SEARCH = SEARCH || await load(searchSrc);
+        hits = runSearch(state.search);
+      }}
+      if (hits) searchBits = toBits(hits.keys());
+      if (state.near) {{
+        near = locate(state.near) || {{error: 'unknown postcode'}};
+        if (!near.error) {{
+          districtOnly = new Set();
+          const dist = withinKm(near.lat, near.lon, state.near.km, districtOnly);
+          nearBits = toBits(dist.keys());
+          hits = hits || dist;   // without a search query, nearest first
+        }}
+      }}
+      current = filterIds(state, hits, maskExcept(state, null, nearBits));
+      if (districtOnly) near.districtOnly = current.filter(i => districtOnly.has(i)).length;
+      return {{
+        ids: current,
+        hiring: keepBits(current, HIRING),
+        counts: facetCounts(state, andBits(searchBits, nearBits)),
+        jobs: jobsFor(current, jobQuery),
+        near,
+        stats: liveStats(current),
+      }};
+    }},
+    jobs({{jobQuery}}) {{
+      return jobsFor(current, jobQuery);
+    }},
+    csv({{kind}}, part) {{
+      const spec = CSV[kind], rows = spec.rows();
+      part(spec.headers.join(',') + '\\n');
+      for (let i = 0; i < rows.length; i += CSV_CHUNK) {{
+        let chunk = '';
+        for (const row of rows.slice(i, i + CSV_CHUNK)) {{
+          chunk += spec.cols.map(k => escapeCSV(spec.value(row, k))).join(',') + '\\n';
+        }}
+        part(chunk);
+      }}
+      return {{rows: rows.length}};
+    }},
+  }};
+  // Requests are handled one at a time, in order, so `current` always belongs
+  // to the latest filter request before it
+  let queue = Promise.resolve();
+  self.onmessage = ({{data: {{seq, op, args}}}}) => {{
+    queue = queue.then(async () => {{
+      try {{
+        self.postMessage({{seq, result: await ops[op](args, part => self.postMessage({{seq, part}}))}});
+      }} catch (err) {{
+        self.postMessage({{seq, error: err.message}});
+      }}
+    }});
+  }};
+}}
+
+// ── engine client ──
+// engine.call(op, args, onPart) → Promise of the op's result; onPart receives
+// streamed chunks (CSV). Falls back to running filterEngine in-page if the
+// Worker cannot be created or fails to start.
+const engine = (() => {{
+  const pending = new Map();
+  let seq = 0, port;
+  function receive({{data}}) {{
+    const req = pending.get(data.seq);
+    if (!req) return;
+    if ('part' in data) {{ req.onPart && req.onPart(data.part); return; }}
+    pending.delete(data.seq);
+    if ('error' in data) req.reject(new Error(data.error));
+    else req.resolve(data.result);
+  }}
+  function inPage() {{
+    const self = {{postMessage: m => setTimeout(() => receive({{data: m}}))}};
+    filterEngine(self);
+    return {{postMessage: m => setTimeout(() => self.onmessage({{data: m}}))}};
+  }}
+  try {{
+    const src = URL.createObjectURL(new Blob([`${{decodeColumnar}}\n(${{filterEngine}})(self);`], {{type: 'text/javascript'}}));
+    port = new Worker(src);
+    port.onmessage = receive;
+    port.onerror = e => {{   // e.g. blocked by the page's origin: replay in-page
+      if (e.preventDefault) e.preventDefault();
+      port.terminate();
+      port = inPage();
+      for (const req of pending.values()) port.postMessage(req.msg);
+    }};
+  }} catch (err) {{
+    port = inPage();
+  }}
+  return {{
+    call(op, args, onPart) {{
+      return new Promise((resolve, reject) => {{
+        const msg = {{seq: ++seq, op, args}};
+        pending.set(msg.seq, {{resolve, reject, onPart, msg}});
+        port.postMessage(msg);
+      }});
+    }},
+  }};
+}})();
+const absURL = u => new URL(u, location.href).href;   // the Worker's base URL is a blob:
+
 // ── filter state ──
-const state = {{search:'', sector:'', stage:'', hiring:'', source:''}};
-
-function getFiltered() {{
-  const s = state.search.toLowerCase();
-  return ALL.filter(c => {{
-    if (s && !c.name.toLowerCase().includes(s) && !c.desc.toLowerCase().includes(s) && !c.tags_str.toLowerCase().includes(s)) return false;
-    if (state.sector && !c.tags.includes(state.sector)) return false;
-    if (state.stage  && c.stage  !== state.stage)  return false;
-    if (state.hiring && c.hiring !== state.hiring) return false;
-    if (state.source && c.source !== state.source) return false;
-    return true;
+const state = {{search:'', sector:'', stage:'', hiring:'', source:'', near:null}};
+let FILTERED = [];     // companies passing the filters (ranked while searching)
+let FILTERED_IDS = []; // their ids
+let tableRows = null;  // Uint8Array row filter for the DataTable, null = all rows
+let filterSeq = 0, jobsSeq = 0;
+
+function getFiltered() {{ return FILTERED; }}
+
+// Companies per facet value under the other active filters, in the dropdowns
+function updateFacetCounts(counts) {{
+  const selects = {{sector:'fSector', stage:'fStage', hiring:'fHiring', source:'fSource'}};
+  for (const [key, id] of Object.entries(selects)) {{
+    for (const o of document.getElementById(id).options || []) {{
+      if (!o.value) continue;
+      if (o.dataset.label === undefined) o.dataset.label = o.textContent;
+      o.textContent = `${{o.dataset.label}} (${{counts[key][o.value] || 0}})`;
+    }}
+  }}
+}}
+
+// Typing in the search box: one request once the keystrokes pause
+const SEARCH_DEBOUNCE_MS = 150;
+let searchTimer = 0;
+function applyFiltersSoon() {{
+  clearTimeout(searchTimer);
+  searchTimer = setTimeout(applyFilters, SEARCH_DEBOUNCE_MS);
+}}
+// Ask the engine for the current filters and render the answer, unless a
+// newer request has been made in the meantime
+function applyFilters() {{
+  clearTimeout(searchTimer);
+  const mySeq = ++filterSeq;
+  jobsSeq++;   // the filter answer carries the jobs too
+  const jobQuery = document.getElementById('jobSearch').value;
+  return engine.call('filter', {{state: {{...state}}, jobQuery}}).then(res => {{
+    if (mySeq !== filterSeq) return;
+    FILTERED_IDS = res.ids;
+    FILTERED = Array.from(res.ids, i => ALL[i]);
+    tableRows = null;
+    if (res.ids.length !== ALL.length) {{
+      tableRows = new Uint8Array(ALL.length);
+      res.ids.forEach(i => {{ tableRows[i] = 1; }});
+    }}
+    updateFacetCounts(res.counts);
+    showNear(res.near, res.ids.length);
+    updateStats(res.stats);
+    if (table) table.draw();
+    renderHiringCards(Array.from(res.hiring, i => ALL[i]));
+    updateMap();
+    if (res.jobs) renderJobs(res.jobs);
+  }});
+}}
+function refreshJobs() {{
+  const mySeq = ++jobsSeq;
+  return engine.call('jobs', {{jobQuery: document.getElementById('jobSearch').value}}).then(jobs => {{
+    if (mySeq === jobsSeq && jobs) renderJobs(jobs);
   }});
 }}
 
+// ── windowed rendering ──
+// Renders only the blocks of items near the viewport; spacers above and below
+// stand in for the rest, sized from measured block heights (estimated until a
+// block has been shown). DOM size stays a few blocks whatever the item count.
+const VLISTS = [];
+class VirtualList {{
+  constructor(el, renderItem, {{perBlock = 20, estimate = 800, grid = false}} = {{}}) {{
+    Object.assign(this, {{el, renderItem, perBlock, estimate, grid}});
+    this.items = [];
+    this.heights = [];   // measured height per block
+    this.range = '';
+    this.top = document.createElement('div');
+    this.body = document.createElement('div');
+    this.bottom = document.createElement('div');
+    el.replaceChildren(this.top, this.body, this.bottom);
+    VLISTS.push(this);
+  }}
+  setItems(items) {{
+    this.items = items;
+    this.range = '';
+    this.update();
+  }}
+  blockHeight(b) {{ return this.heights[b] || this.estimate; }}
+  update() {{
+    const nBlocks = Math.ceil(this.items.length / this.perBlock);
+    const visible = this.el.offsetParent !== null && this.el.offsetParent !== undefined;
+    const viewTop = visible ? -this.el.getBoundingClientRect().top - VLIST_OVERSCAN : 0;
+    const viewBottom = viewTop + innerHeight + 2 * VLIST_OVERSCAN;
+    let y = 0, b = 0;
+    while (b < nBlocks && y + this.blockHeight(b) < viewTop) y += this.blockHeight(b++);
+    const first = b, above = y;
+    while (b < nBlocks && y < viewBottom) y += this.blockHeight(b++);
+    const last = b;
+    const range = `${{first}}:${{last}}`;
+    if (range !== this.range) {{
+      this.range = range;
+      let html = '';
+      for (let k = first; k < last; k++) {{
+        const items = this.items.slice(k * this.perBlock, (k + 1) * this.perBlock).map(this.renderItem).join('');
+        html += `<div class="vblock">${{this.grid ? `<div class="row g-3">${{items}}</div>` : items}}</div>`;
+      }}
+      this.body.innerHTML = html;
+      if (visible) [...this.body.children].forEach((node, i) => {{
+        if (node.offsetHeight) this.heights[first + i] = node.offsetHeight;
+      }});
+    }}
+    let below = 0;
+    for (let k = last; k < nBlocks; k++) below += this.blockHeight(k);
+    this.top.style.height = `${{above}}px`;
+    this.bottom.style.height = `${{below}}px`;
+  }}
+}}
+const VLIST_OVERSCAN = 600;   // px rendered beyond the viewport, above and below
+let vlistFrame = 0;
+function refreshVirtualLists(remeasure) {{
+  if (vlistFrame) return;
+  vlistFrame = requestAnimationFrame(() => {{
+    vlistFrame = 0;
+    VLISTS.forEach(l => {{ if (remeasure) {{ l.heights = []; l.range = ''; }} l.update(); }});
+  }});
+}}
+addEventListener('scroll', () => refreshVirtualLists(false), {{passive: true}});
+addEventListener('resize', () => refreshVirtualLists(true));
+
 // ── hero stats ──
-function renderHero() {{
+function renderHero(s = STATS) {{
   const h = document.getElementById('heroStats');
   const pills = [
-    [ALL.length, 'Companies'], [STATS.hiring, 'Actively Hiring'],
-    [STATS.startups, 'Startups'], [STATS.scaleups, 'Scaleups'],
-    [STATS.ch_verified, 'CH Verified'], [STATS.sectors, 'Sectors']
+    [s.total, 'Companies'], [s.hiring, 'Actively Hiring'],
+    [s.startups, 'Startups'], [s.scaleups, 'Scaleups'],
+    [s.ch_verified, 'CH Verified'], [s.sectors, 'Sectors']
   ];
   h.innerHTML = pills.map(([n,l]) =>
     `<div class="stat-pill"><div class="stat-num">${{n}}</div><div class="stat-lbl">${{l}}</div></div>`
@@ -582,184 +1540,286 @@ function renderHero() {{
 }}
 
 // ── hiring cards ──
-function renderHiringCards(cos) {{
-  const hiring = cos.filter(c => c.hiring === 'actively_hiring');
+function hiringCard(c) {{
+  const tags = c.tags.slice(0,2).map(tagBadge).join(' ');
+  const roles = c.roles.map(r => `<span class="role-chip">📌 ${{r.title}}</span>`).join('');
+  const rolesSection = c.roles.length ? `<div class="mt-2">${{roles}}</div>` : '';
+  const btn = c.careers_url
+    ? `<a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success mt-2 py-0">View jobs ↗</a>`
+    : (c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary mt-2 py-0">Visit site ↗</a>` : '');
+  return `<div class="col-md-6 col-lg-4 mb-1">
+    <div class="hire-card">
+      <h6><a href="${{c.url || '#'}}" target="_blank">${{c.name}}</a></h6>
+      <div class="mb-1">${{tags}}</div>
+      <div class="card-desc">${{c.desc.slice(0,140)}}${{c.desc.length>140?'…':''}}</div>
+      ${{rolesSection}}${{btn}}
+    </div></div>`;
+}}
+const hiringList = new VirtualList(document.getElementById('hiringCards'), hiringCard,
+                                   {{perBlock: 12, estimate: 720, grid: true}});
+function renderHiringCards(hiring) {{
   document.getElementById('hiringCount').textContent = hiring.length;
-  const el = document.getElementById('hiringCards');
-  const none = document.getElementById('hiringNone');
-  if (!hiring.length) {{ el.innerHTML=''; none.classList.remove('d-none'); return; }}
-  none.classList.add('d-none');
-  el.innerHTML = hiring.map(c => {{
-    const tags = c.tags.slice(0,2).map(tagBadge).join(' ');
-    const roles = c.roles.map(r => `<span class="role-chip">📌 ${{r.title}}</span>`).join('');
-    const rolesSection = c.roles.length ? `<div class="mt-2">${{roles}}</div>` : '';
-    const btn = c.careers_url
-      ? `<a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success mt-2 py-0">View jobs ↗</a>`
-      : (c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary mt-2 py-0">Visit site ↗</a>` : '');
-    return `<div class="col-md-6 col-lg-4 mb-1">
-      <div class="hire-card">
-        <h6><a href="${{c.url || '#'}}" target="_blank">${{c.name}}</a></h6>
-        <div class="mb-1">${{tags}}</div>
-        <div class="card-desc">${{c.desc.slice(0,140)}}${{c.desc.length>140?'…':''}}</div>
-        ${{rolesSection}}${{btn}}
-      </div></div>`;
-  }}).join('');
+  document.getElementById('hiringNone').classList.toggle('d-none', hiring.length > 0);
+  hiringList.setItems(hiring);
 }}
 
 // ── jobs tab ──
-function renderJobs(cos, jobQuery) {{
-  const q = (jobQuery||'').toLowerCase();
-  let roles = ALL_ROLES.filter(r => {{
-    if (!cos.find(c => c.name === r.company)) return false;
-    if (q && !r.title.toLowerCase().includes(q) && !r.company.toLowerCase().includes(q)) return false;
-    return true;
-  }});
-  const jobsEl   = document.getElementById('jobsList');
-  const jobsNone = document.getElementById('jobsNone');
-  const countEl  = document.getElementById('jobsCount');
-  countEl.textContent = roles.length;
-  if (roles.length) {{
-    jobsNone.classList.add('d-none');
-    jobsEl.innerHTML = roles.map(r => {{
-      const tags = r.tags.slice(0,2).map(tagBadge).join(' ');
-      const typeLabel = r.type_ !== 'unknown' ? r.type_ : '';
-      const apply = r.careers_url ? `<a href="${{r.careers_url}}" target="_blank" class="btn btn-sm btn-success py-0 ms-auto flex-shrink-0">Apply ↗</a>` : '';
-      return `<div class="job-card">
-        <div class="flex-grow-1">
-          <div class="job-title">${{r.title}}</div>
-          <div class="job-co"><a href="${{r.url}}" target="_blank">${{r.company}}</a> · ${{r.stage}}</div>
-          <div class="job-meta">${{[r.location, typeLabel].filter(Boolean).join(' · ')}} &nbsp; ${{tags}}</div>
-        </div>${{apply}}
-      </div>`;
-    }}).join('');
-  }} else {{
-    jobsEl.innerHTML = '';
-    jobsNone.classList.remove('d-none');
-  }}
+function jobCard(r) {{
+  const tags = r.tags.slice(0,2).map(tagBadge).join(' ');
+  const typeLabel = r.type_ !== 'unknown' ? r.type_ : '';
+  const apply = r.careers_url ? `<a href="${{r.careers_url}}" target="_blank" class="btn btn-sm btn-success py-0 ms-auto flex-shrink-0">Apply ↗</a>` : '';
+  return `<div class="job-card">
+    <div class="flex-grow-1">
+      <div class="job-title">${{r.title}}</div>
+      <div class="job-co"><a href="${{r.url}}" target="_blank">${{r.company}}</a> · ${{r.stage}}</div>
+      <div class="job-meta">${{[r.location, typeLabel].filter(Boolean).join(' · ')}} &nbsp; ${{tags}}</div>
+    </div>${{apply}}
+  </div>`;
+}}
+function outreachCard(c) {{
+  const tags = c.tags.slice(0,2).map(tagBadge).join(' ');
+  const mailto = c.contact ? `<a href="mailto:${{c.contact}}" class="btn btn-sm btn-outline-primary mt-2 py-0">Email ↗</a>` : '';
+  const careers= c.careers_url ? `<a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success mt-2 py-0 ms-1">Jobs ↗</a>` : '';
+  const site   = c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary mt-2 py-0 ms-1">Site ↗</a>` : '';
+  return `<div class="col-md-6 col-lg-4 mb-1">
+    <div class="hire-card">
+      <h6><a href="${{c.url || '#'}}" target="_blank">${{c.name}}</a></h6>
+      <div class="mb-1">${{tags}}</div>
+      <div class="card-desc">${{c.desc.slice(0,120)}}${{c.desc.length>120?'…':''}}</div>
+      ${{mailto}}${{careers}}${{site}}
+    </div></div>`;
+}}
+const jobsList     = new VirtualList(document.getElementById('jobsList'), jobCard,
+                                     {{perBlock: 25, estimate: 1900}});
+const outreachList = new VirtualList(document.getElementById('outreachCards'), outreachCard,
+                                     {{perBlock: 12, estimate: 640, grid: true}});
+// jobs = {{roles: role ids, outreach: company ids}} from the engine
+function renderJobs(jobs) {{
+  if (!ALL_ROLES) return;   // rendered once roles have loaded
+  const roles = Array.from(jobs.roles, i => ALL_ROLES[i]);
+  document.getElementById('jobsCount').textContent = roles.length;
+  document.getElementById('jobsNone').classList.toggle('d-none', roles.length > 0);
+  jobsList.setItems(roles);
 
   // Outreach cards
-  const hasRoleNames = new Set(ALL_ROLES.map(r => r.company));
-  const outreach = cos.filter(c => c.hiring === 'actively_hiring' && !hasRoleNames.has(c.name));
+  const outreach = Array.from(jobs.outreach, i => ALL[i]);
   document.getElementById('outreachCount').textContent = outreach.length;
-  document.getElementById('outreachCards').innerHTML = outreach.map(c => {{
-    const tags = c.tags.slice(0,2).map(tagBadge).join(' ');
-    const mailto = c.contact ? `<a href="mailto:${{c.contact}}" class="btn btn-sm btn-outline-primary mt-2 py-0">Email ↗</a>` : '';
-    const careers= c.careers_url ? `<a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success mt-2 py-0 ms-1">Jobs ↗</a>` : '';
-    const site   = c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary mt-2 py-0 ms-1">Site ↗</a>` : '';
-    return `<div class="col-md-6 col-lg-4 mb-1">
-      <div class="hire-card">
-        <h6><a href="${{c.url || '#'}}" target="_blank">${{c.name}}</a></h6>
-        <div class="mb-1">${{tags}}</div>
-        <div class="card-desc">${{c.desc.slice(0,120)}}${{c.desc.length>120?'…':''}}</div>
-        ${{mailto}}${{careers}}${{site}}
-      </div></div>`;
-  }}).join('');
+  outreachList.setItems(outreach);
 }}
 
 // ── CSV download ──
-function escapeCSV(v) {{
-  if (v === null || v === undefined) return '';
-  const s = String(v);
-  return s.includes(',') || s.includes('"') || s.includes('\\n')
-    ? '"' + s.replace(/"/g, '""') + '"' : s;
-}}
-function triggerDownload(csv, filename) {{
-  const blob = new Blob([csv], {{type: 'text/csv;charset=utf-8;'}});
-  const a = document.createElement('a');
-  a.href = URL.createObjectURL(blob);
-  a.download = filename;
-  a.click();
+// The engine serialises the filtered rows in chunks; the chunks become the
+// parts of a Blob, so no single string holds the whole file
+function downloadCSV(kind, filename) {{
+  const parts = [];
+  return engine.call('csv', {{kind}}, chunk => parts.push(chunk)).then(() => {{
+    const a = document.createElement('a');
+    a.href = URL.createObjectURL(new Blob(parts, {{type: 'text/csv;charset=utf-8;'}}));
+    a.download = filename;
+    a.click();
+    setTimeout(() => URL.revokeObjectURL(a.href), 0);
+  }});
 }}
 function downloadCompaniesCSV() {{
-  const cos = getFiltered();
-  const cols = ['name','url','stage','employees','hiring','tags_str','postcode','ch','source','hub','desc','careers_url','tech','founded'];
-  const headers = ['Company','URL','Stage','Employees','Hiring Status','Sectors','Postcode','CH Verified','Source','Hub','Description','Careers URL','Tech Keywords','Founded'];
-  const rows = [headers.join(',')].concat(cos.map(c => cols.map(k => escapeCSV(k==='tags_str'?c.tags.join('; '):c[k])).join(',')));
-  triggerDownload(rows.join('\\n'), 'cambridge_tech_companies.csv');
+  return downloadCSV('companies', 'cambridge_tech_companies.csv');
 }}
 function downloadRolesCSV() {{
-  const cos = getFiltered();
-  const cosNames = new Set(cos.map(c => c.name));
-  const roles = ALL_ROLES.filter(r => cosNames.has(r.company));
-  const cols = ['title','company','type_','location','stage','careers_url','url'];
-  const headers = ['Role','Company','Type','Location','Stage','Apply URL','Company URL'];
-  const rows = [headers.join(',')].concat(roles.map(r => cols.map(k => escapeCSV(r[k])).join(',')));
-  triggerDownload(rows.join('\\n'), 'cambridge_tech_roles.csv');
+  return downloadCSV('roles', 'cambridge_tech_roles.csv');
 }}
 
+// ── data loading ──
+function fetchJSON(url) {{
+  return fetch(url).then(r => {{
+    if (!r.ok) throw new Error(`${{url}}: HTTP ${{r.status}}`);
+    return r.json();
+  }});
+}}
+// Repeat and offline visits: the split build ships a service worker (sw.js)
+if (DATA_URLS && 'serviceWorker' in navigator && location.protocol !== 'file:') {{
+  navigator.serviceWorker.register('sw.js').catch(err => console.warn('service worker:', err));
+}}
+const payload = DATA_URLS ? fetchJSON(DATA_URLS.companies) : Promise.resolve(INLINE.companies);
+const dataReady = payload.then(decodeColumnar);
+// The engine loads its own copy (straight from the data files with --split)
+const engineReady = engine.call('init', DATA_URLS
+  ? {{companies: absURL(DATA_URLS.companies), index: absURL(DATA_URLS.index), search: absURL(DATA_URLS.search)}}
+  : {{companies: INLINE.companies, index: INLINE.index, search: INLINE.search}});
+
+// Company table columns: [cell HTML, plain value for sorting/searching]. The
+// table is fed from ALL with deferRender, so cell HTML is only built for the
+// rows on the page being shown.
+const STAGE_CLS = {{startup:'info', scaleup:'primary', established:'dark', unknown:'secondary'}};
+const HIRE_CLS  = {{actively_hiring:'success', possibly_hiring:'warning', no_info:'secondary'}};
+const HIRE_LBL  = {{actively_hiring:'Hiring', possibly_hiring:'Possibly', no_info:'?'}};
+const CO_COLUMNS = [
+  [c => `${{c.url ? `<a href="${{c.url}}" target="_blank" class="co-link">${{c.name}}</a>` : c.name}}<br><small class="text-muted">${{c.desc.slice(0,100)}}${{c.desc.length>100?'…':''}}</small>`,
+   c => c.name],
+  [c => c.tags.slice(0,3).map(tagBadge).join(' '), c => c.tags_str],
+  [c => `<span class="badge bg-${{STAGE_CLS[c.stage]||'secondary'}}">${{c.stage}}</span>`, c => c.stage],
+  [c => c.employees, c => c.employees],
+  [c => `<span class="badge bg-${{HIRE_CLS[c.hiring]||'secondary'}}">${{HIRE_LBL[c.hiring]||'?'}}</span>`, c => HIRE_LBL[c.hiring]||'?'],
+  [c => c.careers_url ? `<a href="${{c.careers_url}}" target="_blank" class="btn btn-xs btn-outline-success">Jobs↗</a>` : '', c => ''],
+  [c => c.ch_url ? `<a href="${{c.ch_url}}" target="_blank" title="Companies House profile" class="text-muted small">CH↗</a>` : '', c => ''],
+  [c => `<span class="badge bg-${{c.source==='hub'?'primary':'secondary'}} opacity-75">${{c.source==='hub'?'Hub':'CH'}}</span>`,
+   c => c.source==='hub' ? 'Hub' : 'CH'],
+];
+
 // ── DataTable ──
 let table;
-$(document).ready(function() {{
+// The search box and facet filters apply to the table through the engine's
+// answer rather than DataTables' per-row string matching
+// (rows are in ALL order: dataIndex = company id)
+$.fn.dataTable.ext.search.push((settings, data, dataIndex) =>
+  settings.nTable.id !== 'coTable' || !tableRows || tableRows[dataIndex] === 1);
+function initTable() {{
   table = $('#coTable').DataTable({{
+    data: ALL,
+    deferRender: true,
+    columns: CO_COLUMNS.map(([cell, plain]) => ({{
+      data: null, render: (_, type, c) => type === 'display' ? cell(c) : plain(c),
+    }})),
+    columnDefs: [
+      {{ orderable:false, targets:[1,5,6,7] }},
+      {{ className:'nowrap', targets:1 }},
+      {{ className:'text-center', targets:[4,5,6,7] }},
+      {{ className:'text-center small', targets:3 }},
+    ],
     pageLength: 50,
     order: [[4,'asc']],
-    columnDefs: [{{ orderable:false, targets:[1,5,6,7] }}],
     language: {{ search:'', info:'Showing _START_–_END_ of _TOTAL_', lengthMenu:'Show _MENU_' }},
     drawCallback() {{ document.getElementById('tableCount').textContent = this.api().rows({{search:'applied'}}).count(); }}
   }});
-  $('#fSearch').on('keyup', function() {{ table.search(this.value).draw(); }});
-  $('#fSector').on('change', function() {{ table.column(1).search(this.value,false,true).draw(); }});
-  $('#fStage').on('change',  function() {{ table.column(2).search(this.value).draw(); }});
-  $('#fHiring').on('change', function() {{ table.column(4).search(this.value,false,true).draw(); }});
-  $('#fSource').on('change', function() {{ table.column(7).search(this.value,false,true).draw(); }});
-}});
+}}
 
 // ── filter listeners ──
 ['fSearch','fSector','fStage','fHiring','fSource'].forEach(id => {{
   document.getElementById(id).addEventListener(id==='fSearch'?'input':'change', () => {{
-    state.search = document.getElementById('fSearch').value;
     state.sector = document.getElementById('fSector').value;
     state.stage  = document.getElementById('fStage').value;
     state.hiring = document.getElementById('fHiring').value;
     state.source = document.getElementById('fSource').value;
-    const f = getFiltered();
-    renderHiringCards(f);
-    updateMap(f);
-    renderJobs(f, document.getElementById('jobSearch').value);
+    state.search = document.getElementById('fSearch').value;
+    if (id === 'fSearch') applyFiltersSoon();
+    else applyFilters();
   }});
 }});
-document.getElementById('jobSearch').addEventListener('input', () => {{
-  renderJobs(getFiltered(), document.getElementById('jobSearch').value);
+document.getElementById('jobSearch').addEventListener('input', refreshJobs);
+
+// ── distance filter: a postcode (or the browser's location) and a radius ──
+let myLocation = null;   // {{lat, lon}} once "Near me" has been granted
+function readNear() {{
+  const q = document.getElementById('fNear').value.trim();
+  const km = +document.getElementById('fRadius').value;
+  state.near = q ? {{q, km}} : myLocation ? {{...myLocation, km}} : null;
+}}
+document.getElementById('fNear').addEventListener('input', () => {{
+  myLocation = null;
+  readNear();
+  applyFiltersSoon();
 }});
+document.getElementById('fRadius').addEventListener('change', () => {{ readNear(); applyFilters(); }});
+function nearMe() {{
+  if (!navigator.geolocation) {{ showNear({{error:'location unavailable'}}, 0); return; }}
+  navigator.geolocation.getCurrentPosition(pos => {{
+    myLocation = {{lat: pos.coords.latitude, lon: pos.coords.longitude}};
+    document.getElementById('fNear').value = '';
+    readNear();
+    applyFilters();
+  }}, () => showNear({{error:'location permission denied'}}, 0));
+}}
+function showNear(near, n) {{
+  const info = document.getElementById('nearInfo');
+  if (!near) {{ info.textContent = ''; return; }}
+  info.textContent = near.error
+    ? `📍 ${{near.error}} — distance filter off`
+    : `📍 ${{n}} companies within ${{state.near.km}} km of ${{near.label}}` +
+      (near.approx ? ' (approximate)' : '') + (state.search.trim() ? '' : ', nearest first') +
+      (near.districtOnly ? ` · ${{near.districtOnly}} known by postcode district only, distance approximate` : '');
+}}
+
 function resetFilters() {{
-  ['fSearch','fSector','fStage','fHiring','fSource'].forEach(id => document.getElementById(id).value='');
-  Object.assign(state, {{search:'',sector:'',stage:'',hiring:'',source:''}});
-  if (table) table.search('').columns().search('').draw();
-  const f = getFiltered();
-  renderHiringCards(f);
-  updateMap(f);
-  renderJobs(f, '');
-}}
-
-// ── charts ──
-new Chart(document.getElementById('sectorChart'),{{
-  type:'bar',
-  data:{{labels:STATS.tag_labels, datasets:[{{data:STATS.tag_vals, backgroundColor:'#1b3a6b', borderRadius:5}}]}},
-  options:{{
-    indexAxis:'y',
-    plugins:{{legend:{{display:false}}, tooltip:{{callbacks:{{label:ctx=>' '+ctx.raw+' companies'}}}}}},
-    scales:{{x:{{grid:{{display:false}},ticks:{{color:'#888'}}}},y:{{grid:{{display:false}},ticks:{{color:'#555',font:{{size:11}}}}}}}}
-  }}
-}});
-new Chart(document.getElementById('stageChart'),{{
-  type:'doughnut',
-  data:{{labels:['Startup','Scaleup','Established','Unknown'],datasets:[{{data:STATS.stage_vals,backgroundColor:['#0077b6','#6a0dad','#333','#adb5bd'],borderWidth:2,borderColor:'#fff'}}]}},
-  options:{{plugins:{{legend:{{position:'bottom',labels:{{font:{{size:11}},padding:10,usePointStyle:true}}}}}}}}
-}});
-new Chart(document.getElementById('empChart'),{{
-  type:'bar',
-  data:{{labels:['1-10','11-50','51-200','200-1k','1k+','?'],datasets:[{{data:STATS.emp_vals,backgroundColor:'#40916c',borderRadius:5}}]}},
-  options:{{
-    indexAxis:'y',
-    plugins:{{legend:{{display:false}},tooltip:{{callbacks:{{label:ctx=>' '+ctx.raw+' companies'}}}}}},
-    scales:{{x:{{grid:{{display:false}},ticks:{{color:'#888'}}}},y:{{grid:{{display:false}},ticks:{{color:'#555',font:{{size:11}}}}}}}}
-  }}
+  ['fSearch','fSector','fStage','fHiring','fSource','fNear'].forEach(id => document.getElementById(id).value='');
+  document.getElementById('fRadius').value = '5';
+  myLocation = null;
+  Object.assign(state, {{search:'',sector:'',stage:'',hiring:'',source:'',near:null}});
+  if (table) table.search('').columns().search('');
+  return applyFilters();
+}}
+
+// ── chart tooltips (the charts are SVG rendered by gen_html.py) ──
+const chartTip = document.createElement('div');
+chartTip.className = 'chart-tip';
+document.body.appendChild(chartTip);
+document.querySelectorAll('.svg-chart').forEach(svg => {{
+  svg.addEventListener('mousemove', e => {{
+    const el = e.target.closest('[data-tip]');
+    if (!el || !el.dataset.tip) {{ chartTip.style.display = 'none'; return; }}
+    chartTip.textContent = el.dataset.tip;
+    chartTip.style.display = 'block';
+    chartTip.style.left = `${{e.clientX + 12}}px`;
+    chartTip.style.top  = `${{e.clientY + 12}}px`;
+  }});
+  svg.addEventListener('mouseleave', () => {{ chartTip.style.display = 'none'; }});
+  svg.querySelectorAll('title').forEach(t => t.remove());   // the styled tip replaces the native one
 }});
 
+// ── live stats: the hero pills and charts follow the filters ──
+// stats = {{total, hist: {{field: {{value: n}}}}, sectors: [[sector, n], ...]}} from the engine
+const chartTipText = (label, n) => `${{label}}: ${{n}} companies`;
+function updateBarChart(svg, rows) {{
+  const x0 = +svg.dataset.x0, span = +svg.dataset.span;
+  const top = Math.max(1, ...rows.map(r => r[1]));
+  svg.querySelectorAll('g[data-tip]').forEach((g, i) => {{
+    const [label, n] = rows[i] || ['', 0];
+    const [name, value] = g.querySelectorAll('text'), w = n ? Math.max(span * n / top, 1) : 0;
+    name.textContent = label;
+    g.querySelector('rect').setAttribute('width', w.toFixed(1));
+    value.setAttribute('x', (x0 + w + 5).toFixed(1));
+    value.textContent = label ? n : '';
+    g.dataset.tip = label ? chartTipText(label, n) : '';
+  }});
+}}
+function updateDoughnut(svg, counts) {{
+  const circ = +svg.dataset.circ, segs = svg.querySelectorAll('circle.seg');
+  const total = Array.from(segs).reduce((t, c) => t + (counts[c.dataset.key] || 0), 0) || 1;
+  let offset = 0;
+  segs.forEach(c => {{
+    const n = counts[c.dataset.key] || 0, len = circ * n / total;
+    c.setAttribute('stroke-dasharray', `${{n ? Math.max(len - 1.5, 0.5) : 0}} ${{circ}}`);
+    c.setAttribute('stroke-dashoffset', -offset);
+    offset += len;
+  }});
+  svg.querySelectorAll('[data-key]').forEach(el => {{
+    el.dataset.tip = chartTipText(el.dataset.label, counts[el.dataset.key] || 0);
+  }});
+}}
+function updateStats(s) {{
+  const h = s.hist;
+  renderHero({{total: s.total, hiring: h.hiring.actively_hiring, startups: h.stage.startup,
+              scaleups: h.stage.scaleup, ch_verified: h.ch.true, sectors: s.sectors.length}});
+  const sector = document.getElementById('sectorChart'), emp = document.getElementById('empChart');
+  const stage = document.getElementById('stageChart');
+  updateBarChart(sector, s.sectors);
+  updateBarChart(emp, Array.from(emp.querySelectorAll('g[data-key]'),
+                                 g => [g.querySelector('text').textContent, h.employees[g.dataset.key] || 0]));
+  updateDoughnut(stage, h.stage);
+}}
+
 // ── MAP ──
-let map, markers, heatLayer;
+// Marker clusters are computed per zoom level at build time (map_tiles.py) and
+// delivered in tiles, so the page only loads the clusters in view. Each
+// cluster's companies are one contiguous range of MAP.order: with a prefix sum
+// of "passes the filters" over that order, a cluster's filtered size is
+// mapPref[start + count] - mapPref[start].
+let map, clusterLayer, heatLayer;
 let mapInitialised = false;
 let mapMode = 'dots'; // 'dots' or 'heat'
+let MAP = null;                 // {{leaf_level, tile_zoom, order, tiles, base | data}}
+let mapPref = null;             // Int32Array, length MAP.order.length + 1
+let mapShown = new Map();       // key → marker currently on the map
+let mapDrawSeq = 0;
+const mapTiles = new Map();     // 'level/tx/ty' → Promise of the tile's flat features
+const MAP_FEATURE = 5;          // [lon, lat, start, count, expand] per feature
 
 function setMapMode(mode) {{
   mapMode = mode;
@@ -767,12 +1827,51 @@ function setMapMode(mode) {{
   document.getElementById('btnHeat').className = mode==='heat' ? 'btn btn-sm btn-primary' : 'btn btn-sm btn-outline-secondary';
   if (!mapInitialised) return;
   if (mode === 'heat') {{
-    map.removeLayer(markers);
-    if (heatLayer) map.addLayer(heatLayer);
+    map.removeLayer(clusterLayer);
+    map.addLayer(heatLayer);
   }} else {{
-    if (heatLayer) map.removeLayer(heatLayer);
-    map.addLayer(markers);
+    map.removeLayer(heatLayer);
+    map.addLayer(clusterLayer);
+  }}
+  drawMap();
+}}
+
+let mapReady = null;
+function ensureMapMeta() {{
+  if (!mapReady) {{
+    mapReady = (DATA_URLS ? fetchJSON(DATA_URLS.map) : Promise.resolve(INLINE.map)).then(m => {{
+      m.have = Object.fromEntries(Object.entries(m.tiles).map(([z, keys]) => [z, new Set(keys)]));
+      MAP = m;
+      return m;
+    }});
+  }}
+  return mapReady;
+}}
+function loadTile(key) {{
+  if (!mapTiles.has(key)) {{
+    mapTiles.set(key, DATA_URLS
+      ? fetchJSON(`${{MAP.base}}/${{key}}.json`).catch(err => {{ mapTiles.delete(key); throw err; }})
+      : Promise.resolve(MAP.data[key]));
+  }}
+  return mapTiles.get(key);
+}}
+
+// Non-empty data tiles of a cluster level that overlap the (padded) viewport
+function tilesInView(level) {{
+  const tz = MAP.tile_zoom[level], n = 2 ** tz, b = map.getBounds().pad(0.2);
+  const clamp = v => Math.min(n - 1, Math.max(0, Math.floor(v * n)));
+  const tx = lon => clamp(lon / 360 + 0.5);
+  const ty = lat => {{
+    const s = Math.sin(Math.max(-85.05, Math.min(85.05, lat)) * Math.PI / 180);
+    return clamp(0.5 - Math.log((1 + s) / (1 - s)) / (4 * Math.PI));
+  }};
+  const have = MAP.have[level] || new Set(), keys = [];
+  for (let x = tx(b.getWest()); x <= tx(b.getEast()); x++) {{
+    for (let y = ty(b.getNorth()); y <= ty(b.getSouth()); y++) {{
+      if (have.has(`${{x}}/${{y}}`)) keys.push(`${{level}}/${{x}}/${{y}}`);
+    }}
   }}
+  return keys;
 }}
 
 function initMap() {{
@@ -781,77 +1880,250 @@ function initMap() {{
     attribution:'© <a href="https://openstreetmap.org">OpenStreetMap</a> contributors',
     maxZoom:18
   }}).addTo(map);
-  markers = L.markerClusterGroup({{
-    maxClusterRadius:40,
-    showCoverageOnHover:false,
-    iconCreateFunction(cluster) {{
-      const n = cluster.getChildCount();
-      return L.divIcon({{
-        html:`<div style="background:#1b3a6b;color:#fff;border-radius:50%;width:36px;height:36px;display:flex;align-items:center;justify-content:center;font-size:13px;font-weight:700;box-shadow:0 2px 6px rgba(0,0,0,.3)">${{n}}</div>`,
-        iconSize:[36,36], className:''
-      }});
-    }}
-  }});
-  map.addLayer(markers);
-  mapInitialised = true;
-  updateMap(getFiltered());
-}}
-
-function updateMap(cos) {{
-  if (!mapInitialised) return;
-  markers.clearLayers();
-  const heatPoints = [];
-  let shown = 0;
-  cos.forEach(c => {{
-    if (!c.lat || !c.lon) return;
-    const col   = SCOL[c.stage] || '#888';
-    const tags  = c.tags.slice(0,3).map(t=>`<span class="badge" style="background:${{TCOL[t]||'#607d8b'}};font-size:.65rem">${{t}}</span>`).join(' ');
-    const hire  = c.hiring==='actively_hiring' ? ' <span class="badge bg-success">Hiring</span>' : '';
-    const approx= c.loc_approx ? ' <small style="opacity:.55;font-size:.72rem">(approx location)</small>' : '';
-    const jobBtn= c.careers_url ? `<br><a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success py-0 mt-1">View jobs ↗</a>` : '';
-    const siteBtn=c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary py-0 mt-1 ms-1">Site ↗</a>` : '';
-    const popup = `<strong>${{c.name}}</strong>${{hire}}${{approx}}<br>${{tags}}
-      <p style="margin:.4rem 0 .2rem;font-size:.8rem;color:#555">${{c.desc.slice(0,130)}}${{c.desc.length>130?'…':''}}</p>
-      <small style="color:#999">${{c.stage}} · ${{c.employees}} · ${{c.postcode||'no postcode'}}</small>
-      ${{jobBtn}}${{siteBtn}}`;
-    const m = L.circleMarker([c.lat,c.lon],{{
-      radius:7, fillColor:col, color:'#fff',
-      weight:1.5, opacity:1, fillOpacity:0.88
-    }}).bindPopup(popup,{{maxWidth:290}});
-    markers.addLayer(m);
-    heatPoints.push([c.lat, c.lon, 1]);
-    shown++;
-  }});
-
-  // Rebuild heat layer
-  if (heatLayer) map.removeLayer(heatLayer);
-  heatLayer = L.heatLayer(heatPoints, {{
+  clusterLayer = L.layerGroup();
+  heatLayer = L.heatLayer([], {{
     radius: 22,
     blur: 18,
     maxZoom: 13,
     gradient: {{0.2:'#4361ee', 0.4:'#7209b7', 0.6:'#f72585', 0.8:'#ff9500', 1.0:'#ffdd00'}},
     opacity: 0.7
   }});
-  if (mapMode === 'heat') map.addLayer(heatLayer);
+  map.addLayer(mapMode === 'heat' ? heatLayer : clusterLayer);
+  map.on('moveend', drawMap);
+  mapInitialised = true;
+  updateMap();
+}}
 
-  document.getElementById('mapCount').textContent = `${{shown}} companies`;
+// Popup HTML, built when the popup is first opened
+function popupHtml(c) {{
+  const tags  = c.tags.slice(0,3).map(t=>`<span class="badge" style="background:${{TCOL[t]||'#607d8b'}};font-size:.65rem">${{t}}</span>`).join(' ');
+  const hire  = c.hiring==='actively_hiring' ? ' <span class="badge bg-success">Hiring</span>' : '';
+  const approx= c.loc_approx ? ' <small style="opacity:.55;font-size:.72rem">(approx location)</small>' : '';
+  const jobBtn= c.careers_url ? `<br><a href="${{c.careers_url}}" target="_blank" class="btn btn-sm btn-success py-0 mt-1">View jobs ↗</a>` : '';
+  const siteBtn=c.url ? `<a href="${{c.url}}" target="_blank" class="btn btn-sm btn-outline-secondary py-0 mt-1 ms-1">Site ↗</a>` : '';
+  return `<strong>${{c.name}}</strong>${{hire}}${{approx}}<br>${{tags}}
+    <p style="margin:.4rem 0 .2rem;font-size:.8rem;color:#555">${{c.desc.slice(0,130)}}${{c.desc.length>130?'…':''}}</p>
+    <small style="color:#999">${{c.stage}} · ${{c.employees}} · ${{c.postcode||'no postcode'}}</small>
+    ${{jobBtn}}${{siteBtn}}`;
+}}
+
+// One marker per company, created the first time it is shown and then reused
+const markerById = new Map();
+function companyMarker(id) {{
+  let m = markerById.get(id);
+  if (!m) {{
+    const c = ALL[id];
+    m = L.circleMarker([c.lat,c.lon],{{
+      radius:7, fillColor:SCOL[c.stage] || '#888', color:'#fff',
+      weight:1.5, opacity:1, fillOpacity:0.88
+    }}).bindPopup(() => popupHtml(c), {{maxWidth:290}});
+    markerById.set(id, m);
+  }}
+  return m;
+}}
+
+// Filtered company ids in positions [start, end) of MAP.order
+function mapMembers(start, end) {{
+  const ids = [];
+  for (let k = start; k < end; k++) if (mapPref[k + 1] > mapPref[k]) ids.push(MAP.order[k]);
+  return ids;
+}}
+// First filtered position at or after start (binary search on the prefix sum)
+function firstFiltered(start) {{
+  let lo = start, hi = MAP.order.length - 1;
+  while (lo < hi) {{ const mid = (lo + hi) >> 1; if (mapPref[mid + 1] > mapPref[start]) hi = mid; else lo = mid + 1; }}
+  return MAP.order[lo];
+}}
+function clusterMarker(lat, lon, start, count, expand, n) {{
+  const m = L.marker([lat, lon], {{icon: L.divIcon({{
+    html:`<div style="background:#1b3a6b;color:#fff;border-radius:50%;width:36px;height:36px;display:flex;align-items:center;justify-content:center;font-size:13px;font-weight:700;box-shadow:0 2px 6px rgba(0,0,0,.3)">${{n}}</div>`,
+    iconSize:[36,36], className:''
+  }})}});
+  if (expand >= 0) {{
+    m.on('click', () => map.setView([lat, lon], Math.max(expand, map.getZoom() + 1)));
+  }} else {{   // companies sharing one location: list them
+    m.bindPopup(() => mapMembers(start, start + count).map(id => {{
+      const c = ALL[id];
+      return `<strong>${{c.name}}</strong> <small style="color:#999">${{c.stage}}</small>`;
+    }}).join('<br>'), {{maxWidth:290}});
+  }}
+  return m;
+}}
+
+// Filters changed: recount every cluster, then redraw the view
+function updateMap() {{
+  if (!mapInitialised) return;
+  const order = MAP.order, pass = new Uint8Array(ALL.length);
+  for (const id of FILTERED_IDS) pass[id] = 1;
+  mapPref = new Int32Array(order.length + 1);
+  for (let k = 0; k < order.length; k++) mapPref[k + 1] = mapPref[k] + pass[order[k]];
+  document.getElementById('mapCount').textContent = `${{mapPref[order.length]}} companies`;
+  drawMap();
+}}
+
+// Draw the clusters of the current zoom level that are in view, adding and
+// removing only the markers that changed
+function drawMap() {{
+  if (!mapInitialised || !mapPref) return;
+  const mySeq = ++mapDrawSeq;
+  const level = Math.max(0, Math.min(Math.round(map.getZoom()), MAP.leaf_level));
+  Promise.all(tilesInView(level).map(loadTile)).then(tiles => {{
+    if (mySeq !== mapDrawSeq) return;
+    const next = new Map(), heat = [];
+    for (const f of tiles) {{
+      for (let k = 0; k < f.length; k += MAP_FEATURE) {{
+        const [lon, lat, start, count, expand] = f.slice(k, k + MAP_FEATURE);
+        const n = mapPref[start + count] - mapPref[start];
+        if (!n) continue;
+        if (mapMode === 'heat') {{ heat.push([lat, lon, n]); continue; }}
+        if (n === 1) {{
+          const id = firstFiltered(start);
+          next.set(`c${{id}}`, companyMarker(id));
+        }} else {{
+          const key = `${{level}}/${{start}}/${{n}}`;
+          next.set(key, mapShown.get(key) || clusterMarker(lat, lon, start, count, expand, n));
+        }}
+      }}
+    }}
+    if (mapMode === 'heat') {{ heatLayer.setLatLngs(heat); return; }}
+    for (const [key, m] of mapShown) if (!next.has(key)) clusterLayer.removeLayer(m);
+    for (const [key, m] of next) if (!mapShown.has(key)) clusterLayer.addLayer(m);
+    mapShown = next;
+  }}).catch(err => console.error('map tiles:', err));
 }}
 
 // Init map when Map tab shown
 document.querySelector('[href="#tab-map"]').addEventListener('shown.bs.tab', () => {{
-  if (!mapInitialised) initMap();
+  if (!mapInitialised) ensureMapMeta().then(initMap);
   else map.invalidateSize();
 }});
 
+// Lists in a tab that was hidden were laid out against estimated heights
+document.querySelector('[href="#tab-companies"]').addEventListener('shown.bs.tab', () => refreshVirtualLists(false));
+
+// Likewise the jobs lists, rendered while their tab was hidden
+document.querySelector('[href="#tab-jobs"]').addEventListener('shown.bs.tab', () => refreshVirtualLists(false));
+
 // ── initial render ──
 renderHero();
-renderHiringCards(ALL);
-renderJobs(ALL, '');
+Promise.all([dataReady, engineReady]).then(([data]) => {{
+  ALL = data.companies;
+  ALL_ROLES = data.roles;
+  FILTERED = ALL;
+  FILTERED_IDS = ALL.map((_, i) => i);
+  $(initTable);
+  applyFilters();
+}}).catch(err => {{
+  document.getElementById('hiringCards').innerHTML =
+    `<div class="no-results">Could not load company data (${{err.message}}).</div>`;
+}});
 </script>
 </body>
 </html>'''
 
-out = SCRIPT_DIR / 'cambridge_job_board.html'
-out.write_text(html, encoding='utf-8')
-print(f"Written: {out}")
-print(f"Size: {out.stat().st_size/1024:.0f} KB")
+# ── Render ────────────────────────────────────────────────────────────────────
+def render(site, split=False, out_dir=None, minify=False, api=False, compress=False):
+    """
+    Write the board for `site` (site_data.json's content): cambridge_job_board.html
+    next to this script or, with split, a shell plus hashed data files in out_dir
+    (default ./site). The flags are the CLI's; returns the page's path.
+    """
+    if api and not split:
+        raise ValueError('api=True needs split=True: the API is written to <out_dir>/api')
+    companies = site['companies']
+    json_sep  = (',', ':') if minify else None
+    out       = Output((out_dir or SCRIPT_DIR / 'site').resolve() if split else SCRIPT_DIR)
+
+    # Serialisations derived from site_data.json
+    co_json     = json.dumps(columnar.encode(companies, site['roles'], site['index']['role_start']),
+                             ensure_ascii=False, separators=json_sep)
+    index_json  = json.dumps(site['index'], separators=(',', ':'))
+    search_json = json.dumps(build_search_index(companies), ensure_ascii=False, separators=(',', ':'))
+
+    # Map clusters (precomputed per zoom level, see map_tiles.py)
+    map_meta, map_tile_data = map_tiles.build(
+        [(i, c['lon'], c['lat']) for i, c in enumerate(companies) if c.get('lat') and c.get('lon')])
+
+    # Data delivery: inline JS literals, or separate cacheable files (split)
+    if split:
+        tile_json  = {k: json.dumps(v, separators=(',', ':')) for k, v in map_tile_data.items()}
+        data_files = dict(companies=out.write_hashed('companies', co_json,
+                                                     _json_size(companies) + _json_size(site['roles'])),
+                          index=out.write_hashed('index', index_json),
+                          search=out.write_hashed('search', search_json))
+        for old in (out.dir / 'data').glob('roles.*.json*'):   # roles now ride in the companies payload
+            old.unlink()
+        data_files['map'] = out.write_hashed('map', json.dumps(dict(map_meta, base=write_tiles(out, tile_json)),
+                                                               separators=(',', ':')))
+        data_js    = f'const INLINE = null;\nconst DATA_URLS = {json.dumps(data_files)};'
+    else:
+        map_json   = json.dumps(dict(map_meta, data=map_tile_data), separators=(',', ':'))
+        data_js    = (f'const INLINE = {{companies: {co_json}, index: {index_json}, '
+                      f'search: {search_json}, map: {map_json}}};\n'
+                      f'const DATA_URLS = null;')
+
+    html = page_html(site, data_js, json_sep)
+    html_size = None
+    if minify:
+        # Unminified size, for the report (inline JSON counted with default separators)
+        html_size = len(html.encode('utf-8'))
+        if not split:
+            html_size += _json_size(companies) + _json_size(site['roles']) - len(co_json.encode('utf-8'))
+        html = minify_html(html)
+
+    page = out.dir / ('index.html' if split else 'cambridge_job_board.html')
+    out.write(page, html, html_size)
+    print(f"Written: {page}")
+    if split:
+        print(f"Shell size: {page.stat().st_size/1024:.0f} KB")
+        for f in data_files.values():
+            print(f"  {f}: {(out.dir / f).stat().st_size/1024:.0f} KB")
+    else:
+        print(f"Size: {page.stat().st_size/1024:.0f} KB")
+    if api:
+        write_api(out, site)
+    if split:
+        write_service_worker(out, data_files, minify)
+
+    if compress:
+        compress_assets(out)
+    if minify or compress:
+        print_size_report(out, compress)
+    return page
+
+def arg_parser():
+    ap = argparse.ArgumentParser(description='Render the job board HTML from site_data.json.')
+    ap.add_argument('--split', action='store_true',
+                    help='emit a small HTML shell plus content-hashed JSON data files '
+                         'that the page loads asynchronously; '
+                         'plus a service worker (sw.js) for instant repeat and offline visits; '
+                         'serve the output directory over HTTP, browsers block fetch() from file://')
+    ap.add_argument('--out-dir', type=Path, default=None,
+                    help='output directory for --split (default: ./site)')
+    ap.add_argument('--minify', action='store_true',
+                    help='minify the inline CSS/JS/HTML and write compact JSON')
+    ap.add_argument('--api', action='store_true',
+                    help='with --split, also write a static JSON API to <out dir>/api: paginated per-sector, '
+                         'per-stage and per-hiring-status shards plus a manifest.json with counts '
+                         'and content hashes')
+    ap.add_argument('--compress', action='store_true',
+                    help='write pre-compressed .gz (and .br, if brotli is installed) '
+                         'siblings for every emitted asset')
+    return ap
+
+def page_path(args):
+    """Where render() writes the page for these parsed arguments."""
+    if args.split:
+        return (args.out_dir or SCRIPT_DIR / 'site').resolve() / 'index.html'
+    return SCRIPT_DIR / 'cambridge_job_board.html'
+
+def main(argv=None):
+    ap = arg_parser()
+    args = ap.parse_args(argv)
+    if args.api and not args.split:
+        ap.error('--api needs --split (the API is written to <out dir>/api)')
+    render(load_site(), split=args.split, out_dir=args.out_dir, minify=args.minify,
+           api=args.api, compress=args.compress)
+
+if __name__ == '__main__':
+    main()
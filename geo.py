@@ -0,0 +1,160 @@
+"""
+Postcode geography and radius queries ("companies within 5 km of CB4 0WS").
+
+Shared by build_site.py, which places the companies and ships a k-d tree of
+them with the site data (the page's distance filter walks the same layout),
+and by the notebook, which queries final_companies.csv directly:
+
+    import geo
+    near = geo.CompanyLocator.from_csv()     # final_companies.csv + geocodes
+    near.within('CB4 0WS', 5)                # DataFrame, nearest first
+    near.within((52.2054, 0.1132), 2)        # or a (lat, lon)
+"""
+
+import json
+import math
+import re
+from pathlib import Path
+
+import pandas as pd
+
+BASE       = Path(__file__).resolve().parent
+MASTER_CSV = BASE / 'pipeline/output/final_companies.csv'
+EARTH_KM   = 6371.0
+KM_PER_DEG = math.pi * EARTH_KM / 180   # along a meridian
+
+# ── Postcode → (lat, lon) ─────────────────────────────────────────────────────
+def load_geocodes(base=BASE):
+    """{postcode: {lat, lon}} from geocodes_a/b.json (some lon values may be null)."""
+    gc = {}
+    for fname in ['geocodes_a.json', 'geocodes_b.json']:
+        p = base / 'pipeline/output' / fname
+        if p.exists():
+            with open(p) as f:
+                gc.update(json.load(f))
+    return gc
+
+# Outward-code centroids used only as final fallback for companies with no full postcode.
+# These are rough geographic centres for each CB postcode district.
+# For precise pin placement run geocode_postcodes.py (requires internet) to populate geocodes_a.json.
+OUTWARD_CENTRES = {
+    'CB1':  (52.2020, 0.1300),  # Cambridge city centre / Hills Road / Mill Road
+    'CB2':  (52.1980, 0.1200),  # Central / south Cambridge / Trumpington
+    'CB3':  (52.2040, 0.0960),  # West Cambridge / Newnham / Grange Road
+    'CB4':  (52.2280, 0.1310),  # North Cambridge / Science Park / Chesterton
+    'CB5':  (52.2140, 0.1870),  # East Cambridge / Fen Ditton
+    'CB21': (52.1020, 0.2220),  # Granta Park / Great Abington / Linton
+    'CB22': (52.1340, 0.1860),  # Babraham / Great Shelford / Sawston
+    'CB23': (52.1980, 0.0460),  # West / Comberton / Cambourne / Barton
+    'CB24': (52.2880, 0.1130),  # North / Milton / Cottenham / Longstanton
+    'CB25': (52.2830, 0.2720),  # Northeast / Burwell / Swaffham Prior
+}
+CAM_CENTRE = (52.2054, 0.1132)
+
+POSTCODE_RE = re.compile(r'([A-Z]{1,2}\d[A-Z\d]?)(\d[A-Z]{2})?')
+
+def normalise_postcode(pc):
+    """'cb40ws' → 'CB4 0WS', 'cb4' → 'CB4'; None if it is not a UK postcode."""
+    if not isinstance(pc, str):
+        return None
+    m = POSTCODE_RE.fullmatch(re.sub(r'\s+', '', pc.upper()))
+    if not m:
+        return None
+    return f'{m[1]} {m[2]}' if m[2] else m[1]
+
+def postcode_point(pc, geocodes):
+    """(lat, lon, exact) for a postcode, falling back to its district centre; None if unknown."""
+    pc = normalise_postcode(pc)
+    if pc is None:
+        return None
+    entry = geocodes.get(pc)
+    if entry and entry.get('lat') is not None and entry.get('lon') is not None:
+        return entry['lat'], entry['lon'], True
+    outer = pc.split()[0]
+    if outer in OUTWARD_CENTRES:
+        return (*OUTWARD_CENTRES[outer], False)
+    return None
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((p2 - p1) / 2) ** 2 +
+         math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(a)))
+
+# ── k-d tree ──────────────────────────────────────────────────────────────────
+# Implicit layout, no pointers: the points of a range [lo, hi) are split at
+# mid = (lo + hi) // 2 on lat (even depth) or lon (odd depth), the smaller
+# ones in [lo, mid) and the larger in [mid + 1, hi). Shipped to the page as
+# [id, lat, lon, exact] in that order, exact 0 for a district centre.
+class KDTree:
+    def __init__(self, points):
+        """points: [(id, lat, lon)]"""
+        self.nodes = [None] * len(points)
+        stack = [(list(points), 0, len(points), 0)]
+        while stack:
+            items, lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            items.sort(key=lambda p: p[1 + (depth & 1)])
+            mid = (lo + hi) // 2
+            k = mid - lo
+            self.nodes[mid] = items[k]
+            stack.append((items[:k], lo, mid, depth + 1))
+            stack.append((items[k + 1:], mid + 1, hi, depth + 1))
+
+    @property
+    def ids(self):
+        return [p[0] for p in self.nodes]
+
+    def within(self, lat, lon, km):
+        """[(distance km, id)] of the points within km of (lat, lon), nearest first."""
+        dlat = km / KM_PER_DEG
+        dlon = km / (KM_PER_DEG * max(math.cos(math.radians(min(abs(lat) + dlat, 89.9))), 1e-6))
+        out, stack = [], [(0, len(self.nodes), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            pid, plat, plon = self.nodes[mid]
+            d = haversine_km(lat, lon, plat, plon)
+            if d <= km:
+                out.append((d, pid))
+            q, v, r = (lat, plat, dlat) if depth & 1 == 0 else (lon, plon, dlon)
+            if q - r <= v:
+                stack.append((lo, mid, depth + 1))
+            if q + r >= v:
+                stack.append((mid + 1, hi, depth + 1))
+        return sorted(out)
+
+# ── Query API for the notebook ────────────────────────────────────────────────
+class CompanyLocator:
+    """Radius queries over final_companies.csv, rows placed by their postcode."""
+
+    def __init__(self, df, geocodes=None):
+        self.geocodes = load_geocodes() if geocodes is None else geocodes
+        pts = [postcode_point(pc, self.geocodes) for pc in df['postcode']]
+        self.df = df.assign(lat      =[p[0] if p else None for p in pts],
+                            lon      =[p[1] if p else None for p in pts],
+                            loc_exact=[bool(p and p[2]) for p in pts])
+        self.tree = KDTree([(i, p[0], p[1]) for i, p in enumerate(pts) if p])
+
+    @classmethod
+    def from_csv(cls, path=MASTER_CSV, geocodes=None):
+        return cls(pd.read_csv(path), geocodes)
+
+    def locate(self, where):
+        """Postcode (full or district) or (lat, lon) → (lat, lon)."""
+        if isinstance(where, str):
+            p = postcode_point(where, self.geocodes)
+            if p is None:
+                raise ValueError(f'Unknown postcode: {where!r}')
+            return p[0], p[1]
+        return tuple(where)
+
+    def within(self, where, km):
+        """Companies within km of a postcode or (lat, lon), nearest first, with distance_km."""
+        hits = self.tree.within(*self.locate(where), km)
+        rows = self.df.iloc[[i for _, i in hits]].copy()
+        rows.insert(0, 'distance_km', [round(d, 2) for d, _ in hits])
+        return rows
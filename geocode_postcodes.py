@@ -1,8 +1,10 @@
 """
 geocode_postcodes.py
 --------------------
-Fetches real lat/lon for every postcode in final_companies.csv using postcodes.io,
-and saves results to pipeline/output/geocodes_a.json.
+Fetches real lat/lon for every company postcode using postcodes.io, and saves
+results to pipeline/output/geocodes_a.json. The postcodes come from
+master_companies.csv (script 01's output, so this can run alongside scripts
+02-04) and final_companies.csv (which may have companies added by hand).
 
 Run this from your local machine (requires internet access):
     python3 geocode_postcodes.py
@@ -19,6 +21,7 @@ from pathlib import Path
 
 BASE        = Path(__file__).resolve().parent
 MASTER_CSV  = BASE / "pipeline/output/final_companies.csv"
+SOURCE_CSVS = [BASE / "pipeline/output/master_companies.csv", MASTER_CSV]
 GEOCODES_A  = BASE / "pipeline/output/geocodes_a.json"
 
 
@@ -53,8 +56,8 @@ def geocode_uk_postcodes(pcs: list[str]) -> list[dict]:
 
 
 def main():
-    # Load master CSV
-    df = pd.read_csv(MASTER_CSV)
+    # Postcodes of every company, in either table
+    df = pd.concat([pd.read_csv(p, usecols=["postcode"]) for p in SOURCE_CSVS if p.exists()])
     all_postcodes = (
         df["postcode"]
         .dropna()
@@ -63,7 +66,7 @@ def main():
         .unique()
         .tolist()
     )
-    print(f"Total unique postcodes in master CSV: {len(all_postcodes)}")
+    print(f"Total unique postcodes: {len(all_postcodes)}")
 
     # Load existing geocodes (so we don't re-fetch ones we already have)
     existing: dict = {}
@@ -0,0 +1,145 @@
+"""
+Build-time marker clustering for the board's map (used by gen_html.py).
+
+Companies are clustered greedily per zoom level, supercluster-style: starting
+from the individual points, each level merges the nodes of the level below
+that lie within CLUSTER_RADIUS screen pixels of each other at that zoom. The
+result is a tree, so listing its leaves depth-first gives an order in which
+every cluster's members are one contiguous range [start, start+count). The
+page keeps a prefix sum of "passes the current filters" over that order, which
+turns any cluster's filtered member count into one subtraction; clusters stay
+precomputed while the counts follow the filters.
+
+Per level, the nodes are grouped into tiles (a few map tiles wide) so the page
+only loads what the viewport needs:
+
+  meta  = {leaf_level, tile_zoom: [tz per level], order: [company ids],
+           tiles: {level: ["tx/ty", ...]}}
+  tile  = flat [lon, lat, start, count, expand, ...] per node, where expand is
+          the zoom at which the node splits (-1 = never: one point, or several
+          companies at the same coordinates)
+"""
+
+import math
+
+CLUSTER_RADIUS = 40     # px, as the client-side markercluster used (maxClusterRadius)
+TILE_SIZE      = 256    # px per map tile
+MAX_ZOOM       = 16     # last clustered zoom; deeper zooms show the leaf level
+TILE_SPAN      = 2      # a data tile at level z covers 2^TILE_SPAN map tiles per side
+MAX_TILE_ZOOM  = 10     # ... and is never smaller than a zoom-10 map tile
+
+
+def project(lon, lat):
+    """Web Mercator, normalised to the unit square."""
+    s = math.sin(math.radians(max(min(lat, 85.05), -85.05)))
+    return lon / 360 + 0.5, 0.5 - 0.25 * math.log((1 + s) / (1 - s)) / math.pi
+
+
+def unproject(x, y):
+    return (x - 0.5) * 360, math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+class Node:
+    __slots__ = ('x', 'y', 'n', 'children', 'ids', 'start', 'expand')
+
+    def __init__(self, x, y, n, children=(), ids=()):
+        self.x, self.y, self.n = x, y, n
+        self.children = list(children)
+        self.ids      = list(ids)      # company ids, leaf nodes only
+        self.start    = 0
+        self.expand   = -1
+
+
+def _cluster_level(nodes, z):
+    """Merge the nodes of level z+1 into the nodes of level z."""
+    r = CLUSTER_RADIUS / (TILE_SIZE * 2 ** z)
+    grid = {}
+    for i, p in enumerate(nodes):
+        grid.setdefault((int(p.x // r), int(p.y // r)), []).append(i)
+    taken = [False] * len(nodes)
+    out = []
+    for i, p in enumerate(nodes):
+        if taken[i]:
+            continue
+        taken[i] = True
+        members = [p]
+        cx, cy = int(p.x // r), int(p.y // r)
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for j in grid.get((gx, gy), ()):
+                    q = nodes[j]
+                    if not taken[j] and (q.x - p.x) ** 2 + (q.y - p.y) ** 2 <= r * r:
+                        taken[j] = True
+                        members.append(q)
+        n = sum(m.n for m in members)
+        out.append(Node(sum(m.x * m.n for m in members) / n,
+                        sum(m.y * m.n for m in members) / n, n, members))
+    return out
+
+
+def _assign_ranges(roots):
+    """Depth-first leaf order; every node gets start = first leaf position."""
+    order, stack = [], list(reversed(roots))
+    while stack:
+        node = stack.pop()
+        node.start = len(order)
+        if node.ids:
+            order.extend(node.ids)
+        else:
+            stack.extend(reversed(node.children))
+    return order
+
+
+def _set_expand(levels):
+    """Zoom at which each node first shows as more than one node."""
+    for z in range(len(levels) - 2, -1, -1):
+        for node in levels[z]:
+            if len(node.children) > 1:
+                node.expand = z + 1
+            else:
+                node.expand = node.children[0].expand
+
+
+def tile_zoom(level):
+    return max(0, min(level - TILE_SPAN, MAX_TILE_ZOOM))
+
+
+def build(points):
+    """
+    points: [(company id, lon, lat)] → (meta, {"level/tx/ty": flat feature list}).
+    Companies at identical coordinates share one leaf node.
+    """
+    leaf_level = MAX_ZOOM + 1
+    by_pos = {}
+    for cid, lon, lat in points:
+        by_pos.setdefault((lon, lat), []).append(cid)
+    leaves = []
+    for (lon, lat), ids in by_pos.items():
+        x, y = project(lon, lat)
+        leaves.append(Node(x, y, len(ids), ids=ids))
+
+    levels = [None] * (leaf_level + 1)
+    levels[leaf_level] = leaves
+    for z in range(leaf_level - 1, -1, -1):
+        levels[z] = _cluster_level(levels[z + 1], z)
+    _set_expand(levels)
+    order = _assign_ranges(levels[0])
+
+    tiles, index = {}, {}
+    for z, nodes in enumerate(levels):
+        tz = tile_zoom(z)
+        scale = 2 ** tz
+        for node in nodes:
+            key = f'{min(int(node.x * scale), scale - 1)}/{min(int(node.y * scale), scale - 1)}'
+            lon, lat = unproject(node.x, node.y)
+            tiles.setdefault(f'{z}/{key}', []).extend(
+                [round(lon, 5), round(lat, 5), node.start, node.n, node.expand])
+            index.setdefault(z, set()).add(key)
+
+    meta = dict(
+        leaf_level=leaf_level,
+        tile_zoom=[tile_zoom(z) for z in range(leaf_level + 1)],
+        order=order,
+        tiles={z: sorted(keys) for z, keys in index.items()},
+    )
+    return meta, tiles
@@ -7,18 +7,23 @@ Strategy:
 - Matches on company name using token-based Jaccard similarity
   (better than character fuzzy for company names because it avoids matching
   on shared generic suffixes like "Therapeutics", "Technologies" etc.)
-- Produces pipeline/output/master_companies.csv with combined data
-  + validation status
+- Produces pipeline/output/master_companies.parquet (typed, see storage.py)
+  + master_companies.csv export with combined data + validation status
 
 Run with:
     python 01_merge_validate.py
+    python 01_merge_validate.py --dry-run   (match and report, write nothing)
     (works in hspy1 conda env or VM Python — no extra dependencies needed)
 """
 
-import pandas as pd
 import re
 from pathlib import Path
 
+import cli
+import storage
+
+pd = cli.lazy_import("pandas")
+
 # ── Paths ────────────────────────────────────────────────────────────────────
 BASE      = Path(__file__).parent.parent          # Cambridge job site/
 HUB_CSV   = BASE / "scraped_companies.csv"
@@ -73,177 +78,188 @@ def best_match(hub_tok: frozenset,
     return best_idx, best_sc
 
 
-# ── Load data ────────────────────────────────────────────────────────────────
-print("Loading data …")
-hub = pd.read_csv(HUB_CSV)
-ch  = pd.read_csv(CH_CSV)
-
-print(f"  Hub companies : {len(hub)}")
-print(f"  CH  companies : {len(ch)}")
-
-ch["company_number"] = ch["company_number"].astype(str).str.strip()
-
-# Pre-compute token sets
-hub_tokens = [tokenise(n) for n in hub["company_name"]]
-ch_tokens  = [tokenise(n) for n in ch["company_name"]]
-
-# ── Matching ──────────────────────────────────────────────────────────────────
-print(f"\nMatching (Jaccard threshold ≥ {JACCARD_THRESHOLD}) …")
-
-match_results = []
-for hub_idx, hub_tok in enumerate(hub_tokens):
-    ch_idx, score = best_match(hub_tok, ch_tokens)
-    matched = score >= JACCARD_THRESHOLD
-    match_results.append({
-        "hub_idx"      : hub_idx,
-        "ch_idx"       : ch_idx if matched else -1,
-        "score"        : round(score, 3),
-        "matched"      : matched,
-        "hub_name"     : hub.loc[hub_idx, "company_name"],
-        "ch_name"      : ch.loc[ch_idx, "company_name"] if matched else "",
-        "hub_tokens"   : " | ".join(sorted(hub_tok)),
-        "ch_tokens"    : " | ".join(sorted(ch_tokens[ch_idx])) if matched else "",
-    })
-
-matches_df = pd.DataFrame(match_results)
-
-# ── Sanity check: flag CH records matched by more than one hub entry ──────────
-# (means duplicates in hub list, or a genuine ambiguity to review)
-ch_idx_counts = (
-    matches_df[matches_df["matched"]]
-    .groupby("ch_idx")["hub_idx"]
-    .count()
-    .rename("n_hub_matches")
-)
-multi = ch_idx_counts[ch_idx_counts > 1]
-if len(multi):
-    print(f"\n  ⚠  {len(multi)} CH records matched by >1 hub entry (duplicates/ambiguities):")
-    for ci, cnt in multi.items():
-        rows = matches_df[(matches_df["ch_idx"] == ci) & matches_df["matched"]]
-        print(f"     CH: {ch.loc[ci, 'company_name']!r:50s} ← hub: "
-              + ", ".join(repr(r) for r in rows["hub_name"]))
-
-n_matched = matches_df["matched"].sum()
-print(f"\n  Matched  : {n_matched} hub companies linked to CH records")
-print(f"  Unmatched: {len(hub) - n_matched} hub companies (no CH record found)")
-
-# Save full match report
-matches_df.to_csv(MATCH_CSV, index=False)
-print(f"  → Match report saved to {MATCH_CSV.relative_to(BASE)}")
-
-# ── Build master dataframe ────────────────────────────────────────────────────
-print("\nBuilding master companies dataframe …")
-
-records = []
-
-# 1. Hub companies (with or without CH match)
-for _, row in matches_df.iterrows():
-    hub_row = hub.iloc[int(row["hub_idx"])]
-    rec = {
-        "company_name"  : hub_row["company_name"],
-        "url"           : hub_row.get("url", ""),
-        "source"        : "hub",
-        "hub_name"      : hub_row.get("hub_name", ""),
-        "hub_type"      : hub_row.get("hub_type", ""),
-        # CH fields (filled if matched)
-        "company_number": None,
-        "postcode"      : None,
-        "ch_status"     : None,
-        "sic_code"      : None,
-        "company_size"  : None,
-        "incorporated"  : None,
-        "last_accounts" : None,
-        "address"       : None,
-        "ch_validated"  : False,
-        "ch_match_score": None,
-        "ch_match_name" : None,
-    }
-
-    if row["matched"]:
-        ch_row = ch.iloc[int(row["ch_idx"])]
-        rec.update({
-            "company_number": ch_row["company_number"],
-            "postcode"      : ch_row.get("postcode"),
-            "ch_status"     : ch_row.get("status"),
-            "sic_code"      : ch_row.get("sic_code_1"),
-            "company_size"  : ch_row.get("company_size"),
-            "incorporated"  : ch_row.get("incorporated"),
-            "last_accounts" : ch_row.get("last_accounts"),
-            "address"       : ch_row.get("address"),
-            "ch_validated"  : True,
-            "ch_match_score": row["score"],
-            "ch_match_name" : row["ch_name"],
+# ── Main ──────────────────────────────────────────────────────────────────────
+def main(args):
+    # ── Load data ────────────────────────────────────────────────────────────
+    print("Loading data …")
+    hub = pd.read_csv(HUB_CSV)
+    ch  = pd.read_csv(CH_CSV)
+
+    print(f"  Hub companies : {len(hub)}")
+    print(f"  CH  companies : {len(ch)}")
+
+    ch["company_number"] = ch["company_number"].astype(str).str.strip()
+
+    # Pre-compute token sets
+    hub_tokens = [tokenise(n) for n in hub["company_name"]]
+    ch_tokens  = [tokenise(n) for n in ch["company_name"]]
+
+    # ── Matching ──────────────────────────────────────────────────────────────
+    print(f"\nMatching (Jaccard threshold ≥ {JACCARD_THRESHOLD}) …")
+
+    match_results = []
+    for hub_idx, hub_tok in enumerate(hub_tokens):
+        ch_idx, score = best_match(hub_tok, ch_tokens)
+        matched = score >= JACCARD_THRESHOLD
+        match_results.append({
+            "hub_idx"      : hub_idx,
+            "ch_idx"       : ch_idx if matched else -1,
+            "score"        : round(score, 3),
+            "matched"      : matched,
+            "hub_name"     : hub.loc[hub_idx, "company_name"],
+            "ch_name"      : ch.loc[ch_idx, "company_name"] if matched else "",
+            "hub_tokens"   : " | ".join(sorted(hub_tok)),
+            "ch_tokens"    : " | ".join(sorted(ch_tokens[ch_idx])) if matched else "",
         })
 
-    records.append(rec)
-
-# 2. CH-only companies (not matched to any hub entry) → keep for completeness
-matched_ch_indices = set(
-    matches_df.loc[matches_df["matched"], "ch_idx"].astype(int).tolist()
-)
-ch_only_count = 0
-for ch_idx, ch_row in ch.iterrows():
-    if ch_idx not in matched_ch_indices:
-        records.append({
-            "company_name"  : ch_row["company_name"],
-            "url"           : None,
-            "source"        : "companies_house",
-            "hub_name"      : None,
-            "hub_type"      : None,
-            "company_number": ch_row["company_number"],
-            "postcode"      : ch_row.get("postcode"),
-            "ch_status"     : ch_row.get("status"),
-            "sic_code"      : ch_row.get("sic_code_1"),
-            "company_size"  : ch_row.get("company_size"),
-            "incorporated"  : ch_row.get("incorporated"),
-            "last_accounts" : ch_row.get("last_accounts"),
-            "address"       : ch_row.get("address"),
-            "ch_validated"  : True,
+    matches_df = pd.DataFrame(match_results)
+
+    # ── Sanity check: flag CH records matched by more than one hub entry ──────
+    # (means duplicates in hub list, or a genuine ambiguity to review)
+    ch_idx_counts = (
+        matches_df[matches_df["matched"]]
+        .groupby("ch_idx")["hub_idx"]
+        .count()
+        .rename("n_hub_matches")
+    )
+    multi = ch_idx_counts[ch_idx_counts > 1]
+    if len(multi):
+        print(f"\n  ⚠  {len(multi)} CH records matched by >1 hub entry (duplicates/ambiguities):")
+        for ci, cnt in multi.items():
+            rows = matches_df[(matches_df["ch_idx"] == ci) & matches_df["matched"]]
+            print(f"     CH: {ch.loc[ci, 'company_name']!r:50s} ← hub: "
+                  + ", ".join(repr(r) for r in rows["hub_name"]))
+
+    n_matched = matches_df["matched"].sum()
+    print(f"\n  Matched  : {n_matched} hub companies linked to CH records")
+    print(f"  Unmatched: {len(hub) - n_matched} hub companies (no CH record found)")
+
+    # Save full match report
+    if not args.dry_run:
+        matches_df.to_csv(MATCH_CSV, index=False)
+        print(f"  → Match report saved to {MATCH_CSV.relative_to(BASE)}")
+
+    # ── Build master dataframe ────────────────────────────────────────────────
+    print("\nBuilding master companies dataframe …")
+
+    records = []
+
+    # 1. Hub companies (with or without CH match)
+    for _, row in matches_df.iterrows():
+        hub_row = hub.iloc[int(row["hub_idx"])]
+        rec = {
+            "company_name"  : hub_row["company_name"],
+            "url"           : hub_row.get("url", ""),
+            "source"        : "hub",
+            "hub_name"      : hub_row.get("hub_name", ""),
+            "hub_type"      : hub_row.get("hub_type", ""),
+            # CH fields (filled if matched)
+            "company_number": None,
+            "postcode"      : None,
+            "ch_status"     : None,
+            "sic_code"      : None,
+            "company_size"  : None,
+            "incorporated"  : None,
+            "last_accounts" : None,
+            "address"       : None,
+            "ch_validated"  : False,
             "ch_match_score": None,
             "ch_match_name" : None,
-        })
-        ch_only_count += 1
-
-master = pd.DataFrame(records)
-
-# ── Derived columns ───────────────────────────────────────────────────────────
-BAD_STATUSES = {"dissolved", "liquidation", "receivership", "administration",
-                "voluntary arrangement", "insolvency proceedings"}
-master["ch_concern"] = (
-    master["ch_status"].fillna("").str.lower().isin(BAD_STATUSES)
-)
-master["has_url"] = master["url"].notna() & (master["url"].fillna("") != "")
-
-# ── Summary ───────────────────────────────────────────────────────────────────
-print(f"\n{'='*55}")
-print("  MASTER DATAFRAME SUMMARY")
-print(f"{'='*55}")
-print(f"  Total companies         : {len(master)}")
-print(f"  Hub (with URLs)         : {(master['source']=='hub').sum()}")
-print(f"  CH-only (no URL yet)    : {(master['source']=='companies_house').sum()}")
-print(f"  Hub + CH validated      : {(master['ch_validated'] & (master['source']=='hub')).sum()}")
-print(f"  Hub only (no CH match)  : {(~master['ch_validated'] & (master['source']=='hub')).sum()}")
-print(f"  Has URL                 : {master['has_url'].sum()}")
-print(f"  CH status concerns      : {master['ch_concern'].sum()}")
-print(f"{'='*55}")
-
-# SIC breakdown for hub companies that got validated
-print("\nTop SIC codes (hub companies matched to CH):")
-matched_sic = master[master["ch_validated"] & (master["source"] == "hub")]["sic_code"]
-print(matched_sic.value_counts().head(12).to_string())
-
-# ── Save ──────────────────────────────────────────────────────────────────────
-OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
-master.to_csv(OUT_CSV, index=False)
-print(f"\n✓ Saved → {OUT_CSV.relative_to(BASE)}")
-print(f"  {len(master)} rows × {len(master.columns)} columns")
-
-# ── Spot-check confirmed matches ─────────────────────────────────────────────
-conf = matches_df[matches_df["matched"]].sort_values("score", ascending=False)
-print(f"\n=== CONFIRMED MATCHES (top 40, sorted by score) ===")
-print(conf[["hub_name", "ch_name", "score"]].head(40).to_string(index=False))
-
-# Near-misses for manual review
-near = matches_df[(matches_df["score"] >= 0.40) & (~matches_df["matched"])].sort_values("score", ascending=False)
-print(f"\n=== NEAR-MISSES (Jaccard 0.40–{JACCARD_THRESHOLD}, {len(near)} companies) ===")
-print(near[["hub_name", "ch_name", "score"]].head(25).to_string(index=False))
+        }
+
+        if row["matched"]:
+            ch_row = ch.iloc[int(row["ch_idx"])]
+            rec.update({
+                "company_number": ch_row["company_number"],
+                "postcode"      : ch_row.get("postcode"),
+                "ch_status"     : ch_row.get("status"),
+                "sic_code"      : ch_row.get("sic_code_1"),
+                "company_size"  : ch_row.get("company_size"),
+                "incorporated"  : ch_row.get("incorporated"),
+                "last_accounts" : ch_row.get("last_accounts"),
+                "address"       : ch_row.get("address"),
+                "ch_validated"  : True,
+                "ch_match_score": row["score"],
+                "ch_match_name" : row["ch_name"],
+            })
+
+        records.append(rec)
+
+    # 2. CH-only companies (not matched to any hub entry) → keep for completeness
+    matched_ch_indices = set(
+        matches_df.loc[matches_df["matched"], "ch_idx"].astype(int).tolist()
+    )
+    ch_only_count = 0
+    for ch_idx, ch_row in ch.iterrows():
+        if ch_idx not in matched_ch_indices:
+            records.append({
+                "company_name"  : ch_row["company_name"],
+                "url"           : None,
+                "source"        : "companies_house",
+                "hub_name"      : None,
+                "hub_type"      : None,
+                "company_number": ch_row["company_number"],
+                "postcode"      : ch_row.get("postcode"),
+                "ch_status"     : ch_row.get("status"),
+                "sic_code"      : ch_row.get("sic_code_1"),
+                "company_size"  : ch_row.get("company_size"),
+                "incorporated"  : ch_row.get("incorporated"),
+                "last_accounts" : ch_row.get("last_accounts"),
+                "address"       : ch_row.get("address"),
+                "ch_validated"  : True,
+                "ch_match_score": None,
+                "ch_match_name" : None,
+            })
+            ch_only_count += 1
+
+    master = pd.DataFrame(records)
+
+    # ── Derived columns ───────────────────────────────────────────────────────
+    BAD_STATUSES = {"dissolved", "liquidation", "receivership", "administration",
+                    "voluntary arrangement", "insolvency proceedings"}
+    master["ch_concern"] = (
+        master["ch_status"].fillna("").str.lower().isin(BAD_STATUSES)
+    )
+    master["has_url"] = master["url"].notna() & (master["url"].fillna("") != "")
+
+    # ── Summary ───────────────────────────────────────────────────────────────
+    print(f"\n{'='*55}")
+    print("  MASTER DATAFRAME SUMMARY")
+    print(f"{'='*55}")
+    print(f"  Total companies         : {len(master)}")
+    print(f"  Hub (with URLs)         : {(master['source']=='hub').sum()}")
+    print(f"  CH-only (no URL yet)    : {(master['source']=='companies_house').sum()}")
+    print(f"  Hub + CH validated      : {(master['ch_validated'] & (master['source']=='hub')).sum()}")
+    print(f"  Hub only (no CH match)  : {(~master['ch_validated'] & (master['source']=='hub')).sum()}")
+    print(f"  Has URL                 : {master['has_url'].sum()}")
+    print(f"  CH status concerns      : {master['ch_concern'].sum()}")
+    print(f"{'='*55}")
+
+    # SIC breakdown for hub companies that got validated
+    print("\nTop SIC codes (hub companies matched to CH):")
+    matched_sic = master[master["ch_validated"] & (master["source"] == "hub")]["sic_code"]
+    print(matched_sic.value_counts().head(12).to_string())
+
+    # ── Save ──────────────────────────────────────────────────────────────────
+    if args.dry_run:
+        print("\n(dry run, nothing written)")
+    else:
+        OUT_CSV.parent.mkdir(parents=True, exist_ok=True)
+        storage.save_table(master, OUT_CSV)
+        print(f"\n✓ Saved → {storage.parquet_path(OUT_CSV).relative_to(BASE)}"
+              + (f" (+ {OUT_CSV.name})" if storage.CSV_EXPORT else ""))
+    print(f"  {len(master)} rows × {len(master.columns)} columns")
+
+    # ── Spot-check confirmed matches ─────────────────────────────────────────
+    conf = matches_df[matches_df["matched"]].sort_values("score", ascending=False)
+    print(f"\n=== CONFIRMED MATCHES (top 40, sorted by score) ===")
+    print(conf[["hub_name", "ch_name", "score"]].head(40).to_string(index=False))
+
+    # Near-misses for manual review
+    near = matches_df[(matches_df["score"] >= 0.40) & (~matches_df["matched"])].sort_values("score", ascending=False)
+    print(f"\n=== NEAR-MISSES (Jaccard 0.40–{JACCARD_THRESHOLD}, {len(near)} companies) ===")
+    print(near[["hub_name", "ch_name", "score"]].head(25).to_string(index=False))
+
+
+if __name__ == "__main__":
+    cli.run(main, __doc__)
@@ -12,31 +12,33 @@ is preserved if you interrupt and re-run (already-done companies are skipped).
 Estimated cost: ~$0.15–0.25 for all ~432 hub companies.
 
 Run with:
-    python 02_find_careers.py
+    python 02_find_careers.py             (needs OPENAI_API_KEY)
+    python 02_find_careers.py --dry-run   (list the companies still to do)
     (requires: pip install openai requests beautifulsoup4)
 """
 
 import json
 import os
 import re
-import time
 from pathlib import Path
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import cli
+import instrument
+import storage
+
+pd       = cli.lazy_import("pandas")
+requests = cli.lazy_import("requests")
+bs4      = cli.lazy_import("bs4")
 
 # ── Config ────────────────────────────────────────────────────────────────────
 BASE       = Path(__file__).parent.parent
 MASTER_CSV = BASE / "pipeline" / "output" / "master_companies.csv"
 OUT_CSV    = BASE / "pipeline" / "output" / "careers.csv"
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")  # export OPENAI_API_KEY=sk-...
 MODEL          = "gpt-4o-mini"
 
 FETCH_TIMEOUT  = 12    # seconds per HTTP request
-REQUEST_DELAY  = 0.5   # seconds between requests (polite crawling)
+REQUEST_DELAY  = float(os.environ.get("PIPELINE_REQUEST_DELAY", 0.5))   # seconds between requests (polite crawling)
 MAX_PAGE_CHARS = 12000 # truncate page text fed to GPT (keeps token cost down)
 
 # Keywords that strongly suggest a careers/jobs page
@@ -54,22 +56,29 @@ HEADERS = {
     )
 }
 
-# ── Clients ───────────────────────────────────────────────────────────────────
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-client = OpenAI()
-
 # ── Helpers ───────────────────────────────────────────────────────────────────
-def fetch(url: str, timeout: int = FETCH_TIMEOUT) -> str | None:
-    """GET a URL, return plain text or None on failure."""
-    try:
+def _get(url: str, timeout: int):
+    """requests.get, recorded as a "fetch" span; raises on HTTP errors."""
+    with instrument.span("fetch", url=url) as s:
         resp = requests.get(url, timeout=timeout, headers=HEADERS,
                             allow_redirects=True)
+        s.update(status=resp.status_code, bytes=len(resp.content))
         resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, "html.parser")
-        # Remove nav/footer/script noise
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
-        return soup.get_text(separator=" ", strip=True)
+    return resp
+
+
+def fetch(url: str, timeout: int = FETCH_TIMEOUT) -> str | None:
+    """GET a URL, return plain text or None on failure."""
+    try:
+        resp = _get(url, timeout)
+        with instrument.span("parse", url=url) as s:
+            soup = bs4.BeautifulSoup(resp.content, "html.parser")
+            # Remove nav/footer/script noise
+            for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+                tag.decompose()
+            text = soup.get_text(separator=" ", strip=True)
+            s["chars"] = len(text)
+        return text
     except Exception as e:
         return None
 
@@ -77,13 +86,13 @@ def fetch(url: str, timeout: int = FETCH_TIMEOUT) -> str | None:
 def fetch_html(url: str, timeout: int = FETCH_TIMEOUT):
     """Return (text, soup) or (None, None)."""
     try:
-        resp = requests.get(url, timeout=timeout, headers=HEADERS,
-                            allow_redirects=True)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, "html.parser")
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        text = soup.get_text(separator=" ", strip=True)
+        resp = _get(url, timeout)
+        with instrument.span("parse", url=url) as s:
+            soup = bs4.BeautifulSoup(resp.content, "html.parser")
+            for tag in soup(["script", "style"]):
+                tag.decompose()
+            text = soup.get_text(separator=" ", strip=True)
+            s["chars"] = len(text)
         return text, soup
     except Exception:
         return None, None
@@ -142,13 +151,15 @@ Extract the following as a JSON object (use null for missing fields):
 Return ONLY the JSON object, no other text."""
 
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            max_tokens=800,
-            response_format={"type": "json_object"},
-        )
+        with instrument.span("llm", model=MODEL, url=source_label) as s:
+            resp = cli.openai_client().chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                max_tokens=800,
+                response_format={"type": "json_object"},
+            )
+            s.update(instrument.llm_usage(MODEL, resp.usage))
         raw = resp.choices[0].message.content
         data = json.loads(raw)
         data["raw_model"] = MODEL
@@ -158,8 +169,8 @@ Return ONLY the JSON object, no other text."""
 
 
 # ── Main ──────────────────────────────────────────────────────────────────────
-def main():
-    master = pd.read_csv(MASTER_CSV)
+def main(args):
+    master = storage.load_table(MASTER_CSV)
     companies_with_url = master[master["has_url"] == True].copy()
     print(f"Companies with URLs to process: {len(companies_with_url)}")
 
@@ -175,6 +186,13 @@ def main():
     ]
     print(f"Remaining to process: {len(todo)}\n")
 
+    if args.dry_run:
+        for name, url in zip(todo["company_name"], todo["url"]):
+            print(f"  {name[:45]:<45} {url}")
+        return
+    cli.openai_client()   # fail on a missing key before the first fetch
+    instrument.start("careers")
+
     results = []
     errors  = []
 
@@ -189,14 +207,16 @@ def main():
             continue
 
         print(f"[{i:3d}/{len(todo)}] {name[:45]:<45} {url[:50]}")
+        instrument.company(name, url)
 
         # Step 1: Fetch homepage
         homepage_text, homepage_soup = fetch_html(url)
-        time.sleep(REQUEST_DELAY)
+        instrument.sleep(REQUEST_DELAY)
 
         if not homepage_text:
             print(f"            ✗ homepage unreachable")
             results.append({
+                "company_id"    : row["company_id"],
                 "company_name"  : name,
                 "company_url"   : url,
                 "careers_url"   : None,
@@ -217,7 +237,7 @@ def main():
         if careers_links:
             for cl in careers_links:
                 ct = fetch(cl)
-                time.sleep(REQUEST_DELAY)
+                instrument.sleep(REQUEST_DELAY)
                 if ct:
                     careers_url  = cl
                     careers_text = ct
@@ -246,6 +266,7 @@ def main():
               f"has_careers: {gpt_result.get('has_careers_page')}")
 
         results.append({
+            "company_id"      : row["company_id"],
             "company_name"    : name,
             "company_url"     : url,
             "careers_url"     : careers_url,
@@ -264,8 +285,9 @@ def main():
             results = []
             print(f"  ── checkpoint saved ({i} processed) ──\n")
 
-    # Final save
+    # Final save (CSV is the checkpoint log; Parquet is the typed handoff)
     _append_save(results, OUT_CSV, done)
+    storage.export_parquet(OUT_CSV)
 
     # Summary
     final = pd.read_csv(OUT_CSV)
@@ -279,6 +301,7 @@ def main():
     print(f"  Homepage errors    : {(final['scrape_status']=='homepage_error').sum()}")
     print(f"{'='*55}")
     print(f"\n✓ Saved → {OUT_CSV.relative_to(BASE)}")
+    instrument.report()
 
 
 def _append_save(new_rows: list, path: Path, already_done: set):
@@ -286,12 +309,10 @@ def _append_save(new_rows: list, path: Path, already_done: set):
     if not new_rows:
         return
     df = pd.DataFrame(new_rows)
-    if path.exists():
-        df.to_csv(path, mode="a", header=False, index=False)
-    else:
-        df.to_csv(path, index=False)
+    with instrument.span("save", rows=len(df), company=None, host=None):   # a checkpoint, not one company
+        storage.append_csv(df, path)
     already_done.update(df["company_name"].tolist())
 
 
 if __name__ == "__main__":
-    main()
+    cli.run(main, __doc__)
@@ -24,19 +24,22 @@ Estimated cost at gpt-4o-mini pricing:
   Total: ~$0.29
 
 Run with:
-    python 03_enrich_companies.py
+    python 03_enrich_companies.py             (needs OPENAI_API_KEY)
+    python 03_enrich_companies.py --dry-run   (list the companies still to do)
     (requires: pip install openai requests beautifulsoup4)
 """
 
 import json
 import os
-import time
 from pathlib import Path
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import cli
+import instrument
+import storage
+
+pd       = cli.lazy_import("pandas")
+requests = cli.lazy_import("requests")
+bs4      = cli.lazy_import("bs4")
 
 # ── Config ────────────────────────────────────────────────────────────────────
 BASE        = Path(__file__).parent.parent
@@ -44,12 +47,11 @@ MASTER_CSV  = BASE / "pipeline" / "output" / "master_companies.csv"
 CAREERS_CSV = BASE / "pipeline" / "output" / "careers.csv"   # optional, for context
 OUT_CSV     = BASE / "pipeline" / "output" / "enriched_companies.csv"
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")  # export OPENAI_API_KEY=sk-...
 MODEL          = "gpt-4o-mini"
 
 FETCH_TIMEOUT   = 10
 MAX_PAGE_CHARS  = 8000    # chars fed to GPT from homepage
-REQUEST_DELAY   = 0.4
+REQUEST_DELAY   = float(os.environ.get("PIPELINE_REQUEST_DELAY", 0.4))
 
 HEADERS = {
     "User-Agent": (
@@ -70,24 +72,24 @@ SECTOR_LIST = (
     "software | consulting | research"
 )
 
-# ── Client ────────────────────────────────────────────────────────────────────
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-client = OpenAI()
-
-
 # ── Helpers ───────────────────────────────────────────────────────────────────
 def fetch_homepage_text(url: str) -> str | None:
     """Fetch a homepage and return clean plain text."""
     try:
         if not url.startswith("http"):
             url = "https://" + url
-        resp = requests.get(url, timeout=FETCH_TIMEOUT, headers=HEADERS,
-                            allow_redirects=True)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, "html.parser")
-        for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
-        return soup.get_text(separator=" ", strip=True)
+        with instrument.span("fetch", url=url) as s:
+            resp = requests.get(url, timeout=FETCH_TIMEOUT, headers=HEADERS,
+                                allow_redirects=True)
+            s.update(status=resp.status_code, bytes=len(resp.content))
+            resp.raise_for_status()
+        with instrument.span("parse", url=url) as s:
+            soup = bs4.BeautifulSoup(resp.content, "html.parser")
+            for tag in soup(["script", "style", "nav", "footer", "header", "aside"]):
+                tag.decompose()
+            text = soup.get_text(separator=" ", strip=True)
+            s["chars"] = len(text)
+        return text
     except Exception:
         return None
 
@@ -134,31 +136,37 @@ Using the context above (and your own knowledge if context is sparse), return a
 Return ONLY the JSON object."""
 
 
-def ask_gpt(prompt: str) -> dict:
+def ask_gpt(prompt: str, page_url: str | None = None) -> dict:
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1,
-            max_tokens=500,
-            response_format={"type": "json_object"},
-        )
+        with instrument.span("llm", model=MODEL, url=page_url) as s:
+            resp = cli.openai_client().chat.completions.create(
+                model=MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.1,
+                max_tokens=500,
+                response_format={"type": "json_object"},
+            )
+            s.update(instrument.llm_usage(MODEL, resp.usage))
         return json.loads(resp.choices[0].message.content)
     except Exception as e:
         return {"error": str(e)}
 
 
 # ── Main ──────────────────────────────────────────────────────────────────────
-def main():
-    master  = pd.read_csv(MASTER_CSV)
+def main(args):
+    master  = storage.load_table(MASTER_CSV)
     print(f"Companies to enrich: {len(master)}")
 
     # Optional: load careers summaries for extra context
     careers_map = {}
     if CAREERS_CSV.exists():
-        careers = pd.read_csv(CAREERS_CSV)
-        careers_map = dict(zip(careers["company_name"],
-                               careers["summary"].fillna("")))
+        careers = storage.load_table(CAREERS_CSV)
+        # 02 logs "summary"; the rows merged from the shard runs have "careers_summary"
+        summary = pd.Series(None, index=careers.index, dtype=object)
+        for col in ("careers_summary", "summary"):
+            if col in careers.columns:
+                summary = summary.fillna(careers[col])
+        careers_map = dict(zip(careers["company_name"], summary.fillna("")))
         print(f"Careers context loaded for {len(careers_map)} companies")
 
     # Incremental resumption
@@ -171,6 +179,13 @@ def main():
     todo = master[~master["company_name"].isin(done)]
     print(f"Remaining: {len(todo)}\n")
 
+    if args.dry_run:
+        for name, url in zip(todo["company_name"], todo["url"]):
+            print(f"  {name[:50]:<50} {url if isinstance(url, str) else '(no URL)'}")
+        return
+    cli.openai_client()   # fail on a missing key before the first fetch
+    instrument.start("enrich")
+
     results = []
 
     for i, (_, row) in enumerate(todo.iterrows(), 1):
@@ -180,12 +195,13 @@ def main():
         inc  = row["incorporated"] if pd.notna(row.get("incorporated")) else None
 
         print(f"[{i:3d}/{len(todo)}] {name[:50]:<50}", end=" ")
+        instrument.company(name, url)
 
         # Fetch homepage (only for companies with URLs)
         homepage_text = None
         if url:
             homepage_text = fetch_homepage_text(url)
-            time.sleep(REQUEST_DELAY)
+            instrument.sleep(REQUEST_DELAY)
             status = "✓ fetched" if homepage_text else "✗ fetch failed"
         else:
             status = "— no url"
@@ -194,13 +210,14 @@ def main():
 
         # Build prompt and call GPT
         prompt  = build_prompt(name, url, sic, inc, homepage_text, careers_summary)
-        gpt_out = ask_gpt(prompt)
+        gpt_out = ask_gpt(prompt, url if homepage_text else None)
 
         print(f"| {status} | stage={gpt_out.get('stage','?'):<12} "
               f"| {', '.join(gpt_out.get('sector_tags', []))[:35]}")
 
         # Flatten into output row
         results.append({
+            "company_id"    : row["company_id"],
             "company_name"  : name,
             "url"           : url,
             "source"        : row.get("source"),
@@ -232,6 +249,7 @@ def main():
             print(f"  ── checkpoint ({i} done) ──\n")
 
     _append_save(results, OUT_CSV, done)
+    storage.export_parquet(OUT_CSV)
 
     # Summary
     final = pd.read_csv(OUT_CSV)
@@ -254,18 +272,17 @@ def main():
     print(pd.Series(Counter(all_tags)).sort_values(ascending=False).head(15).to_string())
     print(f"{'='*55}")
     print(f"\n✓ Saved → {OUT_CSV.relative_to(BASE)}")
+    instrument.report()
 
 
 def _append_save(new_rows: list, path: Path, already_done: set):
     if not new_rows:
         return
     df = pd.DataFrame(new_rows)
-    if path.exists():
-        df.to_csv(path, mode="a", header=False, index=False)
-    else:
-        df.to_csv(path, index=False)
+    with instrument.span("save", rows=len(df), company=None, host=None):   # a checkpoint, not one company
+        storage.append_csv(df, path)
     already_done.update(df["company_name"].tolist())
 
 
 if __name__ == "__main__":
-    main()
+    cli.run(main, __doc__)
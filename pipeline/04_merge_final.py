@@ -0,0 +1,267 @@
+"""
+Script 04: Merge master + careers + enrichment into final_companies.csv.
+
+build_site.py and the notebook treat final_companies.csv as the master file;
+this script produces it from the outputs of scripts 01–03.
+
+Strategy:
+  - Every table is keyed on company_id (see storage.company_id): Companies
+    House number, else website host, else a name slug. Joins are dict lookups
+    on that key, so the merge is linear in the number of rows.
+  - A row's own company_id is used whenever master has it: 02/03 write
+    master's id into their output. Rows logged before they did (and final
+    rows from before this script) only get the id storage derives from their
+    URL or name, without the CH number; when master doesn't know that id they
+    are mapped onto master via their exact company name, if exactly one
+    master company has that name.
+  - Which input wins for a column present in several of them is spelled out in
+    COLUMN_SOURCES below: the first non-null value in priority order is used.
+  - Duplicates within an input: a company listed twice in master (or in the
+    existing final table) is one row: the first one, its gaps filled from the
+    later ones, with every hub membership kept (MEMBERSHIP_COLUMNS joined with
+    "; "); the summary lists them. careers/enriched keep the last row (they
+    are append-only logs, so later rows are re-runs).
+  - A company appears in the final table once it has an enrichment row.
+
+Incremental upserts (the default):
+  The existing final table is the base. A per-company fingerprint of the input
+  rows is kept in .merge_state.json; only companies whose inputs changed (or
+  are new) are re-merged, and values missing from the inputs fall back to what
+  is already in the final table. Companies not in the inputs (e.g. added by
+  hand in the notebook) are kept untouched, in their current order. Rows that
+  are in the final table but have no fingerprint yet are adopted unchanged;
+  use --rebuild to re-derive everything from the inputs.
+
+Rebuilds:
+  The inputs don't cover the whole committed table: the Companies House rows
+  and some hub rows were merged by hand from the shard_*.json / ch_shard_*.json
+  runs, with a selection that isn't recorded anywhere. --rebuild therefore
+  lists the existing rows it would drop and stops; add --drop-missing to drop
+  them anyway.
+
+Run with:
+    python 04_merge_final.py             # upsert changed companies
+    python 04_merge_final.py --rebuild   # rebuild from the inputs only
+    python 04_merge_final.py --dry-run   # report the changes, write nothing
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import cli
+import storage
+
+pd = cli.lazy_import("pandas")
+
+# ── Paths ─────────────────────────────────────────────────────────────────────
+BASE         = Path(__file__).parent.parent
+OUT_DIR      = BASE / "pipeline" / "output"
+MASTER_CSV   = OUT_DIR / "master_companies.csv"
+CAREERS_CSV  = OUT_DIR / "careers.csv"
+ENRICHED_CSV = OUT_DIR / "enriched_companies.csv"
+FINAL_CSV    = OUT_DIR / "final_companies.csv"
+STATE_JSON   = OUT_DIR / ".merge_state.json"
+
+# ── Conflict rules ────────────────────────────────────────────────────────────
+# column → [(input, input column), ...] in priority order. The first non-null
+# value wins; in upsert mode the existing final value is the last fallback.
+_MASTER_ONLY = ["company_name", "source", "hub_name", "hub_type",
+                "company_number", "postcode", "ch_status", "sic_code",
+                "company_size", "incorporated", "last_accounts", "address",
+                "ch_validated", "ch_match_score", "ch_match_name", "ch_concern"]
+_ENRICHED    = ["founded_year", "description", "sector_tags", "stage",
+                "tech_keywords", "employee_est", "hiring_status"]
+_CAREERS     = ["has_careers_page", "role_count", "roles_json", "contact_email"]
+
+COLUMN_SOURCES = {
+    "company_id" : [("master", "company_id")],
+    **{c: [("master", c)] for c in _MASTER_ONLY},
+    "url"        : [("master", "url"), ("enriched", "url"),
+                    ("careers", "company_url")],
+    **{c: [("enriched", c)] for c in _ENRICHED},
+    "careers_url": [("careers", "careers_url"), ("enriched", "careers_url")],
+    **{c: [("careers", c)] for c in _CAREERS},
+}
+FINAL_COLUMNS = list(COLUMN_SOURCES) + ["has_url"]
+
+# A company listed once per hub keeps all of these when its rows are folded
+MEMBERSHIP_COLUMNS = ["hub_name", "hub_type"]
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+def _is_null(v) -> bool:
+    if v is None or isinstance(v, (list, dict)):
+        return v is None
+    return bool(pd.isna(v))
+
+
+def _fold(first: dict, later: dict) -> None:
+    """Fold a later row of the same company into the first one (in place)."""
+    for col in MEMBERSHIP_COLUMNS:
+        vals = [v for rec in (first, later) if not _is_null(rec.get(col))
+                for v in str(rec[col]).split("; ") if v]
+        first[col] = "; ".join(dict.fromkeys(vals)) or first.get(col)
+    for col, v in later.items():
+        if _is_null(first.get(col)) and not _is_null(v):
+            first[col] = v
+
+
+def _keyed(df: pd.DataFrame, keep: str, master_ids=(), name_to_id: dict | None = None) -> tuple[dict, list]:
+    """
+    ({company_id: row dict}, [(company_id, name) of the rows not kept]).
+    keep="last" replaces earlier rows; keep="first" folds later ones into the
+    first (see _fold). Ids master doesn't know are legacy ones (no CH number):
+    those rows take the id of the master company with their name, if any.
+    """
+    name_to_id = name_to_id or {}
+    out, dropped = {}, []
+    for rec in df.to_dict("records"):
+        cid = rec["company_id"]
+        if cid not in master_ids:
+            cid = name_to_id.get(rec.get("company_name"), cid)
+        rec["company_id"] = cid
+        if cid in out:
+            dropped.append((cid, (out[cid] if keep == "last" else rec).get("company_name")))
+            if keep == "first":
+                _fold(out[cid], rec)
+                continue
+        out[cid] = rec
+    return out, dropped
+
+
+def _fingerprint(*rows) -> str:
+    payload = json.dumps(rows, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def merge_row(inputs: dict, existing: dict | None) -> dict:
+    """Apply COLUMN_SOURCES to one company's input rows."""
+    row = {}
+    for col, sources in COLUMN_SOURCES.items():
+        val = None
+        for src, src_col in sources:
+            rec = inputs.get(src)
+            if rec is not None and not _is_null(rec.get(src_col)):
+                val = rec[src_col]
+                break
+        if val is None and existing is not None:
+            val = existing.get(col)
+        row[col] = val
+    row["has_url"] = isinstance(row["url"], str) and bool(row["url"].strip())
+    return row
+
+
+# ── Main ──────────────────────────────────────────────────────────────────────
+def main(args):
+    rebuild = args.rebuild
+
+    master = storage.load_table(MASTER_CSV)
+    # Careers/enrichment are optional: a company only needs one of them present
+    careers  = storage.load_table(CAREERS_CSV)  if CAREERS_CSV.exists()  else None
+    enriched = storage.load_table(ENRICHED_CSV) if ENRICHED_CSV.exists() else None
+    print(f"Master: {len(master)} | careers: {0 if careers is None else len(careers)}"
+          f" | enriched: {0 if enriched is None else len(enriched)}")
+
+    master_by_id, master_dups = _keyed(master, "first")
+    # Name → id for names that belong to one master company only
+    ids_of = {}
+    for name, cid in zip(master["company_name"], master["company_id"]):
+        ids_of.setdefault(name, set()).add(cid)
+    name_to_id = {name: next(iter(ids)) for name, ids in ids_of.items() if len(ids) == 1}
+    by_id = {
+        "master"  : master_by_id,
+        "careers" : {} if careers  is None else _keyed(careers,  "last", master_by_id, name_to_id)[0],
+        "enriched": {} if enriched is None else _keyed(enriched, "last", master_by_id, name_to_id)[0],
+    }
+
+    # Existing final table (upsert base) and the fingerprints of its last merge
+    existing, state, final_dups = {}, {}, []
+    if FINAL_CSV.exists():
+        existing, final_dups = _keyed(storage.load_table(FINAL_CSV), "first",
+                                       master_by_id, name_to_id)
+        if STATE_JSON.exists():
+            state = json.loads(STATE_JSON.read_text())
+
+    # Companies in the final table: enriched ones that exist in master
+    ids = [cid for cid in by_id["master"] if cid in by_id["enriched"]]
+    new_ids = set(ids)
+    orphans = [cid for cid in by_id["enriched"] if cid not in by_id["master"]]
+
+    # A rebuild starts from nothing; the existing rows are only checked for losses
+    missing = []
+    if rebuild:
+        missing  = [(cid, row) for cid, row in existing.items() if cid not in new_ids]
+        existing, state, final_dups = {}, {}, []
+        if missing and not args.drop_missing and not args.dry_run:
+            listing = "\n".join(f"  {cid:<28} {row.get('source')!s:<16} {row.get('company_name')}"
+                                 for cid, row in missing)
+            raise SystemExit(f"--rebuild would drop {len(missing)} row(s) of {FINAL_CSV.name} that "
+                             f"no input produces; add --drop-missing to drop them:\n{listing}")
+
+    merged, new_state = dict(existing), {}
+    added = updated = unchanged = 0
+    for cid in ids:
+        inputs = {src: rows.get(cid) for src, rows in by_id.items()}
+        fp = _fingerprint(inputs["master"], inputs["careers"], inputs["enriched"])
+        new_state[cid] = fp
+        # Rows already in the final table but never merged (e.g. curated by
+        # hand before this script existed) are adopted as-is
+        if cid in existing and state.get(cid, fp) == fp:
+            unchanged += 1
+            continue
+        added   += cid not in existing
+        updated += cid in existing
+        merged[cid] = merge_row(inputs, existing.get(cid))
+    # Keep fingerprints of companies that are only in the existing table
+    for cid in existing:
+        if cid not in new_state and cid in state:
+            new_state[cid] = state[cid]
+
+    # Existing order first, then new companies in master order
+    final = pd.DataFrame(list(merged.values()))
+    for col in FINAL_COLUMNS:
+        if col not in final.columns:
+            final[col] = None
+    extra = [c for c in final.columns if c not in FINAL_COLUMNS]
+    final = final[FINAL_COLUMNS + extra]
+
+    if not args.dry_run:
+        storage.save_table(final, FINAL_CSV, csv=True)   # CSV is hand-edited in the notebook
+        STATE_JSON.write_text(json.dumps(new_state, sort_keys=True))
+
+    print(f"\n{'='*55}")
+    print("  FINAL MERGE SUMMARY")
+    print(f"{'='*55}")
+    print(f"  Mode               : {'rebuild' if rebuild else 'upsert'}")
+    print(f"  Companies          : {len(final)}")
+    print(f"  Added              : {added}")
+    print(f"  Updated            : {updated}")
+    print(f"  Unchanged          : {unchanged}")
+    print(f"  Kept (not in input): {sum(1 for cid in existing if cid not in new_ids)}")
+    if missing:
+        print(f"  Dropped (not in input): {len(missing)}")
+        for cid, row in missing:
+            print(f"    {cid:<28} {row.get('company_name')}")
+    if orphans:
+        print(f"  Enriched, not in master (skipped): {len(orphans)}")
+    for label, dups in (("master", master_dups), (FINAL_CSV.name, final_dups)):
+        if dups:
+            print(f"  Listed twice in {label} (folded): {len(dups)}")
+            for cid, name in dups:
+                print(f"    {cid:<28} {name}")
+    print(f"{'='*55}")
+    print(f"\n{'(dry run, nothing written)' if args.dry_run else f'✓ Saved → {FINAL_CSV.relative_to(BASE)}'}")
+
+
+def _add_args(ap):
+    ap.add_argument("--rebuild", action="store_true",
+                    help="re-derive every row from the inputs instead of upserting")
+    ap.add_argument("--drop-missing", action="store_true",
+                    help="with --rebuild, drop existing rows that no input produces")
+
+
+if __name__ == "__main__":
+    cli.run(main, __doc__, _add_args)
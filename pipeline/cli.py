@@ -0,0 +1,78 @@
+"""
+Command line and lazy imports shared by the pipeline scripts.
+
+Each script ends with `cli.run(main, __doc__)`: --help is its docstring and
+exits before anything heavy is imported, and every script takes --dry-run
+(report what would be done; no network calls, no OpenAI, no files written).
+
+pandas, requests, BeautifulSoup and the OpenAI client cost seconds to import
+between them, so the scripts bind them lazily and only pay for what a run uses:
+
+    pd  = cli.lazy_import("pandas")   # module, executed on first attribute access
+    bs4 = cli.lazy_import("bs4")      # bs4.BeautifulSoup(...)
+    cli.openai_client()               # created on first call; needs OPENAI_API_KEY
+
+A package that is not installed only fails when it is first used, with the
+pip hint, so --help and dry runs work without the scraping dependencies.
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+REQUIREMENTS = "pip install -r pipeline/requirements.txt"
+
+
+class _Missing:
+    """Stands in for a module that is not installed; fails on first use."""
+
+    def __init__(self, name):
+        self.__name__ = name
+
+    def __getattr__(self, attr):
+        raise ModuleNotFoundError(f"No module named {self.__name__!r} ({REQUIREMENTS})",
+                                  name=self.__name__)
+
+
+def lazy_import(name):
+    """The module `name`, executed on first attribute access (importlib's LazyLoader)."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return _Missing(name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+_client = None
+
+def openai_client():
+    """The shared OpenAI client, created on first use."""
+    global _client
+    if _client is None:
+        if not os.environ.get("OPENAI_API_KEY"):
+            sys.exit("OPENAI_API_KEY is not set (export OPENAI_API_KEY=sk-...)")
+        from openai import OpenAI
+        _client = OpenAI()
+    return _client
+
+
+def parser(doc):
+    """An ArgumentParser for a script: its docstring as help, plus --dry-run."""
+    ap = argparse.ArgumentParser(description=doc, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dry-run", action="store_true",
+                    help="report what would be done; no network calls and no files written")
+    return ap
+
+
+def run(main, doc, add_args=None):
+    """Parse the command line (add_args(parser) adds a script's own flags) and call main(args)."""
+    ap = parser(doc)
+    if add_args:
+        add_args(ap)
+    main(ap.parse_args())
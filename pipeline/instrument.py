@@ -0,0 +1,230 @@
+"""
+Per-company spans for the pipeline scripts: what each fetch, parse, LLM call,
+polite wait and save cost in time, bytes, tokens and dollars.
+
+    instrument.start("careers")            # trace → output/traces/careers-<time>.jsonl
+    instrument.company(name, url)          # tags the spans that follow
+    with instrument.span("fetch", url=url) as s:
+        resp = requests.get(url)
+        s["bytes"] = len(resp.content)
+    with instrument.span("llm", model=MODEL, url=url) as s:   # url: the page sent
+        resp = client.chat.completions.create(model=MODEL, ...)
+        s.update(instrument.llm_usage(MODEL, resp.usage))
+    instrument.sleep(REQUEST_DELAY)        # time.sleep, recorded as a "wait" span
+    instrument.report()                    # summary of this run
+
+Each span is one JSON line, written as it ends:
+    {span, company, host, url, start (s into the run), s (duration), error, ...}
+so an interrupted run keeps its trace. The summary (latency percentiles and
+histograms per span kind, totals, and the hosts and pages that took the most
+time and money) can be printed for any trace:
+
+    python pipeline/instrument.py pipeline/output/traces/careers-20250101-120000.jsonl
+"""
+
+import atexit
+import json
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+TRACE_DIR = Path(__file__).parent / "output" / "traces"
+
+# USD per million tokens (input, output), for the cost estimate
+PRICES = {"gpt-4o-mini": (0.15, 0.60)}
+
+# Latency histogram bucket upper bounds, seconds
+BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+_spans = []   # this run's spans
+_tags  = {}   # company/host for the spans that follow
+_trace = None
+_t0    = time.time()
+
+
+# ── Recording ─────────────────────────────────────────────────────────────────
+def start(name: str) -> Path:
+    """Start this run's JSONL trace; returns its path."""
+    global _trace, _t0
+    TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    path = TRACE_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.jsonl"
+    _trace = open(path, "w", encoding="utf-8", buffering=1)
+    _t0 = time.time()
+    _write({"run": name, "started": datetime.now().isoformat(timespec="seconds"),
+            "argv": sys.argv[1:]})
+    atexit.register(_close)
+    return path
+
+
+def _write(record):
+    if _trace is not None:
+        _trace.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def _close():
+    global _trace
+    if _trace is not None:
+        _write({"end": datetime.now().isoformat(timespec="seconds"),
+                "wall": round(time.time() - _t0, 3)})
+        _trace.close()
+        _trace = None
+
+
+def host(url) -> str | None:
+    """'https://www.example.com/jobs' → 'example.com'"""
+    if not isinstance(url, str) or not url.strip():
+        return None
+    u = url.strip()
+    netloc = urlparse(u if "://" in u else "https://" + u).netloc.lower()
+    return netloc[4:] if netloc.startswith("www.") else netloc
+
+
+def company(name: str, url=None) -> None:
+    """Tag the spans that follow with this company and its website's host."""
+    _tags.clear()
+    _tags.update(company=name, host=host(url))
+
+
+@contextmanager
+def span(kind: str, **attrs):
+    """
+    Time the block as a span of this kind. Yields the record, for attributes
+    known only inside the block (bytes, status, tokens); an exception is noted
+    as the span's error and re-raised. attrs override the company tags
+    (company=None for run-level work such as a checkpoint save).
+    """
+    rec = {"span": kind, **_tags, **attrs}
+    if attrs.get("url"):
+        rec["host"] = host(attrs["url"])
+    rec["start"] = round(time.time() - _t0, 3)
+    t = time.perf_counter()
+    try:
+        yield rec
+    except BaseException as e:
+        rec["error"] = type(e).__name__
+        raise
+    finally:
+        rec["s"] = round(time.perf_counter() - t, 4)
+        _spans.append(rec)
+        _write(rec)
+
+
+def sleep(seconds: float) -> None:
+    """time.sleep, recorded as a "wait" span (polite crawl delays add up)."""
+    with span("wait"):
+        time.sleep(seconds)
+
+
+def llm_usage(model: str, usage) -> dict:
+    """tokens_in, tokens_out and the estimated cost_usd of a chat completion's usage."""
+    t_in, t_out = usage.prompt_tokens, usage.completion_tokens
+    price = PRICES.get(model)
+    cost  = (t_in * price[0] + t_out * price[1]) / 1e6 if price else None
+    return {"tokens_in": t_in, "tokens_out": t_out,
+            "cost_usd": None if cost is None else round(cost, 6)}
+
+
+# ── Summary ───────────────────────────────────────────────────────────────────
+def _pct(values, q):
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.0f}"
+
+
+def summary(spans, wall=None, top=10) -> str:
+    """The report for a run's spans, as text."""
+    W = 71
+    out = [f"{'='*W}", "  RUN INSTRUMENTATION", f"{'='*W}"]
+    if not spans:
+        return "\n".join(out + ["  (no spans recorded)", f"{'='*W}"])
+    wall = wall or max(r["start"] + r["s"] for r in spans)
+    kinds = defaultdict(list)
+    for r in spans:
+        kinds[r["span"]].append(r)
+
+    # Latency by span kind
+    out.append(f"  {'span':<8}{'n':>6}{'total s':>9}{'%wall':>7}{'p50 ms':>8}"
+               f"{'p90 ms':>8}{'p99 ms':>8}{'max ms':>8}{'errors':>8}")
+    for kind, rs in kinds.items():
+        d = sorted(r["s"] for r in rs)
+        total = sum(d)
+        out.append(f"  {kind:<8}{len(d):>6}{total:>9.1f}{100 * total / wall:>6.0f}%"
+                   f"{_ms(_pct(d, .5)):>8}{_ms(_pct(d, .9)):>8}{_ms(_pct(d, .99)):>8}"
+                   f"{_ms(d[-1]):>8}{sum(1 for r in rs if r.get('error')):>8}")
+
+    # Latency histograms: spans per bucket
+    labels = [f"≤{_ms(b)}ms" if b < 1 else f"≤{b:g}s" for b in BUCKETS] + [f">{BUCKETS[-1]:g}s"]
+    out += ["", "  " + "latency".ljust(8) + "".join(f"{l:>7}" for l in labels)]
+    for kind, rs in kinds.items():
+        counts = [0] * (len(BUCKETS) + 1)
+        for r in rs:
+            counts[next((i for i, b in enumerate(BUCKETS) if r["s"] <= b), len(BUCKETS))] += 1
+        out.append(f"  {kind:<8}" + "".join(f"{c or '·':>7}" for c in counts))
+
+    # Totals
+    companies  = {r["company"] for r in spans if r.get("company")}
+    n_bytes    = sum(r.get("bytes") or 0 for r in spans)
+    tokens_in  = sum(r.get("tokens_in") or 0 for r in spans)
+    tokens_out = sum(r.get("tokens_out") or 0 for r in spans)
+    cost       = sum(r.get("cost_usd") or 0 for r in spans)
+    out += ["",
+            f"  Wall clock         : {wall:.1f}s"
+            + (f"  ({60 * len(companies) / wall:.1f} companies/min)" if companies else ""),
+            f"  Companies          : {len(companies)}",
+            f"  Fetched            : {n_bytes / 1e6:.2f} MB in {len(kinds.get('fetch', []))} requests",
+            f"  Tokens in / out    : {tokens_in:,} / {tokens_out:,}",
+            f"  Estimated cost     : ${cost:.4f}"]
+
+    # Where the time and money went
+    def ranking(title, key, rows):
+        agg = defaultdict(lambda: [0.0, 0, 0.0])   # seconds, bytes, cost
+        for r in rows:
+            a = agg[key(r) or "(none)"]
+            a[0] += r["s"]
+            a[1] += r.get("bytes") or 0
+            a[2] += r.get("cost_usd") or 0
+        lines = ["", f"  {title:<44}{'s':>7}{'KB':>8}{'cost $':>10}"]
+        for name, (s, b, c) in sorted(agg.items(), key=lambda kv: -kv[1][0])[:top]:
+            name = name if len(name) <= 42 else name[:41] + "…"
+            lines.append(f"  {name:<44}{s:>7.1f}{b / 1024:>8.0f}{c:>10.4f}")
+        return lines
+    out += ranking("Top hosts", lambda r: r.get("host"), spans)
+    out += ranking("Top pages (fetch, parse, LLM)", lambda r: r.get("url"),
+                   [r for r in spans if r.get("url")])
+    out.append(f"{'='*W}")
+    return "\n".join(out)
+
+
+def report() -> None:
+    """Print the summary of this run (and where its trace is)."""
+    print("\n" + summary(_spans, time.time() - _t0))
+    if _trace is not None:
+        print(f"  Trace → {_trace.name}")
+
+
+def load(path) -> tuple[list, float | None]:
+    """(spans, wall clock or None if the run did not finish) of a JSONL trace."""
+    spans, wall = [], None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            rec = json.loads(line)
+            if "span" in rec:
+                spans.append(rec)
+            elif "wall" in rec:
+                wall = rec["wall"]
+    return spans, wall
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] in ("-h", "--help"):
+        sys.exit(__doc__)
+    for p in sys.argv[1:]:
+        print(f"{p}:")
+        print(summary(*load(p)))
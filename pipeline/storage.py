@@ -0,0 +1,245 @@
+"""
+Typed Parquet intermediates shared by the pipeline scripts and build_site.py.
+
+Every stage used to re-parse CSVs and redo the same type coercion downstream
+(stringly booleans, company numbers as floats with ".0", JSON-in-CSV columns).
+Stages now hand over typed frames via Parquet:
+
+  - booleans       : ch_validated, ch_concern, has_url, has_careers_page
+  - integers       : founded_year, role_count (nullable Int64)
+  - categoricals   : source, hub_type, stage, hiring_status, employee_est, ...
+  - list columns   : sector_tags (list of str), roles_json (list of role dicts)
+  - company_number : clean string (zero-padded to 8 digits when numeric)
+  - company_id     : stable join key (see company_id()), added when missing
+
+CSV stays available as an export (and is still the checkpoint log for the
+incremental scripts 02/03). load_table() reads whichever of <name>.parquet /
+<name>.csv is newer, so hand-edits to a CSV (e.g. from the notebook) win.
+
+pyarrow is optional: without it, tables are read from / written to CSV only.
+Neither it nor pandas is imported until a table is actually read or written.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+import cli
+
+pd = cli.lazy_import("pandas")
+
+# pandas' Parquet engine; only looked up here, pandas imports it when needed
+HAVE_PARQUET = importlib.util.find_spec("pyarrow") is not None
+
+# Set PIPELINE_CSV_EXPORT=0 to write Parquet only
+CSV_EXPORT = os.environ.get("PIPELINE_CSV_EXPORT", "1") != "0"
+
+BOOL_COLS     = ["ch_validated", "ch_concern", "has_url", "has_careers_page"]
+INT_COLS      = ["founded_year", "role_count"]
+CATEGORY_COLS = ["source", "hub_type", "stage", "hiring_status",
+                 "employee_est", "scrape_status"]
+LIST_COLS     = ["sector_tags", "roles_json"]   # JSON-encoded in CSV
+
+# Canonical "missing" values for enum columns (same vocabulary as the prompts)
+ENUM_DEFAULTS = {"stage": "unknown", "hiring_status": "no_info",
+                 "employee_est": "unknown"}
+
+
+# ── Company identity ──────────────────────────────────────────────────────────
+def company_id(url, company_number, name) -> str:
+    """
+    Stable join key for a company, independent of how its name is spelled:
+      ch:<number>      from the Companies House number, when there is one
+      web:<host/path>  else from the website (www. and trailing / dropped)
+      name:<slug>      last resort, for rows with neither
+    The number comes first because separate legal entities can share a website
+    (a PLC and its group company, a CIC and its UK subsidiary).
+    """
+    number = _company_number(company_number)
+    if number:
+        return f"ch:{number}"
+    if isinstance(url, str) and url.strip():
+        u = url.strip()
+        p = urlparse(u if "://" in u else "https://" + u)
+        host = p.netloc.lower().rsplit("@", 1)[-1].split(":")[0]
+        if host.startswith("www."):
+            host = host[4:]
+        if host:
+            return f"web:{host}{p.path.rstrip('/').lower()}"
+    return "name:" + re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def _add_company_ids(df: pd.DataFrame) -> None:
+    """Fill company_id for rows that don't have one yet (in place)."""
+    if "company_name" not in df.columns:
+        return
+    if "company_id" not in df.columns:
+        df.insert(0, "company_id", None)
+    missing = df["company_id"].isna()
+    if not missing.any():
+        return
+    rows = df.loc[missing]
+    urls = rows["url"] if "url" in df.columns else pd.Series(None, index=rows.index)
+    if "company_url" in df.columns:
+        urls = urls.where(urls.notna(), rows["company_url"])
+    numbers = rows["company_number"] if "company_number" in df.columns else [None] * len(rows)
+    df.loc[missing, "company_id"] = [
+        company_id(u, n, name)
+        for u, n, name in zip(urls, numbers, rows["company_name"])
+    ]
+
+
+# ── Coercion ──────────────────────────────────────────────────────────────────
+def _to_bool(v) -> bool:
+    if isinstance(v, str):
+        return v.strip().lower() in ("true", "1", "yes")
+    return bool(v) if pd.notna(v) else False
+
+
+def _company_number(v) -> str | None:
+    if v is None or (not isinstance(v, str) and pd.isna(v)):
+        return None
+    s = str(v).strip()
+    if s.endswith(".0"):
+        s = s[:-2]
+    if not s or s.lower() == "nan":
+        return None
+    return s.zfill(8) if s.isdigit() else s.upper()
+
+
+def _to_list(v) -> list:
+    """Parse a JSON list cell (or pass through an already-parsed sequence)."""
+    if isinstance(v, str):
+        try:
+            v = json.loads(v)
+        except ValueError:
+            return [v] if v else []
+    if v is None or isinstance(v, float):
+        return []
+    return list(v) if hasattr(v, "__iter__") and not isinstance(v, dict) else []
+
+
+def _clean_role(r) -> dict | None:
+    """Keep only dict roles, with string values and no null fields."""
+    if not isinstance(r, dict):
+        return None
+    return {k: str(v) for k, v in r.items() if v is not None}
+
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Apply the shared pipeline schema to whichever known columns are present."""
+    df = df.copy()
+    _add_company_ids(df)
+    for col in BOOL_COLS:
+        if col in df.columns:
+            df[col] = df[col].map(_to_bool).astype(bool)
+    for col in INT_COLS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors="coerce").round().astype("Int64")
+    if "role_count" in df.columns:
+        df["role_count"] = df["role_count"].fillna(0)
+    if "company_number" in df.columns:
+        df["company_number"] = df["company_number"].map(_company_number).astype(object)
+    for col, default in ENUM_DEFAULTS.items():
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), default)
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    if "sector_tags" in df.columns:
+        df["sector_tags"] = df["sector_tags"].map(
+            lambda v: [str(t) for t in _to_list(v)])
+    if "roles_json" in df.columns:
+        df["roles_json"] = df["roles_json"].map(
+            lambda v: [r for r in map(_clean_role, _to_list(v)) if r is not None])
+    return df
+
+
+# ── Read / write ──────────────────────────────────────────────────────────────
+def parquet_path(csv_path: Path) -> Path:
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def load_table(csv_path: Path) -> pd.DataFrame:
+    """
+    Load a pipeline table as a typed frame, from Parquet when it is at least as
+    new as the CSV, otherwise from the CSV.
+    """
+    csv_path = Path(csv_path)
+    pq_path  = parquet_path(csv_path)
+    use_pq = (HAVE_PARQUET and pq_path.exists() and
+              (not csv_path.exists() or
+               pq_path.stat().st_mtime >= csv_path.stat().st_mtime))
+    if use_pq:
+        return _from_parquet(pd.read_parquet(pq_path))
+    return coerce_types(pd.read_csv(csv_path))
+
+
+def _from_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parquet files are written already typed, so only undo Arrow's list/struct
+    representation (numpy arrays, null-filled struct fields).
+    """
+    if "sector_tags" in df.columns:
+        df["sector_tags"] = [list(v) if v is not None else [] for v in df["sector_tags"]]
+    if "roles_json" in df.columns:
+        df["roles_json"] = [
+            [{k: x for k, x in r.items() if x is not None} for r in v]
+            if v is not None else []
+            for v in df["roles_json"]
+        ]
+    if "company_number" in df.columns:
+        df["company_number"] = df["company_number"].astype(object).where(
+            df["company_number"].notna(), None)
+    _add_company_ids(df)
+    return df
+
+
+def to_csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """JSON-encode list columns so the frame round-trips through CSV."""
+    out = df.copy()
+    for col in LIST_COLS:
+        if col in out.columns:
+            out[col] = out[col].map(lambda v: json.dumps(list(v)))
+    return out
+
+
+def save_table(df: pd.DataFrame, csv_path: Path, csv: bool | None = None) -> None:
+    """Write the typed Parquet intermediate, plus the CSV export if enabled."""
+    csv_path = Path(csv_path)
+    csv = CSV_EXPORT if csv is None else csv
+    df = coerce_types(df)
+    if csv or not HAVE_PARQUET:
+        to_csv_frame(df).to_csv(csv_path, index=False)
+    if HAVE_PARQUET:
+        df.to_parquet(parquet_path(csv_path), index=False)
+
+
+def append_csv(df: pd.DataFrame, csv_path: Path) -> None:
+    """
+    Append rows to a CSV checkpoint log, aligned to the file's existing header.
+    If the rows bring new columns (e.g. company_id), the file is rewritten once
+    with the widened header.
+    """
+    csv_path = Path(csv_path)
+    if not csv_path.exists():
+        df.to_csv(csv_path, index=False)
+        return
+    header = list(pd.read_csv(csv_path, nrows=0).columns)
+    if set(df.columns) <= set(header):
+        df.reindex(columns=header).to_csv(csv_path, mode="a", header=False, index=False)
+    else:
+        pd.concat([pd.read_csv(csv_path), df], ignore_index=True).to_csv(
+            csv_path, index=False)
+
+
+def export_parquet(csv_path: Path) -> None:
+    """Refresh <name>.parquet from a CSV checkpoint log (used by 02/03)."""
+    if HAVE_PARQUET and Path(csv_path).exists():
+        coerce_types(pd.read_csv(csv_path)).to_parquet(
+            parquet_path(csv_path), index=False)
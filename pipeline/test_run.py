@@ -6,26 +6,23 @@ Outputs saved to pipeline/output/test_careers.csv and test_enriched.csv
 (does NOT touch the real output CSVs).
 
 Run with:
-    python test_run.py
+    python test_run.py             (needs OPENAI_API_KEY)
+    python test_run.py --dry-run   (show which companies would be tested)
 """
 
 import json
-import os
-import time
 from pathlib import Path
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
+import cli
+import instrument
+
+pd       = cli.lazy_import("pandas")
+requests = cli.lazy_import("requests")
+bs4      = cli.lazy_import("bs4")
 
 BASE       = Path(__file__).parent.parent
 MASTER_CSV = BASE / "pipeline" / "output" / "master_companies.csv"
-
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")  # export OPENAI_API_KEY=sk-...
-os.environ["OPENAI_API_KEY"] = OPENAI_API_KEY
-client = OpenAI()
-MODEL  = "gpt-4o-mini"
+MODEL      = "gpt-4o-mini"
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
@@ -40,12 +37,16 @@ CAREERS_KEYWORDS = re.compile(
 
 def fetch_html(url, timeout=10):
     try:
-        resp = requests.get(url, timeout=timeout, headers=HEADERS, allow_redirects=True)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.content, "html.parser")
-        for t in soup(["script", "style", "nav", "footer", "header"]):
-            t.decompose()
-        return soup.get_text(separator=" ", strip=True), soup
+        with instrument.span("fetch", url=url) as s:
+            resp = requests.get(url, timeout=timeout, headers=HEADERS, allow_redirects=True)
+            s.update(status=resp.status_code, bytes=len(resp.content))
+            resp.raise_for_status()
+        with instrument.span("parse", url=url):
+            soup = bs4.BeautifulSoup(resp.content, "html.parser")
+            for t in soup(["script", "style", "nav", "footer", "header"]):
+                t.decompose()
+            text = soup.get_text(separator=" ", strip=True)
+        return text, soup
     except Exception:
         return None, None
 
@@ -78,10 +79,12 @@ Return JSON only:
   "summary": "..."
 }}"""
     try:
-        r = client.chat.completions.create(model=MODEL,
-            messages=[{"role":"user","content":prompt}],
-            temperature=0, max_tokens=600,
-            response_format={"type":"json_object"})
+        with instrument.span("llm", model=MODEL, url=careers_url or url) as s:
+            r = cli.openai_client().chat.completions.create(model=MODEL,
+                messages=[{"role":"user","content":prompt}],
+                temperature=0, max_tokens=600,
+                response_format={"type":"json_object"})
+            s.update(instrument.llm_usage(MODEL, r.usage))
         return json.loads(r.choices[0].message.content)
     except Exception as e:
         return {"error": str(e)}
@@ -105,105 +108,119 @@ Return JSON only:
   "founded_year": null
 }}"""
     try:
-        r = client.chat.completions.create(model=MODEL,
-            messages=[{"role":"user","content":prompt}],
-            temperature=0.1, max_tokens=450,
-            response_format={"type":"json_object"})
+        with instrument.span("llm", model=MODEL, url=url if homepage_text else None) as s:
+            r = cli.openai_client().chat.completions.create(model=MODEL,
+                messages=[{"role":"user","content":prompt}],
+                temperature=0.1, max_tokens=450,
+                response_format={"type":"json_object"})
+            s.update(instrument.llm_usage(MODEL, r.usage))
         return json.loads(r.choices[0].message.content)
     except Exception as e:
         return {"error": str(e)}
 
 # ── Test ──────────────────────────────────────────────────────────────────────
-master = pd.read_csv(MASTER_CSV)
-
-# Pick 5 varied test companies: 2 well-known, 1 CH-only (no URL), 2 mid-size
-# Try to pick ones with real websites likely to have careers pages
-TEST_COMPANIES = ["Gearset", "Riverlane", "Nyobolt", "Echion Technologies", "Collabora Ltd"]
-
-test_rows = master[master["company_name"].isin(TEST_COMPANIES)].drop_duplicates("company_name")
-# If any aren't in the master (shouldn't happen), fall back to first 5 with URLs
-if len(test_rows) < 5:
-    extra = master[master["has_url"] == True].iloc[:5]
-    test_rows = pd.concat([test_rows, extra]).drop_duplicates("company_name").head(5)
-
-print(f"Testing on {len(test_rows)} companies:\n")
-
-career_results  = []
-enrich_results  = []
-
-for _, row in test_rows.iterrows():
-    name = row["company_name"]
-    url  = row["url"] if pd.notna(row.get("url")) else None
-    sic  = row["sic_code"] if pd.notna(row.get("sic_code")) else None
-
-    print(f"\n{'─'*60}")
-    print(f"  {name}  |  {url}")
-    print(f"{'─'*60}")
-
-    # ── Careers scrape ────────────────────────────────────────────────────────
-    homepage_text, homepage_soup = (None, None)
-    careers_url, careers_text    = None, None
-
-    if url:
-        homepage_text, homepage_soup = fetch_html(url)
-        time.sleep(0.5)
-
-    if homepage_soup:
-        links = find_careers_links(url, homepage_soup)
-        print(f"  Careers link candidates: {links[:3]}")
-        for lnk in links:
-            ct = fetch_html(lnk)[0]
-            time.sleep(0.4)
-            if ct:
-                careers_url, careers_text = lnk, ct
-                break
-
-    careers_gpt = gpt_careers(name, url, careers_url,
-                               careers_text or homepage_text or "(no page text)")
-    roles = careers_gpt.get("roles", [])
-    print(f"  has_careers={careers_gpt.get('has_careers_page')}  "
-          f"roles={len(roles)}  email={careers_gpt.get('contact_email')}")
-    for r in roles[:3]:
-        print(f"    • {r.get('title')} [{r.get('type')}] @ {r.get('location')}")
-
-    career_results.append({
-        "company_name"    : name,
-        "company_url"     : url,
-        "careers_url"     : careers_url,
-        "has_careers_page": careers_gpt.get("has_careers_page"),
-        "role_count"      : len(roles),
-        "roles_json"      : json.dumps(roles),
-        "contact_email"   : careers_gpt.get("contact_email"),
-        "apply_url"       : careers_gpt.get("apply_url"),
-        "summary"         : careers_gpt.get("summary"),
-    })
-
-    # ── Enrichment ────────────────────────────────────────────────────────────
-    enrich_gpt = gpt_enrich(name, url, sic, homepage_text)
-    print(f"  stage={enrich_gpt.get('stage')}  "
-          f"tags={enrich_gpt.get('sector_tags')}  "
-          f"employees={enrich_gpt.get('employee_est')}")
-    print(f"  description: {(enrich_gpt.get('description') or '')[:120]}")
-
-    enrich_results.append({
-        "company_name" : name,
-        "url"          : url,
-        "description"  : enrich_gpt.get("description"),
-        "sector_tags"  : json.dumps(enrich_gpt.get("sector_tags", [])),
-        "stage"        : enrich_gpt.get("stage"),
-        "tech_keywords": enrich_gpt.get("tech_keywords"),
-        "employee_est" : enrich_gpt.get("employee_est"),
-        "hiring_status": enrich_gpt.get("hiring_status"),
-        "founded_year" : enrich_gpt.get("founded_year"),
-    })
-
-# Save test outputs
-pd.DataFrame(career_results).to_csv(
-    BASE / "pipeline" / "output" / "test_careers.csv", index=False)
-pd.DataFrame(enrich_results).to_csv(
-    BASE / "pipeline" / "output" / "test_enriched.csv", index=False)
-
-print(f"\n\n{'='*60}")
-print("TEST COMPLETE — outputs saved to pipeline/output/test_*.csv")
-print("Review above and in the CSVs, then run the full pipeline if happy.")
-print(f"{'='*60}")
+def main(args):
+    master = pd.read_csv(MASTER_CSV)
+
+    # Pick 5 varied test companies: 2 well-known, 1 CH-only (no URL), 2 mid-size
+    # Try to pick ones with real websites likely to have careers pages
+    TEST_COMPANIES = ["Gearset", "Riverlane", "Nyobolt", "Echion Technologies", "Collabora Ltd"]
+
+    test_rows = master[master["company_name"].isin(TEST_COMPANIES)].drop_duplicates("company_name")
+    # If any aren't in the master (shouldn't happen), fall back to first 5 with URLs
+    if len(test_rows) < 5:
+        extra = master[master["has_url"] == True].iloc[:5]
+        test_rows = pd.concat([test_rows, extra]).drop_duplicates("company_name").head(5)
+
+    print(f"Testing on {len(test_rows)} companies:\n")
+    if args.dry_run:
+        print("\n".join(f"  {name}" for name in test_rows["company_name"]))
+        return
+    cli.openai_client()   # fail on a missing key before the first fetch
+    instrument.start("test_run")
+
+    career_results  = []
+    enrich_results  = []
+
+    for _, row in test_rows.iterrows():
+        name = row["company_name"]
+        url  = row["url"] if pd.notna(row.get("url")) else None
+        sic  = row["sic_code"] if pd.notna(row.get("sic_code")) else None
+
+        print(f"\n{'─'*60}")
+        print(f"  {name}  |  {url}")
+        print(f"{'─'*60}")
+        instrument.company(name, url)
+
+        # ── Careers scrape ────────────────────────────────────────────────────
+        homepage_text, homepage_soup = (None, None)
+        careers_url, careers_text    = None, None
+
+        if url:
+            homepage_text, homepage_soup = fetch_html(url)
+            instrument.sleep(0.5)
+
+        if homepage_soup:
+            links = find_careers_links(url, homepage_soup)
+            print(f"  Careers link candidates: {links[:3]}")
+            for lnk in links:
+                ct = fetch_html(lnk)[0]
+                instrument.sleep(0.4)
+                if ct:
+                    careers_url, careers_text = lnk, ct
+                    break
+
+        careers_gpt = gpt_careers(name, url, careers_url,
+                                   careers_text or homepage_text or "(no page text)")
+        roles = careers_gpt.get("roles", [])
+        print(f"  has_careers={careers_gpt.get('has_careers_page')}  "
+              f"roles={len(roles)}  email={careers_gpt.get('contact_email')}")
+        for r in roles[:3]:
+            print(f"    • {r.get('title')} [{r.get('type')}] @ {r.get('location')}")
+
+        career_results.append({
+            "company_name"    : name,
+            "company_url"     : url,
+            "careers_url"     : careers_url,
+            "has_careers_page": careers_gpt.get("has_careers_page"),
+            "role_count"      : len(roles),
+            "roles_json"      : json.dumps(roles),
+            "contact_email"   : careers_gpt.get("contact_email"),
+            "apply_url"       : careers_gpt.get("apply_url"),
+            "summary"         : careers_gpt.get("summary"),
+        })
+
+        # ── Enrichment ────────────────────────────────────────────────────────
+        enrich_gpt = gpt_enrich(name, url, sic, homepage_text)
+        print(f"  stage={enrich_gpt.get('stage')}  "
+              f"tags={enrich_gpt.get('sector_tags')}  "
+              f"employees={enrich_gpt.get('employee_est')}")
+        print(f"  description: {(enrich_gpt.get('description') or '')[:120]}")
+
+        enrich_results.append({
+            "company_name" : name,
+            "url"          : url,
+            "description"  : enrich_gpt.get("description"),
+            "sector_tags"  : json.dumps(enrich_gpt.get("sector_tags", [])),
+            "stage"        : enrich_gpt.get("stage"),
+            "tech_keywords": enrich_gpt.get("tech_keywords"),
+            "employee_est" : enrich_gpt.get("employee_est"),
+            "hiring_status": enrich_gpt.get("hiring_status"),
+            "founded_year" : enrich_gpt.get("founded_year"),
+        })
+
+    # Save test outputs
+    pd.DataFrame(career_results).to_csv(
+        BASE / "pipeline" / "output" / "test_careers.csv", index=False)
+    pd.DataFrame(enrich_results).to_csv(
+        BASE / "pipeline" / "output" / "test_enriched.csv", index=False)
+
+    print(f"\n\n{'='*60}")
+    print("TEST COMPLETE — outputs saved to pipeline/output/test_*.csv")
+    print("Review above and in the CSVs, then run the full pipeline if happy.")
+    print(f"{'='*60}")
+    instrument.report()
+
+
+if __name__ == "__main__":
+    cli.run(main, __doc__)
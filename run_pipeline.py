@@ -0,0 +1,322 @@
+"""
+Run the data pipeline as a DAG, skipping the stages that are up to date.
+
+    python run_pipeline.py                   # every offline stage that is out of date
+    python run_pipeline.py build             # a stage and what it depends on
+    python run_pipeline.py careers enrich    # online stages run only when named
+    python run_pipeline.py --dry-run         # the plan: what would run, and why
+    python run_pipeline.py --force enrich    # rerun a stage even if it is up to date
+    python run_pipeline.py --touch           # record the current files as up to date
+    python run_pipeline.py --split --minify  # other flags go to gen_html.py
+
+Or from the notebook: run_pipeline.run(['build'], dry_run=True).
+
+Each stage declares the files it reads and writes (stages() below), and depends
+on the stages that write its inputs. Its key is a content hash of its inputs,
+its source files and its arguments, recorded in .pipeline_state.json after it
+succeeds; a stage is skipped while its key is unchanged and its outputs exist.
+A stage that reruns but writes the same bytes leaves its dependents cached.
+With no record yet (a fresh checkout), a stage whose outputs are all newer
+than its inputs and sources counts as up to date, and is recorded as such.
+
+The online stages (careers, enrich: network and paid OpenAI calls; geocode:
+network) only run when named, as a target or with --force; otherwise they are
+skipped and their dependents use the outputs they last wrote.
+
+Stages run as soon as their dependencies are done, concurrently (the geocoder
+alongside the careers scrape and enrichment), each in its own process with its
+output in pipeline/output/logs/<stage>.log. A stage whose external inputs are
+missing (01 needs the hub scrape and the Companies House export) is skipped,
+as long as the outputs it would have written are there.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+
+import gen_html
+
+BASE       = Path(__file__).resolve().parent
+OUT_DIR    = BASE / 'pipeline/output'
+LOG_DIR    = OUT_DIR / 'logs'
+STATE_PATH = OUT_DIR / '.pipeline_state.json'
+
+
+# ── Stages ────────────────────────────────────────────────────────────────────
+class Stage:
+    """A script, the files it reads and writes, and the modules it runs (part of its key)."""
+
+    def __init__(self, name, script, inputs, outputs, uses=(), args=(), online=False):
+        self.name    = name
+        self.script  = BASE / script
+        self.inputs  = [BASE / p for p in inputs]
+        self.outputs = [BASE / p for p in outputs]
+        self.uses    = [BASE / p for p in uses]
+        self.args    = list(args)
+        self.online  = online   # network / paid API calls: only runs when named
+
+    def writes(self, path):
+        """Whether the stage writes path (a table's Parquet twin comes with its CSV)."""
+        return path in self.outputs or path.with_suffix('.csv') in self.outputs
+
+    @property
+    def cmd(self):
+        return [sys.executable, str(self.script), *self.args]
+
+    def outputs_newer(self):
+        """Whether every output exists and is newer than every input and source file."""
+        if not all(p.exists() for p in self.outputs):
+            return False
+        sources = [p for p in [self.script, *self.uses, *self.inputs] if p.exists()]
+        return min(p.stat().st_mtime for p in self.outputs) >= max(p.stat().st_mtime for p in sources)
+
+    def key(self):
+        """Content hash of everything the stage's result depends on."""
+        h = hashlib.sha256(json.dumps([self.name, self.args]).encode('utf-8'))
+        for p in [self.script, *self.uses, *self.inputs]:
+            h.update(str(p.relative_to(BASE)).encode('utf-8'))
+            h.update(hashlib.sha256(p.read_bytes()).digest() if p.exists() else b'missing')
+        return h.hexdigest()
+
+
+def _table(name):
+    """A pipeline table: the CSV and its typed Parquet twin (see storage.py)."""
+    return [f'pipeline/output/{name}.csv', f'pipeline/output/{name}.parquet']
+
+
+def stages(render_args=()):
+    """The pipeline, in dependency order; render_args are gen_html.py's flags."""
+    page = gen_html.page_path(gen_html.arg_parser().parse_args(list(render_args)))
+    uses = ['pipeline/storage.py', 'pipeline/cli.py']
+    return [
+        Stage('merge',   'pipeline/01_merge_validate.py',
+              inputs =['scraped_companies.csv', 'companies_house_cambridge_tech.csv'],
+              outputs=['pipeline/output/master_companies.csv', 'pipeline/output/match_report.csv'],
+              uses   =uses),
+        Stage('careers', 'pipeline/02_find_careers.py',
+              inputs =_table('master_companies'),
+              outputs=['pipeline/output/careers.csv'],
+              uses   =uses + ['pipeline/instrument.py'], online=True),
+        Stage('enrich',  'pipeline/03_enrich_companies.py',
+              inputs =_table('master_companies') + _table('careers'),   # careers summaries as context
+              outputs=['pipeline/output/enriched_companies.csv'],
+              uses   =uses + ['pipeline/instrument.py'], online=True),
+        Stage('geocode', 'geocode_postcodes.py',
+              inputs =['pipeline/output/master_companies.csv'],
+              outputs=['pipeline/output/geocodes_a.json'], online=True),
+        Stage('final',   'pipeline/04_merge_final.py',
+              inputs =_table('master_companies') + _table('careers') + _table('enriched_companies'),
+              outputs=['pipeline/output/final_companies.csv'],
+              uses   =uses),
+        Stage('build',   'build_site.py', args=['--incremental'],
+              inputs =_table('final_companies') + ['pipeline/output/geocodes_a.json',
+                                                   'pipeline/output/geocodes_b.json'],
+              outputs=['site_data.json'],
+              uses   =['geo.py'] + uses),
+        Stage('render',  'gen_html.py', args=render_args,
+              inputs =['site_data.json'],
+              outputs=[page],
+              uses   =['columnar.py', 'map_tiles.py']),
+    ]
+
+
+def dependencies(plan):
+    """{stage name: [names of the stages that write its inputs]}"""
+    return {s.name: [t.name for t in plan if t is not s and any(t.writes(p) for p in s.inputs)]
+            for s in plan}
+
+
+def upstream(plan, deps, targets):
+    """The targets and every stage they depend on, in dependency order."""
+    wanted, todo = set(), list(targets)
+    while todo:
+        name = todo.pop()
+        if name not in wanted:
+            wanted.add(name)
+            todo.extend(deps[name])
+    return [s for s in plan if s.name in wanted]
+
+
+# ── State ─────────────────────────────────────────────────────────────────────
+def load_state():
+    return json.loads(STATE_PATH.read_text()) if STATE_PATH.exists() else {}
+
+
+def save_state(state):
+    STATE_PATH.write_text(json.dumps(state, indent=1, sort_keys=True))
+
+
+def record(state, stage, seconds=None):
+    state[stage.name] = dict(key=stage.key(), seconds=seconds and round(seconds, 2),
+                             at=datetime.now().isoformat(timespec='seconds'))
+
+
+def check(stage, plan, state, force=(), named=()):
+    """
+    (status, reason) for a stage whose dependencies are done: run, cached,
+    skipped or failed. named: the stages asked for by name (online stages
+    only run if they are).
+    """
+    external = [p for p in stage.inputs if not any(s.writes(p) for s in plan)]
+    missing  = ', '.join(p.name for p in external if not p.exists())
+    outputs  = all(p.exists() for p in stage.outputs)
+    if missing:
+        if outputs:
+            return 'skipped', f'inputs missing ({missing}), outputs kept'
+        return 'failed', f'inputs missing ({missing})'
+    last = state.get(stage.name)
+    if stage.name in force:
+        reason = 'forced'
+    elif last is None:
+        if stage.outputs_newer():
+            return 'cached', 'outputs newer than inputs'
+        reason = 'never run'
+    elif not outputs:
+        reason = 'outputs missing'
+    elif last['key'] != stage.key():
+        reason = 'inputs changed'
+    else:
+        return 'cached', 'up to date'
+    if stage.online and stage.name not in named:
+        if outputs:
+            return 'skipped', f'{reason}; online, name it to run'
+        return 'failed', f'{reason}, no outputs; online, name it to run'
+    return 'run', reason
+
+
+# ── Execution ─────────────────────────────────────────────────────────────────
+def _run_stage(stage):
+    """Run a stage in its own process, output to its log; (ok, seconds)."""
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    t = time.perf_counter()
+    with open(LOG_DIR / f'{stage.name}.log', 'w', encoding='utf-8') as log:
+        proc = subprocess.run(stage.cmd, stdout=log, stderr=subprocess.STDOUT,
+                              env={**os.environ, 'PYTHONUNBUFFERED': '1'})
+    return proc.returncode == 0, time.perf_counter() - t
+
+
+def _log_tail(stage, n=15):
+    lines = (LOG_DIR / f'{stage.name}.log').read_text(encoding='utf-8', errors='replace').splitlines()
+    return '\n'.join('    ' + line for line in lines[-n:])
+
+
+def execute(plan, state, force=(), jobs=None, dry_run=False, touch=False, named=()):
+    """
+    Bring the plan's stages up to date, each as soon as the stages it depends
+    on are done. dry_run only reports; touch records the stages that would run
+    as up to date instead of running them; named: see check(). Returns
+    {name: (status, seconds, note)}.
+    """
+    deps    = dependencies(plan)
+    pending = list(plan)
+    results, running = {}, {}
+    adopted = False
+    with ThreadPoolExecutor(jobs or len(plan) or 1) as pool:
+        while pending or running:
+            for stage in [s for s in pending if all(d in results for d in deps[s.name])]:
+                pending.remove(stage)
+                before = [results[d][0] for d in deps[stage.name]]
+                if 'failed' in before or 'blocked' in before:
+                    results[stage.name] = ('blocked', None, 'a dependency failed')
+                    continue
+                if 'would run' in before:
+                    after = [d for d in deps[stage.name] if results[d][0] == 'would run']
+                    results[stage.name] = ('would run', None, 'after ' + ', '.join(after))
+                    continue
+                status, reason = check(stage, plan, state, force, named)
+                if status == 'cached' and stage.name not in state and not dry_run:
+                    record(state, stage)   # adopted on a first run: tracked by key from now on
+                    adopted = True
+                if status != 'run':
+                    results[stage.name] = (status, None, reason)
+                elif dry_run:
+                    results[stage.name] = ('would run', None, reason)
+                elif touch:
+                    record(state, stage)
+                    results[stage.name] = ('touched', None, reason)
+                else:
+                    print(f'▶ {stage.name:<8} {reason}: {" ".join([str(stage.script.relative_to(BASE)), *stage.args])}')
+                    running[pool.submit(_run_stage, stage)] = stage
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                ok, seconds = future.result()
+                if ok:
+                    record(state, stage, seconds)
+                    save_state(state)   # after each stage, so an interrupted run keeps its progress
+                    print(f'✓ {stage.name:<8} {seconds:.1f}s')
+                    results[stage.name] = ('ran', seconds, '')
+                else:
+                    log = (LOG_DIR / f'{stage.name}.log').relative_to(BASE)
+                    print(f'✗ {stage.name:<8} failed after {seconds:.1f}s, last lines of {log}:\n'
+                          f'{_log_tail(stage)}')
+                    results[stage.name] = ('failed', seconds, f'see {log}')
+    if touch or adopted:
+        save_state(state)
+    return results
+
+
+def print_report(plan, results, wall):
+    print(f"\n{'='*63}")
+    print(f"  {'stage':<9}{'status':<11}{'time':>8}  note")
+    print(f"{'='*63}")
+    for stage in plan:
+        status, seconds, note = results[stage.name]
+        time_s = f'{seconds:.1f}s' if seconds is not None else '—'
+        print(f"  {stage.name:<9}{status:<11}{time_s:>8}  {note}".rstrip())
+    print(f"{'='*63}")
+    print(f"  {'total':<20}{wall:>8.1f}s  wall clock")
+
+
+# ── Entry points ──────────────────────────────────────────────────────────────
+def run(targets=None, force=(), render_args=(), jobs=None, dry_run=False, touch=False):
+    """
+    Bring targets (stage names; default all) and what they depend on up to
+    date, and print the timing table. Online stages run only if they are in
+    targets or force. Returns {name: (status, seconds, note)}.
+    """
+    plan = stages(render_args)
+    deps = dependencies(plan)
+    unknown = (set(targets or ()) | set(force)) - set(deps)
+    if unknown:
+        raise ValueError(f'Unknown stage(s) {sorted(unknown)}; stages: {", ".join(deps)}')
+    plan = upstream(plan, deps, targets or deps)
+    t = time.perf_counter()
+    named = set(targets or ()) | set(force)
+    results = execute(plan, load_state(), force, jobs, dry_run, touch, named)
+    print_report(plan, results, time.perf_counter() - t)
+    return results
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('targets', nargs='*', metavar='STAGE',
+                    help='stages to bring up to date, with what they depend on (default: all); '
+                         'online stages (careers, enrich, geocode) only run when named here or with --force')
+    ap.add_argument('--force', action='append', default=[], metavar='STAGE',
+                    help='rerun STAGE even if it is up to date (repeatable)')
+    ap.add_argument('--jobs', type=int, default=None,
+                    help='stages to run at once (default: as many as are ready)')
+    ap.add_argument('--dry-run', action='store_true',
+                    help='print what would run, and why, without running anything')
+    ap.add_argument('--touch', action='store_true',
+                    help='record the stages that would run as up to date, without running them')
+    args, render_args = ap.parse_known_args(argv)
+    try:
+        results = run(args.targets, args.force, render_args, args.jobs, args.dry_run, args.touch)
+    except ValueError as e:
+        ap.error(str(e))
+    sys.exit(1 if any(r[0] in ('failed', 'blocked') for r in results.values()) else 0)
+
+
+if __name__ == '__main__':
+    main()